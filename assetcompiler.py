@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# compiles models to .bam and textures to .txo with their mipmaps, so they
+# load without parsing or filtering at startup. e.g.
+#
+#   $ python assetcompiler.py
+#
+# the compiled assets go to compiled/ below each asset root, listed with
+# the hash of their source in compiled.json. AssetCache loads them while
+# they are fresh, and compiles anything stale or missing when it loads the
+# source, so running this beforehand only saves the first start.
+
+import argparse
+from glob import glob
+import hashlib
+import json
+import os
+
+MANIFEST = 'compiled.json'
+OUTPUT_DIRECTORY = 'compiled'
+
+MODEL_EXTENSIONS = ('.egg',)
+
+# assets to compile, by asset root
+DEFAULT_ASSETS = [
+	('tilesets/simple/', ['models/*.egg', 'textures/*.png', 'textures/*.jpeg', 'textures/*.jpg', 'atlas*.png']),
+	('', ['models/cardModel.egg', 'textures/*.png', 'atlas*.png']),
+]
+
+def content_hash(path):
+	with open(path, 'rb') as f:
+		return hashlib.sha1(f.read()).hexdigest()
+
+
+def is_model(path):
+	return os.path.splitext(path)[1] in MODEL_EXTENSIONS
+
+
+def write_model(model, path):
+	"""writes a loaded model as .bam"""
+	if not model.writeBamFile(path): raise IOError('Cannot write %s.' % path)
+
+
+def write_texture(texture, path):
+	"""writes a loaded texture as .txo, with its mipmaps"""
+	texture.generateRamMipmapImages()
+	if not texture.write(path): raise IOError('Cannot write %s.' % path)
+
+
+class CompiledAssets(object):
+	"""The compiled versions of the assets below root_path.
+
+	Assets are referred to by their source path relative to the root. A
+	compiled asset is fresh while its source has the content hash it was
+	compiled from; the hash is only computed again when the modification
+	time or size of the source changed."""
+	def __init__(self, root_path = ''):
+		self.root_path = root_path
+		self.manifest_path = os.path.join(root_path, MANIFEST)
+		self.entries = {}
+		if os.path.exists(self.manifest_path):
+			with open(self.manifest_path) as f:
+				self.entries = json.load(f)
+
+	def output_path(self, path):
+		"""returns where the compiled version of path goes, relative to the
+		root"""
+		return os.path.join(OUTPUT_DIRECTORY, os.path.splitext(path)[0] + ('.bam' if is_model(path) else '.txo'))
+
+	def lookup(self, path):
+		"""returns the path of the compiled version of path relative to the
+		root, if it is fresh, else None"""
+		entry = self.entries.get(path)
+		if not entry: return None
+
+		source = os.path.join(self.root_path, path)
+		if not os.path.exists(source) or not os.path.exists(os.path.join(self.root_path, entry['output'])): return None
+
+		stat = os.stat(source)
+		if [stat.st_mtime, stat.st_size] == [entry['mtime'], entry['size']]: return entry['output']
+		if content_hash(source) != entry['hash']: return None
+
+		# touched, but not changed
+		entry['mtime'], entry['size'] = stat.st_mtime, stat.st_size
+		self.save()
+		return entry['output']
+
+	def prepare(self, path):
+		"""returns the absolute path to write the compiled version of path
+		to, creating its directory"""
+		output = os.path.join(self.root_path, self.output_path(path))
+		directory = os.path.dirname(output)
+		if not os.path.isdir(directory): os.makedirs(directory)
+		return output
+
+	def record(self, path):
+		"""notes that path was compiled from its current source"""
+		source = os.path.join(self.root_path, path)
+		stat = os.stat(source)
+		self.entries[path] = {'hash': content_hash(source), 'mtime': stat.st_mtime, 'size': stat.st_size, 'output': self.output_path(path)}
+		self.save()
+
+	def save(self):
+		with open(self.manifest_path, 'w') as f:
+			json.dump(self.entries, f, indent = 1, sort_keys = True)
+
+
+def compile_assets(root_path, patterns, force = False):
+	"""compiles the assets below root_path matching patterns, unless they
+	are fresh. returns the paths compiled"""
+	from panda3d.core import Filename, Loader, NodePath, Texture, TexturePool
+
+	compiled = CompiledAssets(root_path)
+	paths = sorted(set(os.path.relpath(p, root_path or '.') for pattern in patterns for p in glob(os.path.join(root_path, pattern))))
+	done = []
+	for path in paths:
+		if not force and compiled.lookup(path): continue
+
+		source = Filename.fromOsSpecific(os.path.join(root_path, path))
+		output = Filename.fromOsSpecific(compiled.prepare(path))
+		if is_model(path):
+			node = Loader.getGlobalPtr().loadSync(source)
+			if not node: raise IOError('Cannot read %s.' % path)
+			write_model(NodePath(node), output)
+		else:
+			texture = TexturePool.loadTexture(source)
+			if not texture: raise IOError('Cannot read %s.' % path)
+			texture.setMinfilter(Texture.FTLinearMipmapLinear)
+			write_texture(texture, output)
+
+		compiled.record(path)
+		done.append(path)
+	return done
+
+
+def main():
+	parser = argparse.ArgumentParser(description = 'Compiles models and textures for fast loading.')
+	parser.add_argument('root', nargs = '?', help = 'asset root, the manifest is written there')
+	parser.add_argument('patterns', nargs = '*', help = 'assets to compile, relative to the root')
+	parser.add_argument('-f', '--force', action = 'store_true', help = 'compile fresh assets again')
+	args = parser.parse_args()
+
+	if args.root is not None: assets = [(args.root, args.patterns)]
+	else: assets = DEFAULT_ASSETS
+
+	for root_path, patterns in assets:
+		done = compile_assets(root_path, patterns, args.force)
+		print '%s: %d assets compiled' % (os.path.join(root_path, MANIFEST), len(done))
+
+if __name__ == '__main__':
+	main()
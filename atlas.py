@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# packs the textures of a tileset into one or a few atlases, and writes a
+# manifest of where each texture ended up. e.g.
+#
+#   $ python atlas.py
+#   $ python atlas.py tilesets/simple/ 'textures/chip*.png'
+#
+# without arguments, the textures of the simple tileset and the cards are
+# packed. AssetCache picks the manifest up from the root of its assets;
+# textures not in it are still loaded on their own.
+
+import argparse
+from collections import namedtuple
+from glob import glob
+import json
+import os
+
+MANIFEST = 'atlas.json'
+
+# textures loaded by the renderer, by asset root. models referring to
+# textures themselves are left alone, their coordinates may wrap around
+DEFAULT_ATLASES = [
+	('tilesets/simple/', ['textures/chip*.png', 'textures/*Tile.jpeg', 'textures/player*.png']),
+	('', ['textures/*Card.png']),
+]
+
+# where a texture is in an atlas: rect in pixels (x, y, width, height) from
+# the top left, offset and scale map the texture coordinates of a model
+# onto the rect, as u' = offset + scale*u, with v running bottom to top
+Region = namedtuple('Region', 'atlas rect offset scale')
+
+def next_power_of_two(n):
+	p = 1
+	while p < n: p *= 2
+	return p
+
+
+def pack(sizes, max_size = 4096, padding = 2):
+	"""packs images of sizes [(width, height), ...] on shelves, tallest
+	first. returns the placement (atlas, x, y) of each image and the size
+	of each atlas, in powers of two. a new atlas is started once one is
+	full, every image is surrounded by padding pixels"""
+	order = sorted(range(0, len(sizes)), key = lambda i: (-sizes[i][1], -sizes[i][0], i))
+	placements = [None] * len(sizes)
+	atlases = []
+
+	atlas, x, y, shelf_height, width = -1, 0, 0, 0, 0
+	for i in order:
+		w, h = sizes[i][0] + 2*padding, sizes[i][1] + 2*padding
+		if w > max_size or h > max_size: raise ValueError('Image %d of %dx%d does not fit into %d pixels.' % (i, sizes[i][0], sizes[i][1], max_size))
+
+		# next shelf, or next atlas
+		if atlas >= 0 and x + w > max_size:
+			x, y, shelf_height = 0, y + shelf_height, 0
+		if atlas < 0 or y + h > max_size:
+			if atlas >= 0: atlases.append((next_power_of_two(width), next_power_of_two(y + shelf_height)))
+			atlas, x, y, shelf_height, width = atlas+1, 0, 0, 0, 0
+
+		placements[i] = (atlas, x + padding, y + padding)
+		x += w
+		shelf_height = max(shelf_height, h)
+		width = max(width, x)
+
+	if atlas >= 0: atlases.append((next_power_of_two(width), next_power_of_two(y + shelf_height)))
+	return placements, atlases
+
+
+class AtlasManifest(object):
+	"""The atlases of an asset root and the region of each texture packed
+	into them, by texture path relative to the root."""
+	def __init__(self, images, sizes, regions, padding = 0):
+		self.images = images
+		self.sizes = sizes
+		self.regions = regions
+		self.padding = padding
+
+	@classmethod
+	def for_sizes(_class, paths, sizes, name = 'atlas', **kwargs):
+		"""returns the manifest for packing images of the given sizes"""
+		placements, atlases = pack(sizes, **kwargs)
+		regions = {}
+		for path, (w, h), (a, x, y) in zip(paths, sizes, placements):
+			aw, ah = atlases[a]
+			regions[path] = Region(a, (x, y, w, h), (x / float(aw), 1 - (y+h) / float(ah)), (w / float(aw), h / float(ah)))
+
+		images = ['%s%d.png' % (name, a) for a in range(0, len(atlases))]
+		return _class(images, atlases, regions, kwargs.get('padding', 2))
+
+	@classmethod
+	def load(_class, path):
+		"""returns the manifest at path, or None if there is none"""
+		if not os.path.exists(path): return None
+		with open(path) as f:
+			d = json.load(f)
+
+		regions = dict((str(p), Region(r['atlas'], tuple(r['rect']), tuple(r['offset']), tuple(r['scale']))) for p, r in d['textures'].iteritems())
+		return _class([str(a['image']) for a in d['atlases']], [tuple(a['size']) for a in d['atlases']], regions, d['padding'])
+
+	def save(self, path):
+		d = {
+			'padding': self.padding,
+			'atlases': [{'image': image, 'size': size} for image, size in zip(self.images, self.sizes)],
+			'textures': dict((p, r._asdict()) for p, r in self.regions.iteritems()),
+		}
+		with open(path, 'w') as f:
+			json.dump(d, f, indent = 1, sort_keys = True)
+
+	def __contains__(self, path):
+		return path in self.regions
+
+
+def build(root_path, patterns, name = 'atlas', max_size = 4096, padding = 2):
+	"""packs the textures below root_path matching patterns into atlases,
+	written next to the manifest. returns the manifest"""
+	from panda3d.core import Filename, PNMImage
+
+	paths = sorted(set(os.path.relpath(p, root_path or '.') for pattern in patterns for p in glob(os.path.join(root_path, pattern))))
+	images = []
+	for path in paths:
+		image = PNMImage()
+		if not image.read(Filename.fromOsSpecific(os.path.join(root_path, path))): raise IOError('Cannot read %s.' % path)
+		if not image.hasAlpha():
+			image.addAlpha()
+			image.alphaFill(1)
+		images.append(image)
+
+	manifest = AtlasManifest.for_sizes(paths, [(i.getXSize(), i.getYSize()) for i in images], name, max_size = max_size, padding = padding)
+
+	for a, (image_path, (w, h)) in enumerate(zip(manifest.images, manifest.sizes)):
+		atlas = PNMImage(w, h, 4)
+		atlas.alphaFill(0)
+		for path, image in zip(paths, images):
+			region = manifest.regions[path]
+			if region.atlas != a: continue
+
+			x, y, rw, rh = region.rect
+			atlas.copySubImage(image, x, y)
+
+			# repeat the border into the padding, so filtering does not
+			# bleed neighbouring textures in
+			for i in range(1, padding+1):
+				atlas.copySubImage(image, x-i, y, 0, 0, 1, rh)
+				atlas.copySubImage(image, x+rw-1+i, y, rw-1, 0, 1, rh)
+				atlas.copySubImage(image, x, y-i, 0, 0, rw, 1)
+				atlas.copySubImage(image, x, y+rh-1+i, 0, rh-1, rw, 1)
+
+		atlas.write(Filename.fromOsSpecific(os.path.join(root_path, image_path)))
+
+	manifest.save(os.path.join(root_path, MANIFEST))
+	return manifest
+
+
+def main():
+	parser = argparse.ArgumentParser(description = 'Packs textures into atlases.')
+	parser.add_argument('root', nargs = '?', help = 'asset root, the manifest is written there')
+	parser.add_argument('patterns', nargs = '*', help = 'textures to pack, relative to the root')
+	parser.add_argument('--max-size', type = int, default = 4096, help = 'maximum width and height of an atlas')
+	parser.add_argument('--padding', type = int, default = 2, help = 'pixels around each texture')
+	args = parser.parse_args()
+
+	if args.root is not None: atlases = [(args.root, args.patterns)]
+	else: atlases = DEFAULT_ATLASES
+
+	for root_path, patterns in atlases:
+		manifest = build(root_path, patterns, max_size = args.max_size, padding = args.padding)
+		print '%s: %d textures in %s' % (os.path.join(root_path, MANIFEST), len(manifest.regions), ', '.join('%s (%dx%d)' % ((image,) + size) for image, size in zip(manifest.images, manifest.sizes)))
+
+if __name__ == '__main__':
+	main()
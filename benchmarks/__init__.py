@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# a small benchmark suite for the game model and the renderer. benchmarks
+# register themselves with the benchmark decorator, run them with
+#
+#   $ python -m benchmarks --save        # store a new baseline
+#   $ python -m benchmarks               # compare against the baseline
+#
+# see python -m benchmarks --help for options
+
+import json
+import platform
+import sys
+from timeit import default_timer
+
+# radii used for benchmarks depending on the board size, 2 is the
+# standard board
+RADII = (2, 4, 8)
+
+# name -> function, in order of registration
+BENCHMARKS = []
+
+def benchmark(name, radii = None):
+	"""registers a benchmark. the decorated function is called with a board
+	radius (once for each of radii, if given) and returns the callable to
+	time, everything before that is setup. if the callable has a teardown
+	attribute, it is called once the timing is done"""
+	def register(f):
+		if radii:
+			for radius in radii:
+				BENCHMARKS.append(('%s[r=%d]' % (name, radius), lambda radius = radius: f(radius)))
+		else:
+			BENCHMARKS.append((name, f))
+		return f
+	return register
+
+
+def measure(f, min_time = 0.1, repeat = 3):
+	"""returns the time per call of f in seconds, the best of repeat runs.
+	the number of calls per run is raised until a run takes min_time"""
+	def run(number):
+		start = default_timer()
+		for i in xrange(0, number):
+			f()
+		return default_timer() - start
+
+	number = 1
+	while True:
+		elapsed = run(number)
+		if elapsed >= min_time: break
+		number *= 10 if elapsed < min_time/10 else 2
+
+	return min([elapsed] + [run(number) for i in range(1, repeat)]) / number
+
+
+def run(pattern = None, min_time = 0.1, repeat = 3, out = None):
+	"""runs all benchmarks with pattern in their name, returns a dict of
+	name -> seconds per call"""
+	results = {}
+	for name, setup in BENCHMARKS:
+		if pattern and not pattern in name: continue
+		f = setup()
+		try:
+			results[name] = measure(f, min_time, repeat)
+		finally:
+			if hasattr(f, 'teardown'): f.teardown()
+		if out: out.write('%-50s %12.2f us\n' % (name, results[name]*1e6))
+	return results
+
+
+def compare(results, baseline, threshold):
+	"""returns (name, baseline, result, ratio) for every result slower than
+	its baseline by more than threshold (0.2 = 20%)"""
+	regressions = []
+	for name, seconds in sorted(results.iteritems()):
+		if not name in baseline: continue
+		ratio = seconds / baseline[name]
+		if ratio > 1 + threshold: regressions.append((name, baseline[name], seconds, ratio))
+	return regressions
+
+
+def save_baseline(path, results):
+	with open(path, 'w') as f:
+		json.dump({
+			'python': sys.version.split()[0],
+			'platform': platform.platform(),
+			'benchmarks': results,
+		}, f, indent = 1, sort_keys = True)
+
+
+def load_baseline(path):
+	"""returns the benchmark results stored in a baseline file"""
+	with open(path) as f:
+		return json.load(f)['benchmarks']
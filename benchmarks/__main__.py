@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# coding=utf8
+
+import argparse
+import os
+import sys
+
+from benchmarks import run, compare, save_baseline, load_baseline
+import benchmarks.model
+import benchmarks.scene
+
+def main():
+	parser = argparse.ArgumentParser(prog = 'python -m benchmarks', description = 'Runs the benchmarks and compares them against a baseline.')
+	parser.add_argument('-k', dest = 'pattern', help = 'only run benchmarks with this in their name')
+	parser.add_argument('-b', '--baseline', default = os.path.join(os.path.dirname(__file__), 'baseline.json'), help = 'baseline file, default: %(default)s')
+	parser.add_argument('--save', action = 'store_true', help = 'save the results as the new baseline instead of comparing')
+	parser.add_argument('-t', '--threshold', type = float, default = 0.2, help = 'fail if a benchmark is slower than its baseline by more than this fraction, default: %(default)s')
+	parser.add_argument('--min-time', type = float, default = 0.1, help = 'minimum duration of a timing run in seconds')
+	parser.add_argument('--repeat', type = int, default = 3, help = 'timing runs per benchmark, the best is used')
+	args = parser.parse_args()
+
+	if not benchmarks.scene.available:
+		sys.stdout.write('Panda3D not found, skipping scene benchmarks.\n')
+
+	results = run(args.pattern, args.min_time, args.repeat, sys.stdout)
+
+	if args.save:
+		# only replace the benchmarks that were run
+		baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else {}
+		baseline.update(results)
+		save_baseline(args.baseline, baseline)
+		sys.stdout.write('Baseline saved to %s.\n' % args.baseline)
+		return 0
+
+	if not os.path.exists(args.baseline):
+		sys.stdout.write('No baseline at %s, run with --save first.\n' % args.baseline)
+		return 0
+
+	regressions = compare(results, load_baseline(args.baseline), args.threshold)
+	for name, before, after, ratio in regressions:
+		sys.stdout.write('REGRESSION %s: %.2f us -> %.2f us (%+.0f%%)\n' % (name, before*1e6, after*1e6, (ratio-1)*100))
+	if regressions: return 1
+
+	sys.stdout.write('No regressions above %.0f%%.\n' % (args.threshold*100))
+	return 0
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from random import Random
+
+from benchmarks import benchmark, RADII
+from gamemodel.board import Board
+from gamemodel.game import Game
+from gamemodel.hexgrid import HexPosition
+from gamemodel.layout import LayoutSampler, BalancedResourcePips
+from gamemodel.picking import BoardPicker
+from gamemodel.tiles import board_setup, STANDARD_BOARD_TILES, STANDARD_BOARD_CHIPS
+from gamemodel.topology import BoardTopology
+from gamemodel.values import NodeValues
+
+def generated_board(radius, compact = False, seed = 1):
+	setup, chips = board_setup(radius)
+	board = Board(Random(seed), compact = compact)
+	board.generate_board(setup, chips)
+	return board
+
+
+def settled_board(radius, compact = False, players = ('red', 'blue', 'green')):
+	# a board with buildings on it until no node is available, and a road
+	# next to each building
+	board = generated_board(radius, compact)
+	random = Random(2)
+	nodes = list(board.available_nodes())
+	while nodes:
+		i = len(nodes)
+		node_id = random.choice(nodes)
+		board.update_building(node_id, players[i%len(players)], 'settlement' if i%2 else 'city')
+		board.update_road(node_id, board.network.neighbors(node_id)[0], players[i%len(players)])
+		nodes = list(board.available_nodes())
+	return board
+
+
+@benchmark('hexgrid.arithmetic')
+def hexgrid_arithmetic():
+	a, b = HexPosition(1, -2, 1), HexPosition(0, 1, -1)
+	def f():
+		(a + b - b).distance_to(a)
+	return f
+
+
+@benchmark('hexgrid.neighbors')
+def hexgrid_neighbors():
+	positions = HexPosition.spiral(2, HexPosition.directions[0])
+	def f():
+		for pos in positions:
+			pos.neighbors()
+	return f
+
+
+@benchmark('hexgrid.walk_spiral', RADII)
+def hexgrid_walk_spiral(radius):
+	direction = HexPosition.directions[1]
+	def f():
+		for pos in HexPosition.walk_spiral(radius, direction):
+			pass
+	return f
+
+
+@benchmark('board.generate_board', RADII)
+def board_generate(radius):
+	setup, chips = board_setup(radius)
+	random = Random(1)
+	def f():
+		Board(random).generate_board(setup, chips)
+	return f
+
+
+@benchmark('board.generate_board.compact', RADII)
+def board_generate_compact(radius):
+	setup, chips = board_setup(radius)
+	random = Random(1)
+	def f():
+		Board(random, compact = True).generate_board(setup, chips)
+	return f
+
+
+@benchmark('board.walk_coast', RADII)
+def board_walk_coast(radius):
+	board = generated_board(radius)
+	def f():
+		for node_id in board.walk_coast():
+			pass
+	return f
+
+
+@benchmark('board.node_available', RADII)
+def board_node_available(radius):
+	board = settled_board(radius)
+	nodes = board.topology.nodes
+	def f():
+		for node_id in nodes:
+			board.node_available(node_id)
+	return f
+
+
+@benchmark('board.count_buildings', RADII)
+def board_count_buildings(radius):
+	board = settled_board(radius)
+	return board.count_buildings
+
+
+@benchmark('game.legal_actions')
+def game_legal_actions():
+	game = Game(1)
+	for color in 'red', 'blue', 'green':
+		game.create_player(color, color)
+	game.legal_actions()[0].apply(game)
+	return game.legal_actions
+
+
+@benchmark('layout.balanced')
+def layout_balanced():
+	# time per accepted board, including rejected ones
+	sampler = LayoutSampler.balanced()
+	random = Random(1)
+	topology = BoardTopology.for_radius(2)
+	def f():
+		sampler.sample(random, topology, STANDARD_BOARD_TILES, STANDARD_BOARD_CHIPS)
+	return f
+
+
+@benchmark('layout.balanced_pips', RADII)
+def layout_balanced_pips(radius):
+	sampler = LayoutSampler([BalancedResourcePips()], shuffle_chips = True)
+	random = Random(1)
+	topology = BoardTopology.for_radius(radius)
+	setup, chips = board_setup(radius)
+	def f():
+		sampler.sample(random, topology, setup, chips)
+	return f
+
+
+@benchmark('values.build', RADII)
+def values_build(radius):
+	board = generated_board(radius)
+	def f():
+		NodeValues(board)
+	return f
+
+
+@benchmark('values.robber_top5', RADII)
+def values_robber_top(radius):
+	# move the robber, then ask for the best free places
+	board = generated_board(radius)
+	tiles = board.topology.tiles
+	values = board.values
+	state = [0]
+	def f():
+		state[0] = (state[0]+1) % len(tiles)
+		board.move_robber(tiles[state[0]])
+		values.top(5)
+	return f
+
+
+@benchmark('picking.pick', RADII)
+def picking_pick(radius):
+	# tile, node and edge under a point, as on every mouse move
+	picker = BoardPicker(BoardTopology.for_radius(radius))
+	random = Random(3)
+	extent = 1.5 * radius + 1
+	points = [(random.uniform(-extent, extent), random.uniform(-extent, extent)) for i in range(0, 100)]
+	state = [0]
+	def f():
+		state[0] = (state[0]+1) % len(points)
+		x, y = points[state[0]]
+		picker.tile_at(x, y)
+		picker.node_at(x, y)
+		picker.edge_at(x, y)
+	return f
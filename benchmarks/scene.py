@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# scene construction of the BoardRenderer in an offscreen window. without
+# Panda3D, no benchmarks are registered
+
+from benchmarks import benchmark, RADII
+from benchmarks.model import settled_board
+
+try:
+	from pandac.PandaModules import loadPrcFileData
+	available = True
+except ImportError:
+	available = False
+
+def offscreen_base():
+	"""returns a ShowBase rendering into an offscreen buffer, shared with
+	snapshot.py"""
+	import snapshot
+	return snapshot.offscreen_base()
+
+
+def scene(radius):
+	"""returns a node below render for the scene of a benchmark, lit, with
+	the camera looking down on a board of radius. remove it when done"""
+	from boardtest import setup_lights
+	import snapshot
+
+	base = offscreen_base()
+	root = base.render.attachNewNode('benchmark')
+	setup_lights(root)
+	snapshot.aim_camera(base, radius)
+	return root
+
+
+if available:
+	@benchmark('renderer.board_scene', RADII)
+	def renderer_board_scene(radius):
+		from boardtest import BoardRenderer
+
+		base = offscreen_base()
+		root = scene(radius)
+		board = settled_board(radius)
+		def f():
+			BoardRenderer(base, board, parent = root).destroy()
+		f.teardown = root.removeNode
+		return f
+
+	@benchmark('renderer.road_update', RADII)
+	def renderer_road_update(radius):
+		# placing and removing a road, with the renderer following
+		from boardtest import BoardRenderer
+
+		base = offscreen_base()
+		root = scene(radius)
+		board = settled_board(radius)
+		renderer = BoardRenderer(base, board, parent = root)
+		u, v = [edge for edge in board.topology.edge_ids() if not board.road_owner(*edge)][0]
+		def f():
+			board.update_road(u, v, 'red')
+			board.update_road(u, v, None)
+		def teardown():
+			renderer.destroy()
+			root.removeNode()
+		f.teardown = teardown
+		return f
+
+	def renderer_frame(radius, flatten):
+		# the board is all there is in the scene, besides camera and lights
+		from boardtest import BoardRenderer
+
+		base = offscreen_base()
+		root = scene(radius)
+		renderer = BoardRenderer(base, settled_board(radius), flatten = flatten, parent = root)
+		def f():
+			base.graphicsEngine.renderFrame()
+		def teardown():
+			renderer.destroy()
+			root.removeNode()
+		f.teardown = teardown
+		return f
+
+	@benchmark('renderer.frame', RADII)
+	def renderer_frame_flattened(radius):
+		return renderer_frame(radius, True)
+
+	@benchmark('renderer.frame.unflattened', RADII)
+	def renderer_frame_unflattened(radius):
+		return renderer_frame(radius, False)
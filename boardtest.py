@@ -1,18 +1,28 @@
 #!/usr/bin/env python
 # coding=utf8
 
+from collections import deque
+import os
 import sys
+import time
 
 from direct.showbase.ShowBase import ShowBase
 from direct.showbase import DirectObject
 from direct.actor.Actor import Actor
 from direct.task import Task
+from direct.task.TaskManagerGlobal import taskMgr
+from direct.gui.OnscreenText import OnscreenText
 from pandac.PandaModules import AmbientLight, Spotlight, PerspectiveLens, DirectionalLight, AntialiasAttrib, WindowProperties
-from panda3d.core import VBase4, Vec3, Vec4, Mat4, Point3, TransformState, Material, ConfigVariableInt, ConfigVariableBool, ConfigVariableString, CollisionTraverser, CollisionNode, CollisionHandlerQueue, CollisionRay, CollisionPlane, GeomNode, Texture, TextureStage, Plane, BitMask32
+from panda3d.core import NodePath, VBase4, Vec3, Vec4, Mat4, Point3, TransformState, Material, ConfigVariableInt, ConfigVariableBool, ConfigVariableString, GeomNode, Texture, TextureStage, TexturePool, Filename, CardMaker, GeomVertexFormat, GeomVertexData, GeomVertexWriter, GeomTriangles, Geom, ClockObject, Point2
 from math import pi, sqrt, cos, sin
 
+from assetcompiler import CompiledAssets, write_model, write_texture
+from atlas import AtlasManifest, MANIFEST
+from profiling import timed, timings
+
 from gamemodel.board import *
 from gamemodel.hexgrid import *
+from gamemodel.picking import BoardPicker
 from gamemodel.tiles import *
 from gamemodel.game import *
 import random
@@ -35,128 +45,396 @@ def align_to_vector(v):
 
 
 def draw_debugging_arrow(base, v_from, v_to):
-	arrowModel = base.loader.loadModel('models/debuggingArrow')
+	# the model is loaded in the background, and appears below the
+	# returned node once it is there
+	arrowModel = base.render.attachNewNode('debuggingArrow')
 	mat = align_to_vector(v_to-v_from)
 	arrowModel.setTransform(TransformState.makeMat(mat))
 	arrowModel.setPos(*v_from)
-	arrowModel.reparentTo(base.render)
+	base.loader.loadModel('models/debuggingArrow', callback = lambda model: model.reparentTo(arrowModel))
 
 	return arrowModel
 
 
+def setup_lights(render):
+	"""sets up some 3-point lighting for the whole board"""
+	lKey = DirectionalLight('lKey')
+	lKey.setColor(VBase4(0.9,0.9,0.9,1))
+	lKeyNode = render.attachNewNode(lKey)
+	lKeyNode.setH(-63)
+	lKeyNode.setP(-60)
+	lKeyNode.setR(-30)
+	render.setLight(lKeyNode)
+
+	lFill = DirectionalLight('lFill')
+	lFill.setColor(VBase4(0.4,0.4,0.4,1))
+	lFillNode = render.attachNewNode(lFill)
+	lFillNode.setH(27)
+	lFillNode.setP(-15)
+	lFillNode.setR(-30)
+	render.setLight(lFillNode)
+
+	lBack = DirectionalLight('lBack')
+	lBack.setColor(VBase4(0.3,0.3,0.3,1))
+	lBackNode = render.attachNewNode(lBack)
+	lBackNode.setH(177)
+	lBackNode.setP(-20)
+	lBackNode.setR(0)
+	render.setLight(lBackNode)
+
+	lBelow = DirectionalLight('lBelow')
+	lBelow.setColor(VBase4(0.4,0.4,0.4,1))
+	lBelowNode = render.attachNewNode(lBelow)
+	lBelowNode.setH(0)
+	lBelowNode.setP(90)
+	lBelowNode.setR(0)
+	render.setLight(lBelowNode)
+
+
+class AssetCache(object):
+	"""Loads each model and texture only once.
+
+	Models are handed out as copies (copy_model), which may be changed
+	freely, or as instances (instance_model) sharing the loaded geometry,
+	which must not be changed below their top node. Textures are cached by
+	path, with their filters set when they are loaded.
+
+	If there is an atlas manifest in root_path (see atlas.py), textures
+	packed into an atlas are applied as the region of the atlas they are
+	in (apply_texture), so they all share one texture.
+
+	With compiled set, models and textures are loaded from their compiled
+	versions (see assetcompiler.py) while those are fresh. Otherwise the
+	source is loaded and compiled for the next start.
+
+	Assets are loaded when they are first asked for, blocking the main
+	loop. prefetch loads them in the background instead, ahead of time."""
+	def __init__(self, loader, root_path = '', compiled = True):
+		self.loader = loader
+		self.root_path = root_path
+		self.atlas = AtlasManifest.load(root_path + MANIFEST)
+		self.compiled = CompiledAssets(root_path) if compiled else None
+
+		self.models = {}
+		self.textures = {}
+
+		# copies are created here, to be reparented by the caller
+		self.copies = NodePath('assetCopies')
+
+		self.model_requests = 0
+		self.texture_requests = 0
+		self.compiled_loads = 0
+		self.load_time = 0.
+
+	def _resolve(self, path, source_path):
+		# returns the file to load for path, the compiled version of
+		# source_path if it is fresh, and whether to compile it once loaded
+		if not self.compiled: return self.root_path + path, False
+
+		compiled_path = self.compiled.lookup(source_path)
+		if compiled_path:
+			self.compiled_loads += 1
+			return self.root_path + compiled_path, False
+		return self.root_path + path, os.path.exists(self.root_path + source_path)
+
+	def _compile(self, asset, source_path, write):
+		write(asset, self.compiled.prepare(source_path))
+		self.compiled.record(source_path)
+
+	def _load(self, path, source_path, load, write):
+		start = time.time()
+		try:
+			load_path, compile = self._resolve(path, source_path)
+			asset = load(load_path)
+			if compile: self._compile(asset, source_path, write)
+			return asset
+		finally:
+			self.load_time += time.time() - start
+
+	def _model_source(self, path):
+		return path if os.path.splitext(path)[1] else path + '.egg'
+
+	def _setup_texture(self, tex):
+		tex.setMinfilter(Texture.FTLinearMipmapLinear)
+		tex.setAnisotropicDegree(2)
+		return tex
+
+	def model(self, path):
+		"""returns the cached model at path, which must not be changed"""
+		self.model_requests += 1
+		try:
+			return self.models[path]
+		except KeyError:
+			model = self.models[path] = self._load(path, self._model_source(path), self.loader.loadModel, write_model)
+			return model
+
+	def copy_model(self, path):
+		"""returns a copy of the model at path"""
+		return self.model(path).copyTo(self.copies)
+
+	def instance_model(self, path):
+		"""returns a new node with an instance of the model at path below
+		it. the node can be moved, tagged and textured like a copy"""
+		holder = self.copies.attachNewNode(path)
+		self.model(path).instanceTo(holder)
+		return holder
+
+	def texture(self, path):
+		"""returns the texture at path, with mipmapping and anisotropic
+		filtering set up"""
+		self.texture_requests += 1
+		try:
+			return self.textures[path]
+		except KeyError:
+			tex = self.textures[path] = self._load(path, path, lambda path: self._setup_texture(self.loader.loadTexture(path)), write_texture)
+			return tex
+
+	def texture_file(self, path):
+		"""returns the texture to load for path: its atlas, if it is in one"""
+		region = self.atlas.regions.get(path) if self.atlas else None
+		if region: return self.atlas.images[region.atlas]
+		return path
+
+	def apply_texture(self, model, path, stage = None, priority = 1):
+		"""sets the texture at path on model, using its atlas if it is in one"""
+		stage = stage or TextureStage.getDefault()
+		region = self.atlas.regions.get(path) if self.atlas else None
+		if not region:
+			model.setTexture(stage, self.texture(path), priority)
+			return
+
+		model.setTexture(stage, self.texture(self.texture_file(path)), priority)
+		model.setTexOffset(stage, *region.offset)
+		model.setTexScale(stage, *region.scale)
+
+	def prefetch(self, models, textures, progress = None, done = None):
+		"""loads the models and textures at the given paths in the
+		background, so they are cached once they are asked for. models come
+		through the asynchronous loader, textures are read on a thread of
+		the assetLoading task chain. progress(loaded, total) is called as
+		assets arrive and done() once all are cached, both from the main
+		loop. assets already cached are skipped"""
+		models = [path for path in sorted(set(models)) if not path in self.models]
+		textures = [path for path in sorted(set(map(self.texture_file, textures))) if not path in self.textures]
+		total = len(models) + len(textures)
+
+		# filled by the loader and the loading thread, emptied by deliver
+		arrived = deque()
+		loaded = [0]
+
+		for path in models:
+			source_path = self._model_source(path)
+			load_path, compile = self._resolve(path, source_path)
+			self.loader.loadModel(load_path, callback = lambda model, path = path, source_path = source_path, compile = compile: arrived.append((path, source_path, compile, model, write_model)))
+
+		pending = deque((path,) + self._resolve(path, path) for path in textures)
+		def load_texture(task):
+			path, load_path, compile = pending.popleft()
+			tex = TexturePool.loadTexture(Filename.fromOsSpecific(load_path))
+			arrived.append((path, path, compile, tex, write_texture))
+			return task.cont if pending else task.done
+
+		def deliver(task):
+			while arrived:
+				path, source_path, compile, asset, write = arrived.popleft()
+				loaded[0] += 1
+
+				# failed loads are left to the synchronous path, which
+				# reports them
+				if asset:
+					if write == write_model: self.models[path] = asset
+					else: self.textures[path] = self._setup_texture(asset)
+					if compile: self._compile(asset, source_path, write)
+				if progress: progress(loaded[0], total)
+
+			if loaded[0] < total: return task.cont
+			if done: done()
+			return task.done
+
+		if pending:
+			taskMgr.setupTaskChain('assetLoading', numThreads = 1)
+			taskMgr.add(load_texture, 'loadTextures', taskChain = 'assetLoading')
+		if progress: progress(0, total)
+		taskMgr.add(deliver, 'deliverAssets')
+
+	def __str__(self):
+		s = '%d models loaded for %d requests, %d textures loaded for %d requests' % (len(self.models), self.model_requests, len(self.textures), self.texture_requests)
+		if self.atlas: s += ' (%d textures packed into %d atlases)' % (len(self.atlas.regions), len(self.atlas.images))
+		s += ', %d of them compiled, in %.0f ms' % (self.compiled_loads, 1000*self.load_time)
+		return s
+
+
 class SimpleTileset(object):
+	MODELS = ['models/chip', 'models/city', 'models/genericTile', 'models/harbor', 'models/road', 'models/robber']
+	TILES = [DesertTile, FieldsTile, ForestTile, HillsTile, MountainTile, PastureTile]
+
 	def __init__(self, base, tileset_path = 'tilesets/simple/'):
 		self.base = base
 		self.tileset_path = tileset_path
+		self.assets = AssetCache(base.loader, tileset_path)
+
+		# prepared models, textured once and handed out as instances
+		self.prepared = {}
+
+	def _prepared_model(self, key, prepare):
+		# returns an instance of the model prepare() returns, which is
+		# called once per key
+		if not key in self.prepared:
+			self.prepared[key] = prepare()
+		holder = self.assets.copies.attachNewNode('%s' % (key,))
+		self.prepared[key].instanceTo(holder)
+		return holder
 
 	def get_chip_model(self, number):
-		chipModel = self.base.loader.loadModel(self.tileset_path + 'models/chip')
-		tex = self.load_texture('textures/chip%d.png' % number)
-		chipModel.find('**/chip').setTexture(tex, 1)
-		return chipModel
+		def prepare():
+			chipModel = self.assets.copy_model('models/chip')
+			self.apply_texture(chipModel.find('**/chip'), 'textures/chip%d.png' % number)
+			return chipModel
+		return self._prepared_model(('chip', number), prepare)
 
 	def get_city_model(self):
-		return self.base.loader.loadModel(self.tileset_path + 'models/city')
+		return self.assets.copy_model('models/city')
+
+	def get_settlement_model(self):
+		# there is no settlement model yet, use a smaller city
+		model = self.assets.copy_model('models/city')
+		model.setScale(0.7)
+		return model
 
 	def get_harbor_model(self):
-		return self.base.loader.loadModel(self.tileset_path + 'models/harbor')
+		return self.assets.instance_model('models/harbor')
 
-	def get_player_texture(self, player):
-		return self.load_texture('textures/player%s.png' % player.color.capitalize())
+	def get_player_texture_path(self, color):
+		return 'textures/player%s.png' % color.capitalize()
 
 	def get_road_model(self):
-		return self.base.loader.loadModel(self.tileset_path + 'models/road')
+		return self.assets.copy_model('models/road')
 
 	def get_robber_model(self):
-		return self.base.loader.loadModel(self.tileset_path + 'models/robber')
+		return self.assets.instance_model('models/robber')
 
-	def get_tile_model_with_chip_offset(self, tile):
-		# load generic tile
-		tileModel = self.base.loader.loadModel(self.tileset_path + 'models/genericTile')
+	def prefetch(self, progress = None, done = None):
+		"""loads all models and textures of the tileset in the background,
+		see AssetCache.prefetch"""
+		textures = ['textures/chip%d.png' % n for n in range(2, 13) if n != 7]
+		textures += ['textures/%s.jpeg' % self.get_tile_texture_name(tile) for tile in self.TILES]
+		textures += ['textures/player%s.png' % color.capitalize() for color in Game.player_colors]
+		self.assets.prefetch(self.MODELS, textures, progress, done)
 
+	def get_tile_texture_name(self, tile_class):
+		texname = tile_class.__name__
+		return texname[0].lower() + texname[1:]
+
+	def get_tile_model_with_chip_offset(self, tile):
 		# texture
-		texname = tile.__class__.__name__
-		texname = texname[0].lower() + texname[1:]
-		tex = self.load_texture('textures/%s.jpeg' % texname)
-		tileModel.find('**/tile').setTexture(tex, 1)
+		texname = self.get_tile_texture_name(tile.__class__)
+
+		def prepare():
+			# generic tile, with the texture of the tile type
+			tileModel = self.assets.copy_model('models/genericTile')
+			self.apply_texture(tileModel.find('**/tile'), 'textures/%s.jpeg' % texname)
+			return tileModel
 
 		chip_offset = Vec3(0,0,0.001)
 
-		return (tileModel, chip_offset)
+		return (self._prepared_model(('tile', texname), prepare), chip_offset)
 
 	def load_texture(self, subpath):
-		tex = self.base.loader.loadTexture(self.tileset_path + subpath)
-		tex.setMinfilter(Texture.FTLinearMipmapLinear) # FIXME: refactor/combine
-		                                               #        load_texture methods
-		tex.setAnisotropicDegree(2)
-		return tex
+		return self.assets.texture(subpath)
+
+	def apply_texture(self, model, subpath, stage = None, priority = 1):
+		self.assets.apply_texture(model, subpath, stage, priority)
 
 
+# tile colors by resource, shown while the tileset is loading
+PLACEHOLDER_COLORS = {
+	'Brick': (0.7, 0.35, 0.25, 1),
+	'Grain': (0.9, 0.8, 0.35, 1),
+	'Lumber': (0.2, 0.45, 0.2, 1),
+	'Ore': (0.5, 0.5, 0.55, 1),
+	'Wool': (0.6, 0.8, 0.4, 1),
+	None: (0.85, 0.75, 0.55, 1),
+}
+
 class BoardRenderer(object):
-	def __init__(self, base, board, tileset = None, x_stretch = 3/2., y_stretch = sqrt(3)/2., z_plane = 0):
+	"""Builds the scene for a board.
+
+	Tiles, chips and harbors never move, so with flatten set they are
+	gathered below static_root and flattened into a few geoms per texture.
+	The models of single tiles are gone after that, so nothing is picked
+	through the scene graph: pick intersects the mouse ray with the board
+	plane and looks up tile, node and edge in closed form (see
+	BoardPicker).
+
+	With asynchronous set, the tileset is loaded in the background and the
+	board is shown as plain hexagons until it is there (see build).
+	progress is passed on to SimpleTileset.prefetch.
+
+	The scene is built below root, a new node below parent (render by
+	default), and removed with it by destroy."""
+	@timed('App:Renderer:construct')
+	def __init__(self, base, board, tileset = None, x_stretch = 3/2., y_stretch = sqrt(3)/2., z_plane = 0, flatten = True, asynchronous = False, progress = None, parent = None):
 		self.base = base
+		self.root = (parent or base.render).attachNewNode('board')
 		self.board = board
 		self.tileset = tileset or SimpleTileset(base)
 		self.x_stretch = x_stretch
 		self.y_stretch = y_stretch
 		self.z_plane = 0
+		self.flatten = flatten
+		self.picker = BoardPicker(board.topology, x_stretch, y_stretch)
+
+		self.static_root = NodePath('boardStatic')
+		self.placeholder_root = None
+
+		# buildings, roads and the robber change during a game. their
+		# models are kept by node, edge and tile, so a change reported by
+		# the board only touches the models affected by it
+		self.building_models = {}
+		self.road_models = {}
+		self.robber_model = None
+
+		self.ready = False
+		self.destroyed = False
+
+		if asynchronous:
+			# plain hexagons stand in for the tiles until the tileset is
+			# loaded, so the first frame does not wait for it
+			self.placeholder_root = self.create_placeholders()
+			self.placeholder_root.reparentTo(self.root)
+			self.tileset.prefetch(progress, self.build)
+		else:
+			self.build()
+
+	@timed('App:Renderer:build')
+	def build(self):
+		"""places the models of the board and starts following it"""
+		if self.destroyed: return
+		if self.placeholder_root:
+			self.placeholder_root.removeNode()
+			self.placeholder_root = None
 
 		# we get s == 1 by using to tile-scaling
 		# the projection of the tile uses integers, multiplying by
 		# x and y stretch should result in correct coordinates
-		for pos, tile in board.tiles.iteritems():
+		for pos, tile in self.board.tiles.iteritems():
 			# load model
 			(tileModel, chip_offset) = self.tileset.get_tile_model_with_chip_offset(tile)
 
 			# calculate position
 			tile_coordinates = self.get_tile_coordinates(pos)
 			tileModel.setPos(*tile_coordinates)
-			tileModel.setTag('pickable', 'True')
+			if not self.flatten: tileModel.setTag('pickable', 'True')
 
 			# load and place chip
 			if tile.number:
 				chipModel = self.tileset.get_chip_model(tile.number)
 				chipModel.setPos(chip_offset)
 				chipModel.reparentTo(tileModel)
-				chipModel.setTag('pickable', 'False')
+				if not self.flatten: chipModel.setTag('pickable', 'False')
 
 			# render
-			tileModel.reparentTo(base.render)
-
-		# handle graph nodes
-		for n in self.board.network.nodes_iter():
-			building = self.board.network.node[n].get('building',None)
-			if building == 'city':
-				cityModel = self.tileset.get_city_model()
-				self.apply_player_texture(cityModel, self.board.network.node[n]['player'])
-				cityModel.setH(random.random()*360) # rotation randomly
-				cityModel.setPos(*self.get_node_coordinates(n))
-				cityModel.reparentTo(base.render)
-				cityModel.setTag('pickable', 'True')
-
-		# handle graph edges
-		for e in self.board.network.edges_iter():
-			if 'road' in self.board.network.edge[e[0]][e[1]]:
-				roadModel = self.tileset.get_road_model()
-				self.apply_player_texture(roadModel, self.board.network.edge[e[0]][e[1]]['player'])
-
-				# get coordinates
-				co_s, co_t = map(self.get_node_coordinates, e)
-
-				# align
-				mat = align_to_vector(co_t-co_s)
-				roadModel.setTransform(TransformState.makeMat(mat))
-
-				roadModel.setPos(co_s)
-				roadModel.reparentTo(base.render)
-				roadModel.setTag('pickable', 'True')
-
-		# place robber
-		if self.board.robber:
-			robberModel = self.tileset.get_robber_model()
-			robberModel.setPos(*self.get_tile_coordinates(self.board.robber))
-			robberModel.reparentTo(base.render)
-			robberModel.setTag('pickable', 'True')
+			tileModel.reparentTo(self.static_root)
 
 		# place harbors
 		try:
@@ -177,11 +455,143 @@ class BoardRenderer(object):
 					harborModel.setTransform(TransformState.makeMat(mat))
 
 					harborModel.setPos(h1)
-					harborModel.setTag('pickable', 'True')
-					harborModel.reparentTo(base.render)
+					if not self.flatten: harborModel.setTag('pickable', 'True')
+					harborModel.reparentTo(self.static_root)
 		except StopIteration:
 			pass
 
+		# combine the static geometry, by texture
+		if self.flatten: self.static_root.flattenStrong()
+		self.static_root.reparentTo(self.root)
+
+		for n in self.board.network.nodes_iter():
+			self.update_building(n)
+		for u, v in self.board.network.edges_iter():
+			self.update_road(u, v)
+		self.update_robber()
+
+		self.board.add_observer(self.on_board_change)
+		self.ready = True
+
+	def create_placeholders(self):
+		"""returns a node with a hexagon for each tile, colored by its
+		resource, as a single geom"""
+		vdata = GeomVertexData('placeholders', GeomVertexFormat.getV3c4(), Geom.UHStatic)
+		vertices = GeomVertexWriter(vdata, 'vertex')
+		colors = GeomVertexWriter(vdata, 'color')
+		triangles = GeomTriangles(Geom.UHStatic)
+
+		corners = [(cos(i*pi/3), sin(i*pi/3)) for i in range(0, 6)]
+		for t, (pos, tile) in enumerate(self.board.tiles.iteritems()):
+			x, y, z = self.get_tile_coordinates(pos)
+			color = PLACEHOLDER_COLORS.get(tile.resource, PLACEHOLDER_COLORS[None])
+			for cx, cy in corners:
+				vertices.addData3f(x + cx, y + cy, z)
+				colors.addData4f(*color)
+
+			# a fan of four triangles per hexagon
+			for i in range(1, 5):
+				triangles.addVertices(6*t, 6*t + i, 6*t + i + 1)
+
+		geom = Geom(vdata)
+		geom.addPrimitive(triangles)
+		node = GeomNode('boardPlaceholders')
+		node.addGeom(geom)
+		return NodePath(node)
+
+	def destroy(self):
+		"""removes the scene and stops following the board"""
+		self.destroyed = True
+		if self.ready: self.board.remove_observer(self.on_board_change)
+		self.root.removeNode()
+
+	def on_board_change(self, change, *args):
+		if 'building' == change: self.update_building(*args)
+		elif 'road' == change: self.update_road(*args)
+		elif 'robber' == change: self.update_robber()
+
+	def update_building(self, node_id):
+		"""replaces the model of the building on node_id"""
+		model = self.building_models.pop(node_id, None)
+		if model: model.removeNode()
+
+		color, building = self.board.building_owner(node_id)
+		if not building: return
+
+		if 'city' == building: model = self.tileset.get_city_model()
+		else: model = self.tileset.get_settlement_model()
+		self.apply_player_texture(model, color)
+		model.setH(random.random()*360) # rotation randomly
+		model.setPos(*self.get_node_coordinates(node_id))
+		model.reparentTo(self.root)
+		model.setTag('pickable', 'True')
+		self.building_models[node_id] = model
+
+	def update_road(self, u, v):
+		"""replaces the model of the road between u and v"""
+		key = (min(u, v), max(u, v))
+		model = self.road_models.pop(key, None)
+		if model: model.removeNode()
+
+		color = self.board.road_owner(u, v)
+		if not color: return
+
+		roadModel = self.tileset.get_road_model()
+		self.apply_player_texture(roadModel, color)
+
+		# get coordinates
+		co_s, co_t = map(self.get_node_coordinates, key)
+
+		# align
+		mat = align_to_vector(co_t-co_s)
+		roadModel.setTransform(TransformState.makeMat(mat))
+
+		roadModel.setPos(co_s)
+		roadModel.reparentTo(self.root)
+		roadModel.setTag('pickable', 'True')
+		self.road_models[key] = roadModel
+
+	def update_robber(self):
+		"""moves the robber to where it is on the board"""
+		if not self.board.robber:
+			if self.robber_model: self.robber_model.removeNode()
+			self.robber_model = None
+			return
+
+		if not self.robber_model:
+			self.robber_model = self.tileset.get_robber_model()
+			self.robber_model.reparentTo(self.root)
+			self.robber_model.setTag('pickable', 'True')
+		self.robber_model.setPos(*self.get_tile_coordinates(self.board.robber))
+
+	def board_point(self, mouse_pos):
+		"""returns the point on the board plane under mouse_pos (in film
+		coordinates, as given by the mouse watcher), or None"""
+		near, far = Point3(), Point3()
+		if not self.base.camLens.extrude(mouse_pos, near, far): return None
+
+		render = self.base.render
+		near = render.getRelativePoint(self.base.cam, near)
+		far = render.getRelativePoint(self.base.cam, far)
+
+		# the ray near + t*(far-near) meets the plane z == z_plane at
+		dz = far[2] - near[2]
+		if abs(dz) < 1e-9: return None
+		t = (self.z_plane - near[2]) / dz
+		if t < 0: return None
+		return near + (far - near) * t
+
+	@timed('App:Picking')
+	def pick(self, mouse_pos):
+		"""returns (point, tile, node, edge) under mouse_pos. all of them are
+		None if the mouse points above the horizon, tile, node and edge are
+		None off the board"""
+		point = self.board_point(mouse_pos)
+		if not point: return None, None, None, None
+
+		x, y = point[0], point[1]
+		return point, self.picker.tile_at(x, y), self.picker.node_at(x, y), self.picker.edge_at(x, y)
+
 	def get_tile_coordinates(self, pos):
 		x, y = pos.get_projected_coords()
 		return Vec3(x*self.x_stretch, y*self.y_stretch, self.z_plane)
@@ -190,20 +600,66 @@ class BoardRenderer(object):
 		a, b, c = map(self.get_tile_coordinates, node_id)
 		return Vec3((a[0]+b[0]+c[0])/3., (a[1]+b[1]+c[1])/3., (a[2]+b[2]+c[2])/3.)
 
-	def apply_player_texture(self, model, player, player_index = 0):
-		# load texture
-		tex = self.tileset.get_player_texture(player)
+	def apply_player_texture(self, model, color, player_index = 0):
+		# owners on the board are player colors, as set by the actions
+		texture_path = self.tileset.get_player_texture_path(color)
 
 		for path in model.findAllMatches('**/playerColor%d*' % player_index):
-			path.setTexture(tex)
+			self.tileset.apply_texture(path, texture_path, priority = 0)
+
+
+class HoverPicker(object):
+	"""Follows what is under the mouse on the board.
+
+	update is cheap unless the mouse or the camera moved since the last
+	call: only then the board is picked again (see BoardRenderer.pick). If
+	that changes the target, the observers are called with the new
+	(point, tile, node, edge), the same tuple kept as target."""
+	def __init__(self, renderer, mouse_watcher, camera):
+		self.renderer = renderer
+		self.mouse_watcher = mouse_watcher
+		self.camera = camera
+		self.observers = []
+
+		self.mouse = None
+		self.camera_mat = None
+		self.target = (None, None, None, None)
+		self.picks = 0
+
+	def add_observer(self, observer):
+		self.observers.append(observer)
+
+	def remove_observer(self, observer):
+		self.observers.remove(observer)
+
+	def update(self):
+		"""picks again if the inputs changed, returns whether the target
+		changed"""
+		mouse = tuple(self.mouse_watcher.getMouse()) if self.mouse_watcher.hasMouse() else None
+		camera_mat = Mat4(self.camera.getMat(self.renderer.base.render))
+		if mouse == self.mouse and self.camera_mat is not None and camera_mat == self.camera_mat: return False
+
+		self.mouse, self.camera_mat = mouse, camera_mat
+		self.picks += 1
+		target = self.renderer.pick(Point2(*mouse)) if mouse else (None, None, None, None)
+		if target == self.target: return False
+
+		self.target = target
+		for observer in self.observers:
+			observer(*target)
+		return True
 
 
 class HandRenderer(object):
-	def __init__(self, base, player, card_size = 0.2, width = 0.5, card_x_overlap = 0.2, card_y_overlap = 0.8):
+	"""Shows the cards of a player. With asynchronous set, blank cards are
+	shown until the card model and textures are loaded in the background,
+	progress is passed on to AssetCache.prefetch."""
+	def __init__(self, base, player, card_size = 0.2, width = 0.5, card_x_overlap = 0.2, card_y_overlap = 0.8, asynchronous = False, progress = None):
 		self.base = base
 		self.player = player
+		self.assets = AssetCache(base.loader)
+		self.cards = []
 
-		aspect_ratio = self.base.getAspectRatio()
 		self.card_size = card_size # a card size of 1 makes it 2/3 of the screen high
 		                           # cards have a ration of 1:1.555
 
@@ -213,8 +669,24 @@ class HandRenderer(object):
 		self.card_x_overlap = card_x_overlap # percentage of card that overlaps onto next
 		self.card_y_overlap = card_y_overlap
 
-		card_x_offset = (1-card_x_overlap)*card_size
-		card_y_offset = (1.555-card_y_overlap)*card_size
+		if asynchronous:
+			self.show_cards(self.load_placeholder_card)
+			textures = ['textures/%sCard.png' % (resource[0].lower() + resource[1:]) for resource in player.resources]
+			self.assets.prefetch(['models/cardModel'], textures, progress, lambda: self.show_cards(self.load_card_model))
+		else:
+			self.show_cards(self.load_card_model)
+
+	def show_cards(self, load_card_model):
+		"""lays out the cards of the player, replacing those shown before"""
+		for cardModel in self.cards:
+			cardModel.removeNode()
+		self.cards = []
+
+		player = self.player
+		aspect_ratio = self.base.getAspectRatio()
+		card_size, width = self.card_size, self.width
+		card_x_offset = (1-self.card_x_overlap)*card_size
+		card_y_offset = (1.555-self.card_y_overlap)*card_size
 
 		# num cards to render
 		num_cards = sum(player.resources.values())
@@ -231,7 +703,7 @@ class HandRenderer(object):
 		resource_index = 0
 		for resource, amount in sorted(player.resources.iteritems()):
 			for i in xrange(0, amount): # arrangement depends on order in tree
-				cardModel = self.load_card_model(resource)
+				cardModel = load_card_model(resource)
 				cardModel.setScale(self.card_size, self.card_size, self.card_size)
 				cardModel.setPos(
 					# x - left/right
@@ -249,25 +721,26 @@ class HandRenderer(object):
 				# the behaviour of aspect2d is a bit strange,
 				# rotating the card always causes it be face-up
 				cardModel.reparentTo(self.base.aspect2d)
+				self.cards.append(cardModel)
 
 				resource_index += 1
 
+	def load_placeholder_card(self, face):
+		card = CardMaker('cardPlaceholder')
+		card.setFrame(0, 1, 0, 1.555)
+		card.setColor(0.9, 0.9, 0.85, 1)
+		return NodePath(card.generate())
+
 	def load_card_model(self, face):
 		facepart = face[0].lower() + face[1:]
-		model = self.base.loader.loadModel('models/cardModel')
-		tex = self.load_texture('textures/%sCard.png' % facepart)
-
+		model = self.assets.copy_model('models/cardModel')
 		# apply texture
-		model.setTexture(tex, 1)
+		self.assets.apply_texture(model, 'textures/%sCard.png' % facepart)
 
 		return model
 
 	def load_texture(self, path):
-		tex = self.base.loader.loadTexture(path)
-		tex.setMinfilter(Texture.FTLinearMipmapLinear) # FIXME: refactor/combine
-		                                               #        load_texture methods
-		tex.setAnisotropicDegree(2)
-		return tex
+		return self.assets.texture(path)
 
 
 class MyApp(ShowBase, DirectObject.DirectObject):
@@ -287,52 +760,20 @@ class MyApp(ShowBase, DirectObject.DirectObject):
 			# give the player some random resources
 			for resource in player.resources:
 				player.resources[resource] = random.randint(0,8)
-			while True:
-				n = random.choice(game.board.network.nodes())
-				if game.board.node_available(n):
-					game.board.update_building(n, player, 'city')
-
-					# place a random road
-					m = random.choice(game.board.network.neighbors(n))
-					game.board.network.edge[n][m]['road'] = True
-					game.board.network.edge[n][m]['player'] = player
-					break
-
-		self.board_renderer = BoardRenderer(self, game.board)
-		self.hand_renderer = HandRenderer(self, game.players.values()[0])
-
-		# setup some 3-point lighting for the whole board
-		lKey = DirectionalLight('lKey')
-		lKey.setColor(VBase4(0.9,0.9,0.9,1))
-		lKeyNode = render.attachNewNode(lKey)
-		lKeyNode.setH(-63)
-		lKeyNode.setP(-60)
-		lKeyNode.setR(-30)
-		render.setLight(lKeyNode)
-
-		lFill = DirectionalLight('lFill')
-		lFill.setColor(VBase4(0.4,0.4,0.4,1))
-		lFillNode = render.attachNewNode(lFill)
-		lFillNode.setH(27)
-		lFillNode.setP(-15)
-		lFillNode.setR(-30)
-		render.setLight(lFillNode)
-
-		lBack = DirectionalLight('lBack')
-		lBack.setColor(VBase4(0.3,0.3,0.3,1))
-		lBackNode = render.attachNewNode(lBack)
-		lBackNode.setH(177)
-		lBackNode.setP(-20)
-		lBackNode.setR(0)
-		render.setLight(lBackNode)
-
-		lBelow = DirectionalLight('lBelow')
-		lBelow.setColor(VBase4(0.4,0.4,0.4,1))
-		lBelowNode = render.attachNewNode(lBelow)
-		lBelowNode.setH(0)
-		lBelowNode.setP(90)
-		lBelowNode.setR(0)
-		render.setLight(lBelowNode)
+			n = random.choice(list(game.board.available_nodes()))
+			game.board.update_building(n, player.color, 'city')
+
+			# place a random road
+			m = random.choice(game.board.network.neighbors(n))
+			game.board.update_road(n, m, player.color)
+
+		# assets are loaded in the background, with the progress shown
+		self.loading = {}
+		self.loading_text = OnscreenText(pos = (0, 0.9), scale = 0.05, fg = (1, 1, 1, 1), mayChange = True)
+		self.board_renderer = BoardRenderer(self, game.board, asynchronous = True, progress = lambda loaded, total: self.on_loading('tileset', loaded, total))
+		self.hand_renderer = HandRenderer(self, game.players.values()[0], asynchronous = True, progress = lambda loaded, total: self.on_loading('cards', loaded, total))
+
+		setup_lights(self.render)
 
 		self.accept('a', self.on_toggle_anti_alias)
 		self.mouse_controlled = True
@@ -340,31 +781,35 @@ class MyApp(ShowBase, DirectObject.DirectObject):
 		self.accept('m', self.on_toggle_mouse_control)
 		self.accept('q', self.on_quit)
 
-		# onto-board selection collision test
-		select_mask = BitMask32(0x100)
-		self.select_ray = CollisionRay()
-		select_node = CollisionNode('mouseToSurfaceRay')
-		select_node.setFromCollideMask(select_mask)
-		select_node.addSolid(self.select_ray)
-		select_np = self.camera.attachNewNode(select_node)
-
-		self.select_queue = CollisionHandlerQueue()
-		self.select_traverser = CollisionTraverser()
-		self.select_traverser.addCollider(select_np, self.select_queue)
-
-		# create a plane that only collides with the mouse ray
-		select_plane = CollisionPlane(Plane(Vec3(0,0,1), Point3(0,0,0)))
-
-		# add plane to render
-		self.select_node = CollisionNode('boardCollisionPlane')
-		self.select_node.setCollideMask(select_mask)
-		self.select_node.addSolid(select_plane)
-		self.select_plane_np = self.render.attachNewNode(self.select_node)
+		self.accept('mouse1', self.on_pick)
 
+		# the point on the board under the mouse, found in closed form
+		self.mouse_target = None
 		self.debug_select = draw_debugging_arrow(self, Vec3(0,0,0), Vec3(0,1,0))
 
-		self.taskMgr.add(self.update_mouse_target, "mouseTarget")
-		self.taskMgr.add(self.update_debug_arrow, "updateDebugArrow")
+		# the board is only picked again when the mouse or the camera moved
+		self.hover = HoverPicker(self.board_renderer, self.mouseWatcherNode, self.camera)
+		self.hover.add_observer(self.on_hover)
+		self.taskMgr.add(timings.wrap_task('App:Tasks:hover', self.hover_task), "hover")
+
+		# frame times and the timings of the tasks, as percentiles over the
+		# last frames, are written on exit or when pressing t
+		self.timings_path = ConfigVariableString('frame-timings-csv', 'frametimes.csv').getValue()
+		self.taskMgr.add(self.record_frame_time_task, "recordFrameTime")
+		self.accept('t', self.on_write_timings)
+
+	def on_loading(self, name, loaded, total):
+		# both renderers report, the first of them before the second exists
+		self.loading[name] = (loaded, total)
+		if len(self.loading) < 2 or any(loaded < total for loaded, total in self.loading.values()):
+			self.loading_text.setText('loading ' + ', '.join('%s %d/%d' % (n, l, t) for n, (l, t) in sorted(self.loading.items())))
+			return
+
+		if self.loading_text:
+			self.loading_text.destroy()
+			self.loading_text = None
+		print "tileset: %s" % self.board_renderer.tileset.assets
+		print "cards: %s" % self.hand_renderer.assets
 
 	def on_toggle_anti_alias(self):
 		if AntialiasAttrib.MNone != render.getAntialias():
@@ -377,7 +822,7 @@ class MyApp(ShowBase, DirectObject.DirectObject):
 	def on_toggle_mouse_control(self):
 		if self.mouse_controlled:
 			self.disableMouse()
-			self.taskMgr.add(self.spin_camera_task, "spinCameraTask")
+			self.taskMgr.add(timings.wrap_task('App:Tasks:spinCamera', self.spin_camera_task), "spinCameraTask")
 		else: self.enableMouse()
 
 		self.mouse_controlled = not self.mouse_controlled
@@ -394,55 +839,58 @@ class MyApp(ShowBase, DirectObject.DirectObject):
 		if self.mouse_controlled: return Task.done
 		return Task.cont
 
-	def update_mouse_target(self, task):
-		if not base.mouseWatcherNode.hasMouse():
-			self.mouse_target = None
-			return Task.cont
-
-		# setup ray through camera position and mouse position (on camera plane)
-		mouse_pos = base.mouseWatcherNode.getMouse()
-		self.select_ray.setFromLens(self.board_renderer.base.camNode, mouse_pos.getX(), mouse_pos.getY())
-
-		self.select_traverser.traverse(self.board_renderer.base.render)
-
-		# abort if there's no collision
-		if not self.select_queue.getNumEntries(): return Task.cont
-
-		collision = self.select_queue.getEntry(0)
-		self.mouse_board_collision = collision.getSurfacePoint(collision.getIntoNodePath())
-		self.mouse_target = 'board'
-
+	def hover_task(self, task):
+		self.hover.update()
 		return Task.cont
 
-	def update_debug_arrow(self, task):
-		if self.mouse_target:
-			self.debug_select.setPos(self.mouse_board_collision)
-		return Task.cont
+	def on_hover(self, point, tile, node_id, edge):
+		self.mouse_target = 'board' if point else None
+		if point: self.debug_select.setPos(point)
 
 	def on_pick(self):
-		if not self._update_pick_ray(): return
+		if not base.mouseWatcherNode.hasMouse(): return
+
+		self.hover.update()
+		point, tile, node_id, edge = self.hover.target
+		print "picked tile %s, node %s, edge %s" % (tile, node_id, edge)
 
-		# traverse scene graph and determine nearest selection (if pickable)
-		self.pick_traverser.traverse(self.board_renderer.base.render)
-		self.pick_queue.sortEntries()
-		if not self.pick_queue.getNumEntries(): return
-		node = self.pick_queue.getEntry(0).getIntoNodePath().findNetTag('pickable')
-		if node.isEmpty() or node.getTag('pickable') == 'False': return
+		# color the building or road closest to the mouse
+		renderer = self.board_renderer
+		node = renderer.building_models.get(node_id)
+		if not node and edge: node = renderer.road_models.get((min(edge), max(edge)))
+		if not node: return
 
 		# add some color
 		ts = TextureStage('ts')
 		ts.setMode(TextureStage.MModulate)
 		colors = list(Game.player_colors)
 		colors.remove('white')
-		node.setTexture(ts, self.board_renderer.tileset.load_texture('textures/player%s.png' % random.choice(colors).capitalize()))
+		self.board_renderer.tileset.apply_texture(node, 'textures/player%s.png' % random.choice(colors).capitalize(), ts)
+
+	def record_frame_time_task(self, task):
+		timings.add('App:Frame', ClockObject.getGlobalClock().getDt())
+		return Task.cont
+
+	def on_write_timings(self):
+		timings.write_csv(self.timings_path)
+		print timings
+		print "timings written to %s" % self.timings_path
 
 	def on_quit(self):
+		self.on_write_timings()
 		sys.exit(0)
 
-# set some configuration
-ConfigVariableBool("show-frame-rate-meter").setValue(True)
+if __name__ == '__main__':
+	# set some configuration
+	ConfigVariableBool("show-frame-rate-meter").setValue(True)
+
+	start = time.time()
+	base = MyApp()
 
-base = MyApp()
+	# startup, up to the first frame, for comparing cold starts to starts
+	# with compiled assets
+	base.graphicsEngine.renderFrame()
+	print "first frame after %.2fs" % (time.time() - start)
 
-base.on_toggle_anti_alias()
-base.run()
+	base.on_toggle_anti_alias()
+	base.run()
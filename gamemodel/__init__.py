@@ -4,4 +4,13 @@
 import board
 import game
 import hexgrid
+import layout
+import network
+import picking
+import production
+import replay
+import server
+import simulation
 import tiles
+import topology
+import values
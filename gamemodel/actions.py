@@ -1,18 +1,49 @@
 #!/usr/bin/env python
 # coding=utf8
 
+from tiles import RESOURCES
+
 class IllegalActionException(Exception): pass
 
+def _lookup(items, i):
+	# serialized indices come from outside, do not count negative ones from
+	# the end
+	if i < 0: raise IndexError('Negative index %r.' % (i,))
+	return items[i]
+
+
 class BaseAction(object):
+	"""Actions change the game state. apply_unchecked returns the state
+	needed to revert the action again with undo; apply checks legality first,
+	records the action in the game's journal and returns an undo token,
+	(action, state), for Game.undo.
+
+	For the journal, actions are serialized to a tuple of a one letter code
+	and their arguments, using node, edge and tile indices instead of
+	positions."""
+	code = None
+
 	def assert_legal(self, game):
 		raise NotImplementedError
 
 	def apply_unchecked(self, game):
 		raise NotImplementedError
 
+	def undo(self, game, state):
+		raise NotImplementedError
+
+	def serialize(self, game):
+		raise NotImplementedError
+
+	@classmethod
+	def deserialize(_class, game, args):
+		raise NotImplementedError
+
 	def apply(self, game):
 		self.assert_legal(game)
-		self.apply_unchecked(game)
+		token = (self, self.apply_unchecked(game))
+		game.record(self)
+		return token
 
 class PlayerAction(BaseAction):
 	def __init__(self, player):
@@ -21,15 +52,46 @@ class PlayerAction(BaseAction):
 	def assert_legal(self, game):
 		if not self.player in game.players: raise IllegalActionException('Player %s not in the game.' % self.player)
 
+	def serialize(self, game):
+		return (self.code, self.player)
+
+	@classmethod
+	def deserialize(_class, game, args):
+		return _class(*args)
+
+
+class NodeAction(PlayerAction):
+	"""an action on a node, serialized as the node index"""
+	def __init__(self, player, node_id):
+		super(NodeAction, self).__init__(player)
+		self.node_id = node_id
+
+	def serialize(self, game):
+		return (self.code, self.player, game.board.topology.node_index[self.node_id])
+
+	@classmethod
+	def deserialize(_class, game, (player, n)):
+		return _class(player, _lookup(game.board.topology.nodes, n))
+
 
 class StartGameAction(PlayerAction):
+	code = 'G'
+
 	def apply_unchecked(self, game):
+		state = (game.random.getstate(), game.board, game.phase, game.turn_order)
+
 		# initialize the board
 		game.initialize_board()
 		game.phase = 'setup'
-		game.turn_order = game.players.keys()
+		game.turn_order = sorted(game.players.keys())
 		game.random.shuffle(game.turn_order)
 
+		return state
+
+	def undo(self, game, state):
+		random_state, game.board, game.phase, game.turn_order = state
+		game.random.setstate(random_state)
+
 	def assert_legal(self, game):
 		super(StartGameAction, self).assert_legal(game)
 
@@ -37,3 +99,288 @@ class StartGameAction(PlayerAction):
 		if not 'init' == game.phase: raise IllegalActionException('Can only start in init phase.')
 
 		if len(game.players) < 3: raise IllegalActionException('At least 3 players are needed to start the game.')
+
+
+class TurnAction(PlayerAction):
+	"""an action only the current player can take"""
+	phases = ('setup', 'main')
+
+	def assert_legal(self, game):
+		super(TurnAction, self).assert_legal(game)
+
+		if not game.phase in self.phases: raise IllegalActionException('Not possible in %s phase.' % game.phase)
+		if not game.current_player == self.player: raise IllegalActionException('It is not the turn of player %s.' % self.player)
+
+
+class BuildAction(TurnAction):
+	"""building a piece. during the main phase, the dice have to be rolled
+	first and the piece has to be paid for"""
+	piece = None
+
+	def assert_legal(self, game):
+		super(BuildAction, self).assert_legal(game)
+
+		if 'main' == game.phase:
+			if None == game.dice_roll: raise IllegalActionException('The dice have to be rolled first.')
+			if game.robber_pending: raise IllegalActionException('The robber has to be moved first.')
+			if not game.can_afford(self.player, self.piece): raise IllegalActionException('Player %s cannot afford a %s.' % (self.player, self.piece))
+		if game.pieces_left(self.player, self.piece) < 1: raise IllegalActionException('Player %s has no %s left.' % (self.player, self.piece))
+
+
+class BuildSettlementAction(BuildAction, NodeAction):
+	code = 'S'
+	piece = 'settlement'
+
+	def assert_legal(self, game):
+		super(BuildSettlementAction, self).assert_legal(game)
+
+		if not self.node_id in game.board.topology.node_index: raise IllegalActionException('No such node: %s.' % (self.node_id,))
+		if not game.board.node_available(self.node_id): raise IllegalActionException('Node %s is not available.' % (self.node_id,))
+
+		if 'setup' == game.phase:
+			if game.setup_settlement: raise IllegalActionException('Only one settlement can be placed per setup turn.')
+		elif not game.board.player_roads_at(self.node_id, self.player):
+			raise IllegalActionException('Settlements have to be connected to a road.')
+
+	def apply_unchecked(self, game):
+		state = (game.phase, game.winner, game.setup_settlement, {})
+		game.board.update_building(self.node_id, self.player, 'settlement')
+
+		if 'setup' == game.phase:
+			game.setup_settlement = self.node_id
+
+			# the second settlement yields its resources right away
+			if 1 == game.round:
+				gained = state[-1]
+				for resource in game.board.node_resource_iter(self.player, self.node_id):
+					if not resource: continue
+					gained[resource] = gained.get(resource, 0) + 1
+					game.players[self.player].resources[resource] += 1
+		else:
+			game.pay(self.player, self.piece)
+			game.check_victory(self.player)
+
+		return state
+
+	def undo(self, game, state):
+		game.phase, game.winner, game.setup_settlement, gained = state
+		game.board.update_building(self.node_id, None, None)
+
+		if 'main' == game.phase: game.pay(self.player, self.piece, -1)
+		for resource, amount in gained.iteritems():
+			game.players[self.player].resources[resource] -= amount
+
+
+class BuildCityAction(BuildAction, NodeAction):
+	code = 'C'
+	piece = 'city'
+	phases = ('main',)
+
+	def assert_legal(self, game):
+		super(BuildCityAction, self).assert_legal(game)
+
+		if not self.node_id in game.board.topology.node_index: raise IllegalActionException('No such node: %s.' % (self.node_id,))
+		if not (self.player, 'settlement') == game.board.building_owner(self.node_id):
+			raise IllegalActionException('Cities can only replace own settlements.')
+
+	def apply_unchecked(self, game):
+		state = (game.phase, game.winner)
+		game.board.update_building(self.node_id, self.player, 'city')
+		game.pay(self.player, self.piece)
+		game.check_victory(self.player)
+		return state
+
+	def undo(self, game, state):
+		game.phase, game.winner = state
+		game.board.update_building(self.node_id, self.player, 'settlement')
+		game.pay(self.player, self.piece, -1)
+
+
+class BuildRoadAction(BuildAction):
+	code = 'R'
+	piece = 'road'
+
+	def __init__(self, player, edge):
+		super(BuildRoadAction, self).__init__(player)
+		self.edge = edge
+
+	def serialize(self, game):
+		topology = game.board.topology
+		u, v = self.edge
+		return (self.code, self.player, topology.edge_between(topology.node_index[u], topology.node_index[v]))
+
+	@classmethod
+	def deserialize(_class, game, (player, e)):
+		topology = game.board.topology
+		u, v = _lookup(topology.edges, e)
+		return _class(player, (topology.nodes[u], topology.nodes[v]))
+
+	def assert_legal(self, game):
+		super(BuildRoadAction, self).assert_legal(game)
+
+		u, v = self.edge
+		try:
+			owner = game.board.road_owner(u, v)
+		except KeyError:
+			raise IllegalActionException('No such edge: %s.' % (self.edge,))
+		if owner: raise IllegalActionException('There already is a road on %s.' % (self.edge,))
+
+		if 'setup' == game.phase:
+			if not game.setup_settlement: raise IllegalActionException('The settlement has to be placed first.')
+			if game.setup_road: raise IllegalActionException('Only one road can be placed per setup turn.')
+			if not game.setup_settlement in self.edge: raise IllegalActionException('The road has to be next to the new settlement.')
+		elif not game.board.road_connects(u, v, self.player):
+			raise IllegalActionException('Roads have to be connected.')
+
+	def apply_unchecked(self, game):
+		state = game.setup_road
+		game.board.update_road(self.edge[0], self.edge[1], self.player)
+
+		if 'setup' == game.phase: game.setup_road = True
+		else: game.pay(self.player, self.piece)
+
+		return state
+
+	def undo(self, game, state):
+		game.setup_road = state
+		game.board.update_road(self.edge[0], self.edge[1], None)
+		if 'main' == game.phase: game.pay(self.player, self.piece, -1)
+
+
+class RollDiceAction(TurnAction):
+	code = 'D'
+	phases = ('main',)
+
+	def assert_legal(self, game):
+		super(RollDiceAction, self).assert_legal(game)
+		if not None == game.dice_roll: raise IllegalActionException('The dice have already been rolled.')
+
+	def apply_unchecked(self, game):
+		random_state = game.random.getstate()
+		game.dice_roll = game.random.randint(1,6) + game.random.randint(1,6)
+
+		gains = {}
+		if 7 == game.dice_roll:
+			game.robber_pending = True
+		else:
+			gains = game.board.production.gains(game.dice_roll)
+			for color, resources in gains.iteritems():
+				for resource, amount in resources.iteritems():
+					game.players[color].resources[resource] += amount
+
+		return (random_state, gains)
+
+	def undo(self, game, state):
+		random_state, gains = state
+		for color, resources in gains.iteritems():
+			for resource, amount in resources.iteritems():
+				game.players[color].resources[resource] -= amount
+
+		game.dice_roll = None
+		game.robber_pending = False
+		game.random.setstate(random_state)
+
+
+class MoveRobberAction(TurnAction):
+	code = 'B'
+	phases = ('main',)
+
+	def __init__(self, player, position):
+		super(MoveRobberAction, self).__init__(player)
+		self.position = position
+
+	def serialize(self, game):
+		return (self.code, self.player, game.board.topology.tile_index[self.position])
+
+	@classmethod
+	def deserialize(_class, game, (player, t)):
+		return _class(player, _lookup(game.board.topology.tiles, t))
+
+	def assert_legal(self, game):
+		super(MoveRobberAction, self).assert_legal(game)
+		if not game.robber_pending: raise IllegalActionException('The robber can only be moved after a 7.')
+		if not self.position in game.board.tiles: raise IllegalActionException('No such tile: %s.' % (self.position,))
+		if self.position == game.board.robber: raise IllegalActionException('The robber has to be moved to a different tile.')
+
+	def apply_unchecked(self, game):
+		state = game.board.robber
+		game.board.move_robber(self.position)
+		game.robber_pending = False
+		return state
+
+	def undo(self, game, state):
+		game.board.move_robber(state)
+		game.robber_pending = True
+
+
+class TradeAction(TurnAction):
+	"""trading with the bank: giving resources of one kind, at the rate of
+	the player (see Game.trade_ratio), for one resource of another kind"""
+	code = 'T'
+	phases = ('main',)
+
+	def __init__(self, player, give, get):
+		super(TradeAction, self).__init__(player)
+		self.give = give
+		self.get = get
+
+	def serialize(self, game):
+		return (self.code, self.player, self.give, self.get)
+
+	def assert_legal(self, game):
+		super(TradeAction, self).assert_legal(game)
+
+		if None == game.dice_roll: raise IllegalActionException('The dice have to be rolled first.')
+		if game.robber_pending: raise IllegalActionException('The robber has to be moved first.')
+		if not self.give in RESOURCES or not self.get in RESOURCES: raise IllegalActionException('Can only trade resources.')
+		if self.give == self.get: raise IllegalActionException('Cannot trade %s for itself.' % self.give)
+		if game.players[self.player].resources[self.give] < game.trade_ratio(self.player, self.give):
+			raise IllegalActionException('Player %s does not have enough %s.' % (self.player, self.give))
+
+	def apply_unchecked(self, game):
+		ratio = game.trade_ratio(self.player, self.give)
+		resources = game.players[self.player].resources
+		resources[self.give] -= ratio
+		resources[self.get] += 1
+		return ratio
+
+	def undo(self, game, ratio):
+		resources = game.players[self.player].resources
+		resources[self.give] += ratio
+		resources[self.get] -= 1
+
+
+class EndTurnAction(TurnAction):
+	code = 'E'
+
+	def assert_legal(self, game):
+		super(EndTurnAction, self).assert_legal(game)
+
+		if 'setup' == game.phase:
+			if not game.setup_settlement or not game.setup_road: raise IllegalActionException('A settlement and a road have to be placed first.')
+		else:
+			if None == game.dice_roll: raise IllegalActionException('The dice have to be rolled first.')
+			if game.robber_pending: raise IllegalActionException('The robber has to be moved first.')
+
+	def apply_unchecked(self, game):
+		state = (game.phase, game.turn, game.round, game.dice_roll, game.setup_settlement, game.setup_road)
+
+		game.dice_roll = None
+		game.setup_settlement = None
+		game.setup_road = False
+		game.next_turn()
+
+		# the setup phase lasts two rounds
+		if 'setup' == game.phase and 2 == game.round: game.phase = 'main'
+
+		return state
+
+	def undo(self, game, state):
+		game.phase, game.turn, game.round, game.dice_roll, game.setup_settlement, game.setup_road = state
+
+
+ACTIONS = dict((action.code, action) for action in [StartGameAction, BuildSettlementAction, BuildCityAction, BuildRoadAction, RollDiceAction, MoveRobberAction, TradeAction, EndTurnAction])
+
+def deserialize_action(game, entry):
+	"""turns a serialized action back into an action"""
+	return ACTIONS[entry[0]].deserialize(game, entry[1:])
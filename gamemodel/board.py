@@ -1,20 +1,82 @@
 #!/usr/bin/env python
 # coding=utf8
 
+from collections import defaultdict
+
 from tiles import *
 import networkx
 
 from hexgrid import HexPosition
+from layout import LayoutSampler
+from network import CompactNetwork
+from production import ProductionIndex
+from values import NodeValues
+from topology import BoardTopology
+
+def _copy_graph(graph):
+	# Graph.copy deep-copies everything. nodes and attribute values are
+	# immutable here, so only the attribute dicts are copied, keeping the
+	# dict of each edge shared between both of its directions. hashing node
+	# ids is the bulk of the work, so every key is hashed as few times as
+	# possible: neighbor dicts are copied whole and their values replaced
+	copy = graph.__class__()
+	copy.graph = graph.graph.copy()
+	copy.node = dict((n, attributes.copy()) for n, attributes in graph.node.iteritems())
+	copy.adj = copy.edge = dict((n, neighbors.copy()) for n, neighbors in graph.adj.iteritems())
+
+	copies = {}
+	for neighbors in copy.adj.itervalues():
+		for v, attributes in neighbors.iteritems():
+			try:
+				neighbors[v] = copies[id(attributes)]
+			except KeyError:
+				neighbors[v] = copies[id(attributes)] = attributes.copy()
+	return copy
+
 
 class Board(object):
-	def __init__(self, random):
+	def __init__(self, random, compact = False):
 		# tiles have cube-coordinates: (x,y,z) with x+y+z == 0
 		self.tiles = {}
+		# with compact set, the network is replaced by a CompactNetwork
+		# once the board is generated
+		self.compact = compact
 		self.network = networkx.Graph()
+		self.topology = None
 		self.dice_map = {}
 		self.robber = None
+
+		# the harbor on each node (by node index), fixed once generated
+		self.harbors = None
 		self.random = random
 
+		# number of buildings on or next to each node (by node index), a
+		# node is available while this is zero. _available holds the
+		# indices of all available nodes
+		self._blocked = None
+		self._available = None
+
+		# number of settlements and cities per player, the (player, building)
+		# on each node (by node index) and the node indices of each player's
+		# buildings
+		self._settlements = {}
+		self._cities = {}
+		self._buildings = None
+		self._player_nodes = {}
+
+		# owner of the road on each edge (by edge index), number of roads
+		# per player and the edge indices of each player's roads
+		self._roads = None
+		self._road_counts = {}
+		self._player_roads = {}
+
+		self._production = None
+		self._values = None
+
+		# called after buildings, roads or the robber change, see
+		# add_observer
+		self.observers = []
+
 	def __str__(self):
 		s = "Board\n=====\n"
 		for pos, tile in self.tiles.iteritems():
@@ -23,130 +85,124 @@ class Board(object):
 			s += "\n"
 		return s
 
-	def generate_board(self, setup = STANDARD_BOARD_TILES, chips = STANDARD_BOARD_CHIPS):
-		stack = TileStack(self.random, setup)
-
+	def generate_board(self, setup = STANDARD_BOARD_TILES, chips = STANDARD_BOARD_CHIPS, harbors = STANDARD_HARBORS, sampler = None):
+		"""lays out tiles, chips and harbors. sampler is the LayoutSampler
+		used to draw the layout, e.g. LayoutSampler.balanced() for a board
+		satisfying some fairness constraints"""
 		# determine board radius
-		l = len(stack.tiles)-1
+		l = sum(setup.itervalues())-1
 		r = 0
 		while l > 0:
 			r += 1
 			l -= r*6
 		self.radius = r
+		self.topology = BoardTopology.for_radius(r)
 
-		# we will walk from the inside to the outside, so reverse
-		# the chip order
-		chipstack = chips[:]
+		layout = (sampler or LayoutSampler()).sample(self.random, self.topology, setup, chips)
+		for pos, tile_class, number in layout:
+			self.tiles[pos] = tile = tile_class()
+			tile.position = pos
 
-		# spiral walk to create board
-		# use a random direction
-		for pos in HexPosition.walk_spiral(r, self.random.choice(HexPosition.directions)):
-			# first, put down tile
-			self.tiles[pos] = stack.get_random_tile()()
-			self.tiles[pos].position = pos
-
-			# then place a chip on top, if it's not a desert
-			if self.tiles[pos].resource:
-				self.tiles[pos].number = chipstack.pop()
-			else:
-				# place robber on desert at start
-				self.robber = pos
+			# deserts have no chip, the robber starts there
+			if tile.resource: tile.number = number
+			else: self.robber = pos
 
 			# for easy lookup, register in dice_map
-			self.dice_map.setdefault(self.tiles[pos].number, []).append(self.tiles[pos])
-
-		# create network on top of tiles
-		for pos, tile in self.tiles.iteritems():
-			nodes = []
-			for i in range(0,len(HexPosition.directions)):
-				p1, p2 = HexPosition.directions[i], HexPosition.directions[(i+1)%len(HexPosition.directions)]
-				node_id = tuple(sorted([pos+p1, pos+p2, pos]))
-
-				# add node
-				self.network.add_node(node_id)
-				nodes.append(node_id)
-
-			# add connecting edges
-			for i in range(0, len(nodes)):
-				self.network.add_edge(nodes[i], nodes[(i+1)%len(nodes)])
+			self.dice_map.setdefault(tile.number, []).append(tile)
 
-		def harbor_placement():
-			# 1, 1, 2, 1, 1, 2, ...
-			order = (True, True, False) * 2 + (True, True, False, False)
+		# create network on top of tiles, using the shared topology
+		if self.compact:
+			self.network = CompactNetwork(self.topology)
+		else:
+			self.network.add_nodes_from(self.topology.nodes)
+			self.network.add_edges_from(self.topology.edge_ids())
 
-			# start with 1
-			i = 3
-			while True:
-				yield order[i]
-				i = (i+1)%len(order)
-
-		harbor_place = harbor_placement()
-		harbors = STANDARD_HARBORS[:]
+		harbors = harbors[:]
 
 		# disable this to not shuffle harbors
 		self.random.shuffle(harbors)
 
-		prev = False
-		for node_id in self.walk_coast():
-			if harbor_place.next():
-				if not prev: harbor = harbors.pop(0)
-				self.network.node[node_id]['harbor'] = harbor
-				prev = True
-			else:
-				prev = False
+		self.harbors = [None] * len(self.topology.nodes)
+		for slot in self.topology.harbor_slots:
+			# larger boards have more slots than harbors
+			if not harbors: break
+			harbor = harbors.pop(0)
+			for n in slot:
+				self.network.node[self.topology.nodes[n]]['harbor'] = harbor
+				self.harbors[n] = harbor
+
+		self._blocked = bytearray(len(self.topology.nodes))
+		self._available = set(range(0, len(self.topology.nodes)))
+		self._buildings = [None] * len(self.topology.nodes)
+		self._roads = [None] * len(self.topology.edges)
+
+	def clone(self, random):
+		"""returns a copy of the board using random as its random generator.
+		the topology, tiles and production index are shared, only the state
+		that changes during a game is copied. with networkx, that is the
+		attribute dicts of all nodes and edges; compact boards copy a few
+		arrays instead"""
+		board = Board.__new__(Board)
+		board.__dict__.update(self.__dict__)
+		board.random = random
+
+		if isinstance(self.network, CompactNetwork): board.network = self.network.copy()
+		else: board.network = _copy_graph(self.network)
+		board.observers = []
+		board._blocked = bytearray(self._blocked)
+		board._available = set(self._available)
+		board._settlements = self._settlements.copy()
+		board._cities = self._cities.copy()
+		board._buildings = self._buildings[:]
+		board._player_nodes = dict((player, set(nodes)) for player, nodes in self._player_nodes.iteritems())
+		board._roads = self._roads[:]
+		board._road_counts = self._road_counts.copy()
+		board._player_roads = dict((player, set(edges)) for player, edges in self._player_roads.iteritems())
+		if self._production: board._production = self._production.copy_for(board)
+		if self._values: board._values = self._values.copy_for(board)
+
+		return board
+
+	@property
+	def production(self):
+		"""the ProductionIndex of this board, created on first access"""
+		if not self._production: self._production = ProductionIndex(self)
+		return self._production
+
+	@property
+	def values(self):
+		"""the NodeValues of this board, created on first access"""
+		if not self._values: self._values = NodeValues(self)
+		return self._values
 
 	def walk_coast(self):
 		"""walk along the coast, radius r"""
-		# starting top right tile, top node
-		start_tile = HexPosition(self.radius+1, 0, -self.radius-1)
-		starting_node = tuple(sorted((start_tile, start_tile+HexPosition.directions[-1], start_tile+HexPosition.directions[-2])))
-
-		yield starting_node
-		node_id = starting_node
-		prev_node = node_id
-
-		# try all neighbours
-		candidates = self.network.neighbors(node_id)
-		while candidates:
-			n = candidates.pop()
-
-			# if we visited it just before, skip it
-			if prev_node == n: continue
-
-			# end once we reach the start again
-			if starting_node == n: break
-
-			# must be a node on the coast, i.e. bordering on at least one land (r-1) and sea (r) tile
-			sea, land = False, False
-			for tile_pos in n:
-				distance = tile_pos.distance_to(HexPosition.origin)
-				if distance >= self.radius+1: sea = True
-				else: land = True
-
-			# if it's not a coastal node, skip it
-			if not sea or not land:
-				continue
-
-			# it's a non-visited coastal node - move on to it
-			prev_node = node_id
-			node_id = n
-			yield node_id
-
-			# start with the next set of neighbours
-			candidates = self.network.neighbors(node_id)
+		nodes = self.topology.nodes
+		return (nodes[n] for n in self.topology.coast)
 
 	def node_available(self, node_id):
-		if 'building' in self.network.node[node_id]: return False
+		"""checks whether a settlement may be placed on node_id, i.e. neither
+		the node nor any of its neighbours has a building"""
+		return not self._blocked[self.topology.node_index[node_id]]
+
+	def available_nodes(self):
+		"""iterates over all nodes a settlement may be placed on"""
+		nodes = self.topology.nodes
+		return (nodes[n] for n in list(self._available))
 
-		# check if neighbours have buildings
-		for n in self.network.neighbors(node_id):
-			if 'building' in self.network.node[n]: return False
-		return True
+	def available_indices(self):
+		"""returns the indices of all available nodes, sorted"""
+		return sorted(self._available)
 
 	def count_buildings(self):
 		"""count the number of settlements/cities, returns a tuple of
 		(settlements, cities), each being a dictionary of counts for
 		each player"""
+		return (defaultdict(lambda: 0, self._settlements), defaultdict(lambda: 0, self._cities))
+
+	def scan_buildings(self):
+		"""same as count_buildings, but counts by scanning the whole network
+		instead of using the counters kept by update_building"""
 		settlements = defaultdict(lambda: 0)
 		cities = defaultdict(lambda: 0)
 
@@ -157,14 +213,176 @@ class Board(object):
 			elif 'settlement' == building:
 				settlements[self.network.node[n]['player']] += 1
 
-			self.network.node[n]
-
 		return (settlements, cities)
 
+	def building_counts_consistent(self):
+		"""checks the building counters against a full scan"""
+		return self.scan_buildings() == self.count_buildings()
+
 	def update_building(self, node_id, player, building):
-		self.network.node[node_id]['player'] = player
-		self.network.node[node_id]['building'] = building
+		"""places or upgrades a building, or removes it if building is None.
+		buildings must not be changed in the network directly, as this
+		keeps track of available nodes"""
+		attributes = self.network.node[node_id]
+		had_building = 'building' in attributes
+		n = self.topology.node_index[node_id]
+
+		if had_building:
+			self._count_building(attributes['player'], attributes['building'], -1)
+			self._player_nodes[attributes['player']].discard(n)
+		if building:
+			self._count_building(player, building, 1)
+			self._player_nodes.setdefault(player, set()).add(n)
+		self._buildings[n] = (player, building) if building else None
+
+		if building:
+			attributes['player'] = player
+			attributes['building'] = building
+		else:
+			attributes.pop('player', None)
+			attributes.pop('building', None)
+
+		if had_building != bool(building):
+			self._block(n, 1 if building else -1)
+
+		if self.observers: self._notify('building', node_id)
+
+	def _count_building(self, player, building, delta):
+		if 'city' == building: counts = self._cities
+		elif 'settlement' == building: counts = self._settlements
+		else: return
+
+		counts[player] = counts.get(player, 0) + delta
+		if not counts[player]: del counts[player]
+
+	def _block(self, n, delta):
+		# update the blocked counts for node n and its neighbours
+		for m in (n,) + self.topology.neighbors[n]:
+			self._blocked[m] += delta
+			if self._blocked[m]: self._available.discard(m)
+			else: self._available.add(m)
 
 	def node_resource_iter(self, player, node_id):
 		for tile_pos in node_id:
-			yield self.tiles[tile_pos].resource
+			# skip the sea
+			if tile_pos in self.tiles: yield self.tiles[tile_pos].resource
+
+	def update_road(self, u, v, player):
+		"""places a road between nodes u and v, or removes it if player is
+		None. like buildings, roads must only be changed through this"""
+		e = self.topology.edge_between(self.topology.node_index[u], self.topology.node_index[v])
+		attributes = self.network.edge[u][v]
+
+		if self._roads[e]:
+			self._count_road(self._roads[e], -1)
+			self._player_roads[self._roads[e]].discard(e)
+		if player:
+			attributes['road'] = True
+			attributes['player'] = player
+			self._count_road(player, 1)
+			self._player_roads.setdefault(player, set()).add(e)
+		else:
+			attributes.pop('road', None)
+			attributes.pop('player', None)
+
+		self._roads[e] = player
+
+		if self.observers: self._notify('road', u, v)
+
+	def _count_road(self, player, delta):
+		self._road_counts[player] = self._road_counts.get(player, 0) + delta
+		if not self._road_counts[player]: del self._road_counts[player]
+
+	def road_owner(self, u, v):
+		"""returns the owner of the road between u and v, or None"""
+		return self._roads[self.topology.edge_between(self.topology.node_index[u], self.topology.node_index[v])]
+
+	def count_roads(self):
+		"""returns the number of roads of each player"""
+		return defaultdict(lambda: 0, self._road_counts)
+
+	def building_owner(self, node_id):
+		"""returns (player, building) for the building on node_id, or
+		(None, None)"""
+		return self._buildings[self.topology.node_index[node_id]] or (None, None)
+
+	def player_nodes(self, player):
+		"""returns the indices of the nodes with buildings of player"""
+		return self._player_nodes.get(player, frozenset())
+
+	def player_roads(self, player):
+		"""returns the indices of the edges with roads of player"""
+		return self._player_roads.get(player, frozenset())
+
+	def road_connects(self, u, v, player):
+		"""checks whether a road of player between u and v would be connected
+		to one of the player's roads or buildings. roads cannot be connected
+		through buildings of other players"""
+		topology = self.topology
+		e = topology.edge_between(topology.node_index[u], topology.node_index[v])
+
+		for node_id in u, v:
+			owner, building = self.building_owner(node_id)
+			if building:
+				if owner == player: return True
+				continue
+
+			n = topology.node_index[node_id]
+			for f in topology.node_edges[n]:
+				if f != e and self._roads[f] == player: return True
+		return False
+
+	def player_roads_at(self, node_id, player):
+		"""checks whether player has a road ending in node_id"""
+		for e in self.topology.node_edges[self.topology.node_index[node_id]]:
+			if self._roads[e] == player: return True
+		return False
+
+	def settlement_spots(self, player):
+		"""returns the indices of the available nodes player has a road to,
+		sorted"""
+		edges = self.topology.edges
+		return sorted(set(n for e in self.player_roads(player) for n in edges[e] if not self._blocked[n]))
+
+	def city_spots(self, player):
+		"""returns the indices of the nodes with settlements of player,
+		sorted"""
+		return sorted(n for n in self.player_nodes(player) if 'settlement' == self._buildings[n][1])
+
+	def road_spots(self, player):
+		"""returns the indices of the free edges a road of player would be
+		connected on (see road_connects), sorted"""
+		topology = self.topology
+
+		# roads can be continued from own buildings, and from the ends of
+		# own roads unless there is a building of another player
+		ends = set(self.player_nodes(player))
+		for e in self.player_roads(player):
+			for n in topology.edges[e]:
+				if not self._buildings[n]: ends.add(n)
+
+		return sorted(set(e for n in ends for e in self.free_edges(n)))
+
+	def free_edges(self, n):
+		"""returns the indices of the edges at node index n without a road"""
+		return [e for e in self.topology.node_edges[n] if not self._roads[e]]
+
+	def move_robber(self, pos):
+		old = self.robber
+		self.robber = pos
+
+		if self.observers: self._notify('robber', old)
+
+	def add_observer(self, observer):
+		"""registers a function to be called after each change, with
+		('building', node_id), ('road', u, v) or ('robber', old_position).
+		only changes made through update_building, update_road and
+		move_robber are reported. clones start without observers"""
+		self.observers.append(observer)
+
+	def remove_observer(self, observer):
+		self.observers.remove(observer)
+
+	def _notify(self, *change):
+		for observer in self.observers:
+			observer(*change)
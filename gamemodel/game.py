@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 # coding=utf8
 
-from random import Random
+from random import Random, SystemRandom
 
 from board import Board
+from actions import StartGameAction, BuildSettlementAction, BuildCityAction, BuildRoadAction, RollDiceAction, MoveRobberAction, TradeAction, EndTurnAction
+from tiles import RESOURCES
 
 class Player(object):
 	def __init__(self, name, color):
@@ -17,6 +19,11 @@ class Player(object):
 			'Brick': 0
 		}
 
+	def copy(self):
+		player = Player(self.name, self.color)
+		player.resources = self.resources.copy()
+		return player
+
 
 class Game(object):
 	class ColorAlreadyTakenException(Exception): pass
@@ -24,16 +31,70 @@ class Game(object):
 	class WrongPhaseException(Exception): pass
 	player_colors = 'red', 'blue', 'green', 'orange', 'brown', 'white'
 
-	def __init__(self, random_seed = None):
+	costs = {
+		'road': {'Brick': 1, 'Lumber': 1},
+		'settlement': {'Brick': 1, 'Lumber': 1, 'Wool': 1, 'Grain': 1},
+		'city': {'Ore': 3, 'Grain': 2},
+	}
+	pieces = {'road': 15, 'settlement': 5, 'city': 4}
+	bank_trade_ratio = 4
+	victory_points_to_win = 10
+
+	def __init__(self, random_seed = None, compact_board = False):
 		self.board = None
+		self.compact_board = compact_board
 		self.players = {}
 		self.phase = 'init'
+
+		# without a seed, pick one, so the game can always be replayed
+		if None == random_seed: random_seed = SystemRandom().getrandbits(64)
 		self.initial_seed = random_seed
 		self.random = Random(random_seed)
 
+		# everything that happened in the game, see record
+		self.journal = []
+
 		self.turn = 0
 		self.round = 0
 		self.turn_order = None
+		self.winner = None
+
+		# state of the current turn: the number rolled (main phase), whether
+		# the robber has to be moved after a 7 and, in the setup phase,
+		# the settlement and road placed
+		self.dice_roll = None
+		self.robber_pending = False
+		self.setup_settlement = None
+		self.setup_road = False
+
+	def clone(self):
+		"""returns an independent copy of the game. the board topology and
+		tiles are shared, only state that changes during play is copied.
+		games with a compact board clone several times faster, use them for
+		searches cloning a lot"""
+		game = Game.__new__(Game)
+		game.__dict__.update(self.__dict__)
+
+		# seeding with a constant is cheap, the state is replaced anyway
+		game.random = Random(0)
+		game.random.setstate(self.random.getstate())
+		game.players = dict((color, player.copy()) for color, player in self.players.iteritems())
+		if self.turn_order: game.turn_order = self.turn_order[:]
+		game.journal = self.journal[:]
+		if self.board: game.board = self.board.clone(game.random)
+
+		return game
+
+	def record(self, action):
+		"""appends an applied action to the journal"""
+		self.journal.append(action.serialize(self))
+
+	def undo(self, token):
+		"""reverts an action, token is the value returned by its apply. only
+		the last action applied can be undone"""
+		action, state = token
+		action.undo(self, state)
+		self.journal.pop()
 
 	@property
 	def current_player(self):
@@ -52,16 +113,112 @@ class Game(object):
 	def create_player(self, name, color = None):
 		if not 'init' == self.phase: raise self.WrongPhaseException('The game has already started, joining not possible.')
 		if len(self.players) == 4: raise self.TooManyPlayersException
+		entry = ('J', name, color)
 		color = color or self.random.choice(self.colors_still_available())
 		if color in self.players: raise self.ColorAlreadyTakenException('Color %s is already taken' % color)
 		self.players[color] = Player(name, color)
 
+		# joining is journaled as well, as choosing a color uses the random
+		# generator
+		self.journal.append(entry)
+
 	def colors_still_available(self):
 		cs = []
 		for col in self.player_colors:
 			if col not in self.players: cs.append(col)
 		return cs
 
+	def legal_actions(self):
+		"""returns a list of all legal actions of the current player (of any
+		player in the init phase). the actions are generated from the board
+		indexes instead of trying candidates with assert_legal, and are
+		ordered by node, edge and tile index"""
+		if 'init' == self.phase:
+			if len(self.players) < 3: return []
+			return [StartGameAction(color) for color in sorted(self.players)]
+		if not self.phase in ('setup', 'main'): return []
+
+		player = self.current_player
+		board = self.board
+		nodes = board.topology.nodes
+		edges = board.topology.edges
+
+		def road(e):
+			u, v = edges[e]
+			return BuildRoadAction(player, (nodes[u], nodes[v]))
+
+		if 'setup' == self.phase:
+			if not self.setup_settlement:
+				if self.pieces_left(player, 'settlement') < 1: return []
+				return [BuildSettlementAction(player, nodes[n]) for n in board.available_indices()]
+			if not self.setup_road:
+				if self.pieces_left(player, 'road') < 1: return []
+				n = board.topology.node_index[self.setup_settlement]
+				return [road(e) for e in sorted(board.free_edges(n))]
+			return [EndTurnAction(player)]
+
+		if None == self.dice_roll: return [RollDiceAction(player)]
+		if self.robber_pending:
+			return [MoveRobberAction(player, pos) for pos in board.topology.tiles if pos in board.tiles and pos != board.robber]
+
+		actions = [EndTurnAction(player)]
+		if self.can_afford(player, 'settlement') and self.pieces_left(player, 'settlement') > 0:
+			actions.extend(BuildSettlementAction(player, nodes[n]) for n in board.settlement_spots(player))
+		if self.can_afford(player, 'city') and self.pieces_left(player, 'city') > 0:
+			actions.extend(BuildCityAction(player, nodes[n]) for n in board.city_spots(player))
+		if self.can_afford(player, 'road') and self.pieces_left(player, 'road') > 0:
+			actions.extend(road(e) for e in board.road_spots(player))
+
+		resources = self.players[player].resources
+		for give in RESOURCES:
+			if resources[give] < self.trade_ratio(player, give): continue
+			actions.extend(TradeAction(player, give, get) for get in RESOURCES if get != give)
+		return actions
+
+	def can_afford(self, color, piece):
+		resources = self.players[color].resources
+		for resource, amount in self.costs[piece].iteritems():
+			if resources[resource] < amount: return False
+		return True
+
+	def pay(self, color, piece, sign = 1):
+		"""takes the cost of piece from a player, or gives it back if sign
+		is -1"""
+		resources = self.players[color].resources
+		for resource, amount in self.costs[piece].iteritems():
+			resources[resource] -= sign*amount
+
+	def trade_ratio(self, color, resource):
+		"""the number of resource color has to give for one other resource.
+		buildings on harbors lower it to 3, or to 2 for the harbor's resource"""
+		ratio = self.bank_trade_ratio
+		for n in self.board.player_nodes(color):
+			harbor = self.board.harbors[n]
+			if resource == harbor: return 2
+			if '3to1' == harbor: ratio = 3
+		return ratio
+
+	def pieces_left(self, color, piece):
+		settlements, cities = self.board.count_buildings()
+		if 'road' == piece: used = self.board.count_roads()[color]
+		elif 'settlement' == piece: used = settlements[color]
+		else: used = cities[color]
+		return self.pieces[piece] - used
+
+	def victory_points(self, color):
+		settlements, cities = self.board.count_buildings()
+		return settlements[color] + 2*cities[color]
+
+	def check_victory(self, color):
+		"""ends the game if color has enough victory points"""
+		if self.victory_points(color) >= self.victory_points_to_win:
+			self.phase = 'finished'
+			self.winner = color
+
+	def distribute_resources(self, number):
+		"""hands out the resources produced by a dice roll"""
+		self.board.production.distribute(number, self.players)
+
 	def initialize_board(self, *args, **kwargs):
-		self.board = Board(self.random)
+		self.board = Board(self.random, compact = self.compact_board)
 		self.board.generate_board(*args, **kwargs)
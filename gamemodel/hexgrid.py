@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 # coding=utf8
 
+from collections import OrderedDict
+from math import sqrt
+
 def signed_area(ps):
 	sum = 0
 	l = len(ps)
@@ -18,32 +21,89 @@ def is_counterclockwise(ps):
 
 
 class HexPosition(object):
+	"""a position on the hex grid, in cube coordinates (r+g+b == 0).
+
+	positions up to INTERN_RADIUS from the origin are interned: creating a
+	position with the same coordinates twice yields the very same instance.
+	this keeps the number of objects small even if millions of positions
+	are computed, but also means instances are immutable. positions further
+	out are created anew every time, so walking far off the board does not
+	grow the cache; they still compare and hash equal."""
 	class IllegalPositionException(Exception): pass
 
-	def __init__(self, r = 0, g = 0, b = 0):
-		if not r+g+b == 0: raise self.IllegalPositionException()
-		self._t = (r,g,b)
+	__slots__ = ('r', 'g', 'b', 'key', '_t', '_hash', '_neighbors')
+
+	# r and g are packed into a single integer key (b is implied by them),
+	# using KEY_BITS per coordinate
+	KEY_BITS = 21
+	KEY_OFFSET = 1 << (KEY_BITS-1)
+	KEY_MASK = (1 << KEY_BITS)-1
+
+	# bounds of the module-wide caches: positions and rings are kept up to
+	# INTERN_RADIUS, well beyond any board, spiral tables up to
+	# SPIRAL_CACHE_SIZE, dropping the oldest first
+	INTERN_RADIUS = 64
+	SPIRAL_CACHE_SIZE = 256
+
+	_cache = {}
+	_rings = {}
+	_spirals = OrderedDict()
+
+	def __new__(_class, r = 0, g = 0, b = 0):
+		if not r+g+b == 0: raise _class.IllegalPositionException()
+		if not (-_class.KEY_OFFSET <= r < _class.KEY_OFFSET and -_class.KEY_OFFSET <= g < _class.KEY_OFFSET):
+			raise _class.IllegalPositionException('Position %r out of range.' % ((r,g,b),))
+
+		key = ((r + _class.KEY_OFFSET) << _class.KEY_BITS) | (g + _class.KEY_OFFSET)
+		try:
+			return _class._cache[key]
+		except KeyError:
+			pass
+
+		self = object.__new__(_class)
+		setattr_ = object.__setattr__
+		setattr_(self, 'r', r)
+		setattr_(self, 'g', g)
+		setattr_(self, 'b', b)
+		setattr_(self, 'key', key)
+		setattr_(self, '_t', (r,g,b))
+		# hash must stay compatible with tuples, as positions compare
+		# equal to them
+		setattr_(self, '_hash', hash(self._t))
+
+		if max(abs(r), abs(g), abs(b)) <= _class.INTERN_RADIUS: _class._cache[key] = self
+		return self
 
-	def __repr__(self):
-		return '%s(%d, %d, %d)' % (self.__class__.__name__, self.r, self.g, self.b)
+	@classmethod
+	def from_key(_class, key):
+		"""returns the position for a packed integer key"""
+		r = (key >> _class.KEY_BITS) - _class.KEY_OFFSET
+		g = (key & _class.KEY_MASK) - _class.KEY_OFFSET
+		return _class(r, g, -r-g)
 
-	@property
-	def r(self):
-		return self._t[0]
+	def __setattr__(self, name, value):
+		raise AttributeError('%s is immutable' % self.__class__.__name__)
 
-	@property
-	def g(self):
-		return self._t[1]
+	def __delattr__(self, name):
+		raise AttributeError('%s is immutable' % self.__class__.__name__)
 
-	@property
-	def b(self):
-		return self._t[2]
+	def __reduce__(self):
+		return (self.__class__, self._t)
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def __repr__(self):
+		return '%s(%d, %d, %d)' % (self.__class__.__name__, self.r, self.g, self.b)
 
 	def __add__(self, h):
-		return HexPosition(self._t[0] + h._t[0], self._t[1] + h._t[1], self._t[2] + h._t[2])
+		return HexPosition(self.r + h.r, self.g + h.g, self.b + h.b)
 
 	def __sub__(self, h):
-		return HexPosition(self._t[0] - h._t[0], self._t[1] - h._t[1], self._t[2] - h._t[2])
+		return HexPosition(self.r - h.r, self.g - h.g, self.b - h.b)
 
 	def __lt__(self, o):
 		return self._t < o
@@ -52,10 +112,10 @@ class HexPosition(object):
 		return self._t <= o
 
 	def __eq__(self, o):
-		return self._t == o
+		return self is o or self._t == o
 
 	def __ne__(self, o):
-		return self._t != o
+		return self is not o and self._t != o
 
 	def __gt__(self, o):
 		return self._t > o
@@ -64,71 +124,129 @@ class HexPosition(object):
 		return self._t >= o
 
 	def __hash__(self):
-		return hash(self._t)
+		return self._hash
 
 	def norm(self):
 		# uses p=inf metric from the origin as the norm
-		return max(map(abs, self._t))
+		return max(abs(self.r), abs(self.g), abs(self.b))
 
 	def distance_to(self, h):
-		return (self-h).norm()
+		return max(abs(self.r - h.r), abs(self.g - h.g), abs(self.b - h.b))
+
+	def neighbors(self):
+		"""returns the six adjacent positions, in the order of directions"""
+		try:
+			return self._neighbors
+		except AttributeError:
+			ns = tuple(self + d for d in self.directions)
+			object.__setattr__(self, '_neighbors', ns)
+			return ns
+
+	def neighbor(self, direction_index):
+		return self.neighbors()[direction_index]
 
 	def get_projected_coords(self):
 		# projects _unstretched_ onto a 2d surface.
 		# to get proper coordinates for hex centers,
 		# you need to apply f(x,y) |-> (3/2x, sqrt(3)/2y)
-		return (self._t[0], self._t[1]-self._t[2])
+		return (self.r, self.g-self.b)
 
 	@classmethod
-	def walk_circle(_class, start, m = None):
-		"""starting at start, walk a circle around m, clockwise direction"""
-		if None == m: m = _class.origin
-
-		yield start
-		if start == m: return
+	def from_cartesian(_class, x, y, x_stretch = 3/2., y_stretch = sqrt(3)/2.):
+		"""returns the position of the hexagon containing the point (x, y),
+		inverting get_projected_coords stretched by x_stretch and y_stretch.
+		the fractional cube coordinates of the point are rounded to the
+		closest valid position"""
+		r = x / x_stretch
+		d = y / y_stretch
+		g = (d - r) / 2.
+		b = (-d - r) / 2.
+
+		# rounding each coordinate may break r+g+b == 0; fix up the one that
+		# was rounded the most
+		rr, rg, rb = int(round(r)), int(round(g)), int(round(b))
+		dr, dg, db = abs(rr - r), abs(rg - g), abs(rb - b)
+		if dr > dg and dr > db: rr = -rg - rb
+		elif dg > db: rg = -rr - rb
+		else: rb = -rr - rg
+		return _class(rr, rg, rb)
 
-		r = start.distance_to(m)
-		cur = None
+	@classmethod
+	def ring(_class, radius):
+		"""returns the ring of all positions with a norm of radius as a tuple,
+		clockwise, starting at the north corner"""
+		return _class._ring_with_index(radius)[0]
 
-		# get starting move
-		for d in _class.directions:
-			cand = start+d
+	@classmethod
+	def _ring_with_index(_class, radius):
+		try:
+			return _class._rings[radius]
+		except KeyError:
+			pass
+
+		if 0 == radius:
+			ring = (_class.origin,)
+		else:
+			# starting at each corner, walk radius steps along the side,
+			# which runs two directions further clockwise
+			ring = []
+			n = len(_class.directions)
+			for i, d in enumerate(_class.directions):
+				step = _class.directions[(i+2)%n]
+				r, g, b = d.r*radius, d.g*radius, d.b*radius
+				for j in xrange(0, radius):
+					ring.append(_class(r + j*step.r, g + j*step.g, b + j*step.b))
+			ring = tuple(ring)
+
+		index = dict((p.key, i) for i, p in enumerate(ring))
+		if radius <= _class.INTERN_RADIUS: _class._rings[radius] = (ring, index)
+		return ring, index
 
-			# check radius
-			if cand.distance_to(m) == r:
+	@classmethod
+	def walk_circle(_class, start, m = None):
+		"""starting at start, walk a circle around m, clockwise direction"""
+		if None == m: m = _class.origin
 
-				# determine if going from start to candidate is
-				# is a clockwise motion relative to m
-				if not is_counterclockwise([m.get_projected_coords(), start.get_projected_coords(), cand.get_projected_coords()]):
-					cur = cand
-					break
+		rel = start - m
+		ring, index = _class._ring_with_index(rel.norm())
+		i = index[rel.key]
 
-		# starting direction is the one from start to cur
-		cdir_i = _class.directions.index(cur-start)
+		for j in xrange(i, i+len(ring)):
+			yield ring[j%len(ring)] + m
 
-		while cur != start:
-			# select proper direction
-			while True:
-				cand = cur+_class.directions[cdir_i]
-				if cand.distance_to(m) != r:
-					# time to change directions
-					cdir_i = (cdir_i + 1) % len(_class.directions)
-				else:
-					break
+	@classmethod
+	def spiral(_class, r, direction, m = None):
+		"""returns the positions walk_spiral visits as a tuple. the last
+		SPIRAL_CACHE_SIZE tables are cached per radius, direction and center
+		and must not be modified"""
+		if None == m: m = _class.origin
 
-			yield cur
-			cur = cand
+		key = (r, direction, m)
+		try:
+			return _class._spirals[key]
+		except KeyError:
+			pass
+
+		# each circle starts one step in direction from where the
+		# previous one ended
+		table = []
+		start = _class.origin
+		while start.norm() <= r:
+			ring, index = _class._ring_with_index(start.norm())
+			i = index[start.key]
+			circle = ring[i:] + ring[:i]
+			table.extend(p + m for p in circle)
+			start = circle[-1] + direction
+
+		table = tuple(table)
+		_class._spirals[key] = table
+		if len(_class._spirals) > _class.SPIRAL_CACHE_SIZE: _class._spirals.popitem(last = False)
+		return table
 
 	@classmethod
 	def walk_spiral(_class, r, direction, m = None):
 		"""walk a spiral until radius r, starting in direction, around m"""
-		if None == m: m = _class.origin
-
-		start = m
-
-		while start.distance_to(m) <= r:
-			for p in _class.walk_circle(start, m): yield p
-			start = p+direction
+		return iter(_class.spiral(r, direction, m))
 
 HexPosition.origin = HexPosition()
 HexPosition.directions = map(lambda t: HexPosition(*t), [
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from timeit import default_timer
+
+from hexgrid import HexPosition
+from tiles import TileStack
+
+# the number of dice combinations for each number, shown as dots on chips
+PIPS = dict((n, 6-abs(7-n)) for n in range(2, 13))
+
+class NoLayoutFoundException(Exception): pass
+
+class Layout(object):
+	"""The tiles and chips of a board, by tile index of the topology. order
+	holds the tile indices in placement order."""
+	def __init__(self, topology, setup, chips):
+		self.topology = topology
+		self.setup = setup
+		self.chips = chips
+		self.direction = None
+		self.order = []
+		self.tiles = [None] * len(topology.tiles)
+		self.numbers = [None] * len(topology.tiles)
+
+	def __iter__(self):
+		"""iterates over (position, tile class, number) in placement order"""
+		for t in self.order:
+			yield self.topology.tiles[t], self.tiles[t], self.numbers[t]
+
+
+class Constraint(object):
+	"""Constraints accept or reject layouts while the chips are put down:
+	start is called once all tiles are placed, place after each tile got
+	its chip (if any), in placement order, and finish after the last one.
+	place and finish return False to reject the layout, so most layouts are
+	given up after a few chips."""
+	def start(self, layout):
+		pass
+
+	def place(self, layout, t):
+		return True
+
+	def finish(self, layout):
+		return True
+
+
+class NoAdjacentNumbers(Constraint):
+	"""chips with one of numbers, by default the red 6 and 8, must not be on
+	neighbouring tiles"""
+	def __init__(self, numbers = (6, 8)):
+		self.numbers = frozenset(numbers)
+
+	def place(self, layout, t):
+		if not layout.numbers[t] in self.numbers: return True
+
+		numbers = layout.numbers
+		for u in layout.topology.tile_neighbors[t]:
+			if numbers[u] in self.numbers: return False
+		return True
+
+
+class NoAdjacentEqualNumbers(Constraint):
+	"""neighbouring tiles must not have the same number"""
+	def place(self, layout, t):
+		number = layout.numbers[t]
+		if not number: return True
+
+		numbers = layout.numbers
+		for u in layout.topology.tile_neighbors[t]:
+			if numbers[u] == number: return False
+		return True
+
+
+class BalancedResourcePips(Constraint):
+	"""the pips on the tiles of each resource must be within tolerance of
+	their fair share, which is the total of all chips split in proportion
+	to the number of tiles of the resource"""
+	def __init__(self, tolerance = 0.3):
+		self.tolerance = tolerance
+
+	def start(self, layout):
+		total = sum(PIPS[n] for n in layout.chips)
+		counts = {}
+		for tile, count in layout.setup.iteritems():
+			if tile.resource: counts[tile.resource] = counts.get(tile.resource, 0) + count
+		num_tiles = float(sum(counts.itervalues()))
+
+		self.maximum = dict((resource, (1+self.tolerance) * total * count / num_tiles) for resource, count in counts.iteritems())
+		self.minimum = dict((resource, (1-self.tolerance) * total * count / num_tiles) for resource, count in counts.iteritems())
+		self.pips = dict.fromkeys(counts, 0)
+
+	def place(self, layout, t):
+		resource = layout.tiles[t].resource
+		if not resource: return True
+
+		self.pips[resource] += PIPS[layout.numbers[t]]
+		return self.pips[resource] <= self.maximum[resource]
+
+	def finish(self, layout):
+		for resource, pips in self.pips.iteritems():
+			if pips < self.minimum[resource]: return False
+		return True
+
+
+class LayoutSampler(object):
+	"""Draws board layouts, rejecting them until one satisfies all
+	constraints.
+
+	Tiles are placed like on the original board: spiralling out from the
+	center in a random direction, drawing tiles from a TileStack and putting
+	the chips on them in reverse order, skipping deserts. Without
+	constraints, this consumes random exactly like the original generator.
+
+	With shuffle_chips, the chips are shuffled before they are put down.
+	Constraints on numbers are then mostly satisfied by another shuffle, so
+	a rejected layout keeps its tiles for up to chip_attempts shuffles
+	before new tiles are drawn.
+
+	attempts, accepted and elapsed count all layouts drawn, for judging
+	how expensive a set of constraints is."""
+	def __init__(self, constraints = (), shuffle_chips = False, max_attempts = 100000, chip_attempts = 50):
+		self.constraints = list(constraints)
+		self.shuffle_chips = shuffle_chips
+		self.max_attempts = max_attempts
+		self.chip_attempts = chip_attempts if shuffle_chips else 1
+
+		self.attempts = 0
+		self.accepted = 0
+		self.elapsed = 0.
+
+	@classmethod
+	def balanced(_class, **kwargs):
+		"""returns a sampler with the usual fairness constraints: no adjacent
+		6 and 8, no equal neighbouring numbers and balanced resources"""
+		return _class([NoAdjacentNumbers(), NoAdjacentEqualNumbers(), BalancedResourcePips()], shuffle_chips = True, **kwargs)
+
+	def sample(self, random, topology, setup, chips):
+		"""returns the first acceptable Layout"""
+		start = default_timer()
+		try:
+			attempts = 0
+			while attempts < self.max_attempts:
+				layout = self.place_tiles(random, topology, setup, chips)
+				for i in xrange(0, min(self.chip_attempts, self.max_attempts - attempts)):
+					attempts += 1
+					self.attempts += 1
+					if self.place_chips(random, layout):
+						self.accepted += 1
+						return layout
+			raise NoLayoutFoundException('No acceptable layout in %d attempts.' % self.max_attempts)
+		finally:
+			self.elapsed += default_timer() - start
+
+	def place_tiles(self, random, topology, setup, chips):
+		"""returns a new Layout with tiles, but no chips yet"""
+		layout = Layout(topology, setup, chips)
+		stack = TileStack(random, setup)
+
+		layout.direction = random.choice(HexPosition.directions)
+		for t in topology.spiral_order(layout.direction):
+			layout.tiles[t] = stack.get_random_tile()
+			layout.order.append(t)
+		return layout
+
+	def place_chips(self, random, layout):
+		"""puts the chips on the tiles of layout, checking the constraints
+		tile by tile. returns whether the layout is accepted"""
+		constraints = self.constraints
+		for constraint in constraints:
+			constraint.start(layout)
+
+		chipstack = layout.chips[:]
+		if self.shuffle_chips: random.shuffle(chipstack)
+
+		numbers = layout.numbers
+		for i in xrange(0, len(numbers)):
+			numbers[i] = None
+
+		for t in layout.order:
+			if layout.tiles[t].resource: numbers[t] = chipstack.pop()
+			for constraint in constraints:
+				if not constraint.place(layout, t): return False
+
+		for constraint in constraints:
+			if not constraint.finish(layout): return False
+		return True
+
+	@property
+	def acceptance_rate(self):
+		return self.accepted / float(self.attempts) if self.attempts else 0.
+
+	@property
+	def time_per_board(self):
+		"""seconds spent per accepted layout"""
+		return self.elapsed / self.accepted if self.accepted else 0.
+
+	def __str__(self):
+		return '%d of %d layouts accepted (%.1f%%), %.2f ms per board' % (self.accepted, self.attempts, 100*self.acceptance_rate, 1000*self.time_per_board)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from collections import MutableMapping
+
+import networkx
+import numpy
+
+# building types, as stored in the building column. code 0 means no building
+BUILDINGS = (None, 'settlement', 'city')
+BUILDING_CODES = dict((b, i) for i, b in enumerate(BUILDINGS))
+
+
+class _Table(object):
+	"""maps arbitrary values (players, harbor types) to small integer codes,
+	0 is reserved for None"""
+	def __init__(self):
+		self.values = [None]
+		self.codes = {None: 0}
+
+	def code(self, value):
+		try:
+			return self.codes[value]
+		except KeyError:
+			self.codes[value] = len(self.values)
+			self.values.append(value)
+			return self.codes[value]
+
+	def copy(self):
+		t = _Table()
+		t.values = self.values[:]
+		t.codes = self.codes.copy()
+		return t
+
+
+class _Attributes(MutableMapping):
+	"""dict-like view on the attributes of a single node or edge. attributes
+	with a column are stored in it, everything else in a sparse dict"""
+	columns = ()
+
+	def __init__(self, network, index):
+		self.network = network
+		self.index = index
+
+	def _extra(self, create = False):
+		extras = self._extras()
+		if create: return extras.setdefault(self.index, {})
+		return extras.get(self.index, {})
+
+	def __contains__(self, key):
+		if key in self.columns: return bool(self._get_code(key))
+		return key in self._extra()
+
+	def __getitem__(self, key):
+		if key in self.columns:
+			value = self._get(key)
+			if None == value: raise KeyError(key)
+			return value
+		return self._extra()[key]
+
+	def __setitem__(self, key, value):
+		if key in self.columns: self._set(key, value)
+		else: self._extra(True)[key] = value
+
+	def __delitem__(self, key):
+		if key in self.columns:
+			if not self._get_code(key): raise KeyError(key)
+			self._set(key, None)
+		else:
+			del self._extra()[key]
+
+	def __iter__(self):
+		for key in self.columns:
+			if self._get_code(key): yield key
+		for key in self._extra():
+			yield key
+
+	def __len__(self):
+		return len(list(iter(self)))
+
+	def __repr__(self):
+		return repr(dict(self))
+
+
+class _NodeAttributes(_Attributes):
+	columns = ('building', 'player', 'harbor')
+
+	def _extras(self):
+		return self.network._node_extras
+
+	def _get_code(self, key):
+		return getattr(self.network, key)[self.index]
+
+	def _get(self, key):
+		code = self._get_code(key)
+		if 'building' == key: return BUILDINGS[code]
+		elif 'player' == key: return self.network.owners.values[code]
+		return self.network.harbors.values[code]
+
+	def _set(self, key, value):
+		if 'building' == key: code = BUILDING_CODES[value]
+		elif 'player' == key: code = self.network.owners.code(value)
+		else: code = self.network.harbors.code(value)
+		getattr(self.network, key)[self.index] = code
+
+
+class _EdgeAttributes(_Attributes):
+	columns = ('road', 'player')
+
+	def _extras(self):
+		return self.network._edge_extras
+
+	def _get_code(self, key):
+		if 'road' == key: return self.network.road[self.index]
+		return self.network.road_player[self.index]
+
+	def _get(self, key):
+		if 'road' == key: return True if self.network.road[self.index] else None
+		return self.network.owners.values[self.network.road_player[self.index]]
+
+	def _set(self, key, value):
+		if 'road' == key: self.network.road[self.index] = bool(value)
+		else: self.network.road_player[self.index] = self.network.owners.code(value)
+
+
+class _NodeView(object):
+	def __init__(self, network):
+		self.network = network
+
+	def __getitem__(self, node_id):
+		return _NodeAttributes(self.network, self.network.topology.node_index[node_id])
+
+	def __contains__(self, node_id):
+		return node_id in self.network.topology.node_index
+
+	def __iter__(self):
+		return iter(self.network.topology.nodes)
+
+	def __len__(self):
+		return len(self.network.topology.nodes)
+
+
+class _AdjacencyView(object):
+	def __init__(self, network, n):
+		self.network = network
+		self.n = n
+
+	def _edge_index(self, node_id):
+		topology = self.network.topology
+		try:
+			return topology.edge_between(self.n, topology.node_index[node_id])
+		except KeyError:
+			raise KeyError(node_id)
+
+	def __getitem__(self, node_id):
+		return _EdgeAttributes(self.network, self._edge_index(node_id))
+
+	def __contains__(self, node_id):
+		try:
+			self._edge_index(node_id)
+			return True
+		except KeyError:
+			return False
+
+	def __iter__(self):
+		nodes = self.network.topology.nodes
+		return (nodes[v] for v in self.network.topology.neighbors[self.n])
+
+	def __len__(self):
+		return len(self.network.topology.neighbors[self.n])
+
+
+class _EdgeView(object):
+	def __init__(self, network):
+		self.network = network
+
+	def __getitem__(self, node_id):
+		return _AdjacencyView(self.network, self.network.topology.node_index[node_id])
+
+
+class CompactNetwork(object):
+	"""Array-backed replacement for the networkx graph of a board.
+
+	The graph structure is the shared topology, only the per-game state
+	lives in each instance: one numpy column per attribute, indexed by node
+	or edge index. Players and harbor types are stored as codes into small
+	per-network tables.
+
+	node, edge, neighbors and the iteration methods mimic the parts of the
+	networkx.Graph interface used on boards, so existing code keeps working.
+	Unlike networkx, setting a column attribute to None removes it."""
+	def __init__(self, topology):
+		self.topology = topology
+
+		num_nodes, num_edges = len(topology.nodes), len(topology.edges)
+		self.building = numpy.zeros(num_nodes, dtype = numpy.int8)
+		self.player = numpy.zeros(num_nodes, dtype = numpy.int16)
+		self.harbor = numpy.zeros(num_nodes, dtype = numpy.int8)
+		self.road = numpy.zeros(num_edges, dtype = numpy.bool_)
+		self.road_player = numpy.zeros(num_edges, dtype = numpy.int16)
+
+		self.owners = _Table()
+		self.harbors = _Table()
+		self._node_extras = {}
+		self._edge_extras = {}
+
+		self.node = _NodeView(self)
+		self.edge = _EdgeView(self)
+
+	def __getitem__(self, node_id):
+		return self.edge[node_id]
+
+	def __contains__(self, node_id):
+		return node_id in self.topology.node_index
+
+	def copy(self):
+		"""returns a copy of the per-game state, sharing the topology"""
+		network = CompactNetwork.__new__(CompactNetwork)
+		network.__dict__.update(self.__dict__)
+
+		for column in 'building', 'player', 'harbor', 'road', 'road_player':
+			setattr(network, column, getattr(self, column).copy())
+		network.owners = self.owners.copy()
+		network.harbors = self.harbors.copy()
+		network._node_extras = dict((k, v.copy()) for k, v in self._node_extras.iteritems())
+		network._edge_extras = dict((k, v.copy()) for k, v in self._edge_extras.iteritems())
+
+		network.node = _NodeView(network)
+		network.edge = _EdgeView(network)
+		return network
+
+	def __iter__(self):
+		return iter(self.topology.nodes)
+
+	def __len__(self):
+		return len(self.topology.nodes)
+
+	def has_node(self, node_id):
+		return node_id in self
+
+	def number_of_nodes(self):
+		return len(self.topology.nodes)
+
+	def number_of_edges(self):
+		return len(self.topology.edges)
+
+	def nodes_iter(self, data = False):
+		if not data: return iter(self.topology.nodes)
+		return ((node_id, dict(self.node[node_id])) for node_id in self.topology.nodes)
+
+	def nodes(self, data = False):
+		return list(self.nodes_iter(data))
+
+	def edges_iter(self, data = False):
+		if not data: return self.topology.edge_ids()
+		return ((u, v, dict(self.edge[u][v])) for u, v in self.topology.edge_ids())
+
+	def edges(self, data = False):
+		return list(self.edges_iter(data))
+
+	def neighbors_iter(self, node_id):
+		nodes = self.topology.nodes
+		return (nodes[v] for v in self.topology.neighbors[self.topology.node_index[node_id]])
+
+	def neighbors(self, node_id):
+		return list(self.neighbors_iter(node_id))
+
+	def export_networkx(self):
+		"""returns an equivalent networkx.Graph, with all attributes"""
+		g = networkx.Graph()
+		g.add_nodes_from(self.nodes_iter(data = True))
+		g.add_edges_from(self.edges_iter(data = True))
+		return g
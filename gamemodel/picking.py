@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from math import sqrt
+
+from hexgrid import HexPosition
+
+class BoardPicker(object):
+	"""Finds the tile, node or edge under a point on the board plane, in
+	closed form.
+
+	Points are in board coordinates, where the center of a tile is its
+	projected position stretched by x_stretch and y_stretch, as the renderer
+	places it. The tile is found by inverting the projection (see
+	HexPosition.from_cartesian); the node or edge is then the closest of the
+	six corners or sides of that tile, so no lookup ever depends on the size
+	of the board. Nodes and edges are returned as in Board.network, points
+	off the board give None."""
+	def __init__(self, topology, x_stretch = 3/2., y_stretch = sqrt(3)/2.):
+		self.topology = topology
+		self.x_stretch = x_stretch
+		self.y_stretch = y_stretch
+
+		# corners of the tiles off the board are looked up when first hit
+		self._corners = dict((pos, topology.tile_nodes[t]) for t, pos in enumerate(topology.tiles))
+		self.node_coordinates = [self._node_coordinates(node_id) for node_id in topology.nodes]
+
+	def coordinates(self, pos):
+		"""returns the center of the tile at pos"""
+		x, y = pos.get_projected_coords()
+		return (x * self.x_stretch, y * self.y_stretch)
+
+	def _node_coordinates(self, node_id):
+		centers = map(self.coordinates, node_id)
+		return (sum(c[0] for c in centers) / 3., sum(c[1] for c in centers) / 3.)
+
+	def _hex_at(self, x, y):
+		return HexPosition.from_cartesian(x, y, self.x_stretch, self.y_stretch)
+
+	def corners(self, pos):
+		"""returns the indices of the six corners of the tile at pos, in the
+		order of BoardTopology.tile_nodes, with None for corners off the board"""
+		try:
+			return self._corners[pos]
+		except KeyError:
+			pass
+
+		neighbors = pos.neighbors()
+		node_index = self.topology.node_index
+		corners = tuple(node_index.get(tuple(sorted([neighbors[i], neighbors[(i+1)%6], pos]))) for i in range(0, 6))
+		self._corners[pos] = corners
+		return corners
+
+	def tile_at(self, x, y):
+		"""returns the position of the tile under (x, y), or None"""
+		pos = self._hex_at(x, y)
+		if pos in self.topology.tile_index: return pos
+		return None
+
+	def node_at(self, x, y):
+		"""returns the id of the node closest to (x, y), or None"""
+		best, best_distance = None, None
+		coordinates = self.node_coordinates
+		for n in self.corners(self._hex_at(x, y)):
+			if None == n: continue
+			nx, ny = coordinates[n]
+			distance = (nx-x)**2 + (ny-y)**2
+			if None == best or distance < best_distance: best, best_distance = n, distance
+
+		if None == best: return None
+		return self.topology.nodes[best]
+
+	def edge_at(self, x, y):
+		"""returns the edge (u, v) closest to (x, y), or None. in a regular
+		hexagon, the closest side is the one with the closest center"""
+		best, best_distance = None, None
+		coordinates = self.node_coordinates
+		edge_index = self.topology.edge_index
+		corners = self.corners(self._hex_at(x, y))
+		for i in range(0, 6):
+			u, v = corners[i], corners[(i+1)%6]
+			if None == u or None == v or not (min(u,v), max(u,v)) in edge_index: continue
+
+			mx = (coordinates[u][0] + coordinates[v][0]) / 2.
+			my = (coordinates[u][1] + coordinates[v][1]) / 2.
+			distance = (mx-x)**2 + (my-y)**2
+			if None == best or distance < best_distance: best, best_distance = (u, v), distance
+
+		if None == best: return None
+		nodes = self.topology.nodes
+		return (nodes[best[0]], nodes[best[1]])
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding=utf8
+
+import numpy
+
+from network import CompactNetwork, BUILDING_CODES
+from tiles import RESOURCES
+
+RESOURCE_INDEX = dict((r, i) for i, r in enumerate(RESOURCES))
+
+class ProductionIndex(object):
+	"""Turns dice rolls into resource gains for a generated board.
+
+	For every tile producing a resource, each of its corners is an entry
+	(number, tile, node, resource), all indices. Entries are sorted by
+	number, so the entries for a roll are a slice. Gains are computed on
+	the whole slice at once: a settlement yields 1, a city 2 for every
+	entry, except for entries of the tile the robber is on.
+
+	Gains are returned as a matrix with one row per owner and one column
+	per resource (ordered as RESOURCES), along with the list of owners
+	the rows correspond to. Row 0 belongs to no owner and is always 0."""
+
+	def __init__(self, board):
+		self.board = board
+		topology = board.topology
+
+		entries = []
+		for t, pos in enumerate(topology.tiles):
+			tile = board.tiles[pos]
+			if not tile.resource or not tile.number: continue
+			for n in topology.tile_nodes[t]:
+				entries.append((tile.number, t, n, RESOURCE_INDEX[tile.resource]))
+		entries.sort()
+
+		columns = zip(*entries) or ([],)*4
+		self.numbers, self.tiles, self.nodes, self.resources = (numpy.array(column, dtype = numpy.int32) for column in columns)
+
+		# entries for number d are offsets[d]:offsets[d+1]
+		self.offsets = numpy.searchsorted(self.numbers, numpy.arange(0, 14))
+
+	def copy_for(self, board):
+		"""returns an index for a copy of the board, sharing all entries"""
+		index = ProductionIndex.__new__(ProductionIndex)
+		index.__dict__.update(self.__dict__)
+		index.board = board
+		return index
+
+	def _node_state(self):
+		# returns per-node building multiplier and owner codes, along
+		# with the owners the codes refer to
+		network = self.board.network
+		if isinstance(network, CompactNetwork):
+			return network.building, network.player, network.owners.values
+
+		topology = self.board.topology
+		building = numpy.zeros(len(topology.nodes), dtype = numpy.int32)
+		owner = numpy.zeros(len(topology.nodes), dtype = numpy.int32)
+		owners = [None]
+		codes = {None: 0}
+		for n, node_id in enumerate(topology.nodes):
+			attributes = network.node[node_id]
+			if not attributes.get('building') in ('settlement', 'city'): continue
+			player = attributes['player']
+			if not player in codes:
+				codes[player] = len(owners)
+				owners.append(player)
+			building[n] = BUILDING_CODES[attributes['building']]
+			owner[n] = codes[player]
+		return building, owner, owners
+
+	def _robber_tile(self):
+		return self.board.topology.tile_index.get(self.board.robber, -1)
+
+	def _gains(self, entries, weights):
+		building, owner, owners = self._node_state()
+		nodes = self.nodes[entries]
+		weights = weights * building[nodes] * (self.tiles[entries] != self._robber_tile())
+
+		gains = numpy.zeros((len(owners), len(RESOURCES)), dtype = numpy.int64)
+		numpy.add.at(gains, (owner[nodes], self.resources[entries]), weights)
+		return gains, owners
+
+	def gain_matrix(self, number):
+		"""returns the gains matrix and owners for a single roll"""
+		entries = slice(self.offsets[number], self.offsets[number+1]) if 2 <= number <= 12 else slice(0, 0)
+		return self._gains(entries, 1)
+
+	def bulk_gain_matrix(self, rolls):
+		"""returns the summed gains of many rolls, assuming the board does
+		not change in between"""
+		counts = numpy.bincount(numpy.asarray(rolls, dtype = numpy.int64), minlength = 14)
+		return self._gains(slice(None), counts[self.numbers])
+
+	def gains(self, number):
+		"""returns the gains of a roll as {owner: {resource: amount}}"""
+		return self._as_dict(*self.gain_matrix(number))
+
+	def distribute(self, number, players):
+		"""adds the gains of a roll to the resources of players, a mapping of
+		board owners to Player objects"""
+		self._apply(players, *self.gain_matrix(number))
+
+	def distribute_bulk(self, rolls, players):
+		"""like distribute, for many rolls at once"""
+		self._apply(players, *self.bulk_gain_matrix(rolls))
+
+	def _as_dict(self, gains, owners):
+		result = {}
+		for row in numpy.flatnonzero(gains.any(axis = 1)):
+			result[owners[row]] = dict((RESOURCES[i], int(gains[row, i])) for i in numpy.flatnonzero(gains[row]))
+		return result
+
+	def _apply(self, players, gains, owners):
+		for owner, resources in self._as_dict(gains, owners).iteritems():
+			player_resources = players[owner].resources
+			for resource, amount in resources.iteritems():
+				player_resources[resource] += amount
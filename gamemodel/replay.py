@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from bisect import bisect_right
+import json
+
+from actions import deserialize_action
+from game import Game
+
+def apply_entry(game, entry):
+	"""applies a journal entry to game, without checking legality"""
+	if 'J' == entry[0]:
+		game.create_player(entry[1], entry[2])
+	else:
+		action = deserialize_action(game, entry)
+		action.apply_unchecked(game)
+		game.record(action)
+
+
+def dumps(game):
+	"""serializes a game as its seed and journal"""
+	return json.dumps({'seed': game.initial_seed, 'journal': game.journal}, separators = (',', ':'))
+
+
+def loads(s):
+	"""returns (seed, journal) of a game serialized with dumps"""
+	d = json.loads(s)
+	return d['seed'], map(tuple, d['journal'])
+
+
+class Replay(object):
+	"""Rebuilds the states of a game from its seed and journal.
+
+	Every snapshot_interval entries, a clone of the replayed game is kept
+	as a snapshot. Seeking to an entry starts from the closest snapshot
+	before it, so it costs a binary search plus replaying at most
+	snapshot_interval entries. Snapshots are created lazily, while
+	replaying."""
+	def __init__(self, seed, journal, snapshot_interval = 50, compact_board = True):
+		self.journal = journal
+		self.snapshot_interval = snapshot_interval
+
+		self.positions = [0]
+		self.snapshots = [Game(seed, compact_board = compact_board)]
+
+	@classmethod
+	def of(_class, game, **kwargs):
+		"""returns a replay of game, as it is now"""
+		return _class(game.initial_seed, game.journal[:], compact_board = game.compact_board, **kwargs)
+
+	def __len__(self):
+		return len(self.journal)
+
+	def seek(self, n):
+		"""returns a new game in the state after the first n entries"""
+		if not 0 <= n <= len(self.journal): raise IndexError('No entry %d in the journal.' % n)
+
+		i = bisect_right(self.positions, n)-1
+		pos = self.positions[i]
+		game = self.snapshots[i].clone()
+
+		while pos < n:
+			apply_entry(game, self.journal[pos])
+			pos += 1
+
+			if 0 == pos % self.snapshot_interval and pos > self.positions[-1]:
+				self.positions.append(pos)
+				self.snapshots.append(game.clone())
+
+		return game
+
+	def replay(self):
+		"""returns a new game in the final state"""
+		return self.seek(len(self.journal))
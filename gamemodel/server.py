@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from collections import deque
+import heapq
+import json
+from random import Random, SystemRandom
+import time
+
+from actions import IllegalActionException, StartGameAction, TradeAction, EndTurnAction, deserialize_action
+from game import Game
+from replay import apply_entry
+from simulation import RandomBot
+
+class ProtocolError(Exception): pass
+
+class Session(object):
+	"""A client of the server. send is called with each message for the
+	client, the transport delivers it."""
+	def __init__(self, send):
+		self.send = send
+		self.table = None
+		self.color = None
+
+
+class Table(object):
+	"""A game hosted by the server and the sessions seated at it, by
+	color. colors are those of the players, in the order they joined. turn
+	is the (phase, round, turn) the deadline is for."""
+	def __init__(self, table_id, seed, compact_board = True):
+		self.id = table_id
+		self.game = Game(seed, compact_board = compact_board)
+		self.seats = {}
+		self.colors = []
+		self.turn = None
+		self.deadline = None
+
+	def broadcast(self, message):
+		for session in self.seats.values():
+			session.send(message)
+
+
+class GameServer(object):
+	"""Hosts many games at once, for clients on any transport.
+
+	Messages are dicts that survive JSON. Clients send
+	  {'type': 'join', 'name': ..., 'table': None, 'color': None}
+	  {'type': 'start', 'id': ...}
+	  {'type': 'action', 'id': ..., 'action': [code, player, ...]}
+	with actions serialized as in the journal. Joining without a table
+	seats the client at the next table with a free seat; tables start once
+	players_per_table have joined. A client first gets
+	  {'type': 'joined', 'table': ..., 'color': ..., 'seed': ..., 'journal': [...]}
+	to rebuild the game from (see replay), then every journal entry of its
+	table as
+	  {'type': 'entry', 'table': ..., 'entry': [...], 'by': color, 'id': ...}
+	where by and id name the client and request the entry came from, if
+	any. Requests that fail are answered with
+	  {'type': 'error', 'id': ..., 'message': ...}
+	to the sender only. A client leaving a table before its game started
+	gives up its seat; everyone left gets
+	  {'type': 'left', 'table': ..., 'color': ..., 'journal': [...]}
+	with the journal of the game without the player, to rebuild it from.
+
+	Actions are checked with assert_legal before they are applied. A player
+	who does not finish a turn within turn_timeout seconds has it finished
+	for them by poll, with the first legal actions leading to the end of the
+	turn."""
+	def __init__(self, players_per_table = 3, turn_timeout = 60., seed = None, compact_board = True, clock = time.time):
+		# games start with 3 players and take at most 4
+		if not 3 <= players_per_table <= 4: raise ValueError('Tables seat 3 or 4 players, not %r.' % (players_per_table,))
+		self.players_per_table = players_per_table
+		self.turn_timeout = turn_timeout
+		self.compact_board = compact_board
+		self.clock = clock
+		if None == seed: seed = SystemRandom().getrandbits(64)
+		self.random = Random(seed)
+
+		self.tables = {}
+		self.open_table = None
+		self.next_table_id = 1
+
+		# (deadline, table id, turn), stale once the table moved on
+		self.deadlines = []
+
+		self.actions = 0
+		self.timeouts = 0
+
+	def connect(self, send):
+		"""returns the session of a new client, messages for it are passed
+		to send"""
+		return Session(send)
+
+	def disconnect(self, session):
+		"""removes a client. once the game started its seat stays, its turns
+		time out"""
+		table = session.table
+		if not table: return
+		session.table = None
+		if table.seats.get(session.color) is session:
+			del table.seats[session.color]
+			if 'init' == table.game.phase: self.leave(table, session.color)
+		if not table.seats and table.game.phase in ('init', 'finished'):
+			self.tables.pop(table.id, None)
+			if self.open_table is table: self.open_table = None
+
+	def handle(self, session, message):
+		"""handles a message from session"""
+		request_id = message.get('id') if isinstance(message, dict) else None
+		try:
+			if not isinstance(message, dict): raise ProtocolError('Messages must be objects.')
+			kind = message.get('type')
+			if 'join' == kind: self.join(session, message.get('name', 'Player'), message.get('table'), message.get('color'))
+			elif 'start' == kind: self.act(session, [StartGameAction.code, session.color], request_id)
+			elif 'action' == kind: self.act(session, message.get('action'), request_id)
+			else: raise ProtocolError('Unknown message type %r.' % (kind,))
+		except (ProtocolError, IllegalActionException, Game.ColorAlreadyTakenException, Game.TooManyPlayersException, Game.WrongPhaseException), e:
+			session.send({'type': 'error', 'id': request_id, 'message': str(e) or e.__class__.__name__})
+
+	def create_table(self):
+		table = Table(self.next_table_id, self.random.getrandbits(64), self.compact_board)
+		self.next_table_id += 1
+		self.tables[table.id] = table
+		return table
+
+	def join(self, session, name, table_id = None, color = None):
+		if session.table: raise ProtocolError('Already seated at table %s.' % session.table.id)
+		if not isinstance(name, basestring): raise ProtocolError('Names must be strings.')
+		if not (None == table_id or isinstance(table_id, (int, long)) and not isinstance(table_id, bool)): raise ProtocolError('Tables are numbered, not %r.' % (table_id,))
+		if not (None == color or isinstance(color, basestring) and color in Game.player_colors): raise ProtocolError('No color %r.' % (color,))
+
+		if None != table_id:
+			table = self.tables.get(table_id)
+			if not table: raise ProtocolError('No table %r.' % (table_id,))
+		else:
+			if not self.open_table or 'init' != self.open_table.game.phase or len(self.open_table.game.players) >= self.players_per_table:
+				self.open_table = self.create_table()
+			table = self.open_table
+
+		game = table.game
+		colors = set(game.players)
+		game.create_player(name, color)
+		color, = set(game.players) - colors
+
+		session.table, session.color = table, color
+		table.seats[color] = session
+		table.colors.append(color)
+		session.send({'type': 'joined', 'table': table.id, 'color': color, 'seed': game.initial_seed, 'journal': game.journal[:-1]})
+		table.broadcast({'type': 'entry', 'table': table.id, 'entry': game.journal[-1], 'by': color, 'id': None})
+
+		if len(game.players) == self.players_per_table:
+			self.apply(table, StartGameAction(sorted(game.players)[0]))
+
+	def leave(self, table, color):
+		# the game is built again from the joins of the other players, with
+		# their colors given, so the journal can still be replayed
+		joins = [(entry[1], c) for entry, c in zip(table.game.journal, table.colors) if c != color]
+		game = table.game = Game(table.game.initial_seed, compact_board = self.compact_board)
+		for name, c in joins:
+			game.create_player(name, c)
+		table.colors = [c for name, c in joins]
+		table.broadcast({'type': 'left', 'table': table.id, 'color': color, 'journal': game.journal})
+
+	def act(self, session, entry, request_id = None):
+		table = session.table
+		if not table: raise ProtocolError('Not seated at a table.')
+
+		try:
+			# there is no board to look up nodes, edges and tiles on yet
+			if 'init' == table.game.phase and StartGameAction.code != entry[0]: raise ProtocolError('The game at table %s has not started yet.' % table.id)
+			action = deserialize_action(table.game, entry)
+		except (KeyError, IndexError, TypeError, ValueError):
+			raise ProtocolError('Malformed action %r.' % (entry,))
+		if action.player != session.color: raise IllegalActionException('Player %s cannot act for %s.' % (session.color, action.player))
+
+		self.apply(table, action, session.color, request_id)
+
+	def apply(self, table, action, by = None, request_id = None):
+		"""applies a legal action to the game of table and tells everyone at
+		the table"""
+		game = table.game
+		action.assert_legal(game)
+		action.apply_unchecked(game)
+		game.record(action)
+		self.actions += 1
+
+		table.broadcast({'type': 'entry', 'table': table.id, 'entry': game.journal[-1], 'by': by, 'id': request_id})
+		self.schedule(table)
+
+	def schedule(self, table):
+		# a new turn gets a new deadline
+		game = table.game
+		if not game.phase in ('setup', 'main'):
+			table.turn = table.deadline = None
+			return
+
+		turn = (game.phase, game.round, game.turn)
+		if turn == table.turn: return
+
+		table.turn = turn
+		table.deadline = self.clock() + self.turn_timeout
+		heapq.heappush(self.deadlines, (table.deadline, table.id, turn))
+
+	def poll(self):
+		"""finishes the turns that timed out. returns the seconds until the
+		next deadline, or None if there is none"""
+		now = self.clock()
+		while self.deadlines and self.deadlines[0][0] <= now:
+			deadline, table_id, turn = heapq.heappop(self.deadlines)
+			table = self.tables.get(table_id)
+			if not table or table.turn != turn: continue
+
+			self.timeouts += 1
+			self.time_out(table)
+
+		if not self.deadlines: return None
+		return max(self.deadlines[0][0] - now, 0.)
+
+	def time_out(self, table):
+		"""finishes the current turn of table: places what the setup phase
+		requires, rolls, moves the robber and ends the turn"""
+		game = table.game
+		turn = table.turn
+		while table.turn == turn:
+			actions = [action for action in game.legal_actions() if not isinstance(action, TradeAction)]
+			if not actions: break
+
+			ends = [action for action in actions if isinstance(action, EndTurnAction)]
+			self.apply(table, ends[0] if ends else actions[0])
+
+
+class LocalNetwork(object):
+	"""Connects in-process clients to a server. Messages go through a queue
+	as JSON, so they are handled one at a time and like over a socket;
+	pump delivers them."""
+	def __init__(self, server):
+		self.server = server
+		self.queue = deque()
+
+	def connect(self, receive):
+		"""connects a client receiving messages with receive. returns the
+		function it sends messages with"""
+		queue = self.queue
+		session = self.server.connect(lambda message: queue.append((receive, json.dumps(message))))
+		handle = self.server.handle
+		return lambda message: queue.append((lambda message: handle(session, message), json.dumps(message)))
+
+	def pump(self, limit = None):
+		"""delivers queued messages, including those sent in turn, until
+		there are none left or limit were delivered. returns how many were
+		delivered"""
+		queue = self.queue
+		delivered = 0
+		while queue and (None == limit or delivered < limit):
+			receive, data = queue.popleft()
+			receive(json.loads(data))
+			delivered += 1
+		return delivered
+
+
+class BotClient(object):
+	"""A client playing like a RandomBot. It keeps its own copy of the game
+	of its table, rebuilt from the journal entries it is sent, to find its
+	legal actions. latencies holds the seconds from sending each action to
+	getting its entry or error back."""
+	def __init__(self, name, random, table = None, compact_board = True, clock = time.time):
+		self.name = name
+		self.table = table
+		self.compact_board = compact_board
+		self.clock = clock
+		self.bot = RandomBot(random)
+
+		self.send = None
+		self.game = None
+		self.color = None
+
+		# (request id, time sent) of the action waiting for an answer
+		self.pending = None
+		self.next_id = 0
+		self.latencies = []
+		self.errors = []
+
+	def start(self, send):
+		"""joins a table, sending through send"""
+		self.send = send
+		send({'type': 'join', 'name': self.name, 'table': self.table})
+
+	def receive(self, message):
+		kind = message['type']
+		if 'joined' == kind:
+			self.color = message['color']
+			self.rebuild(message['seed'], message['journal'])
+		elif 'left' == kind:
+			self.rebuild(self.game.initial_seed, message['journal'])
+		elif 'entry' == kind:
+			apply_entry(self.game, message['entry'])
+			if self.pending and message['by'] == self.color and message['id'] == self.pending[0]: self.answered()
+		elif 'error' == kind:
+			self.errors.append(message['message'])
+			if self.pending and message['id'] == self.pending[0]: self.answered()
+
+		self.play()
+
+	def rebuild(self, seed, journal):
+		self.game = Game(seed, compact_board = self.compact_board)
+		for entry in journal:
+			apply_entry(self.game, entry)
+
+	def answered(self):
+		self.latencies.append(self.clock() - self.pending[1])
+		self.pending = None
+
+	@property
+	def finished(self):
+		return self.game and 'finished' == self.game.phase
+
+	def play(self):
+		"""sends an action if it is the client's turn"""
+		game = self.game
+		if self.pending or not game or not game.phase in ('setup', 'main') or game.current_player != self.color: return
+
+		action = self.bot.choose(game, game.legal_actions())
+		self.next_id += 1
+		self.pending = (self.next_id, self.clock())
+		self.send({'type': 'action', 'id': self.next_id, 'action': action.serialize(game)})
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from collections import namedtuple
+from multiprocessing import Pool
+from random import Random
+
+from actions import BuildCityAction, BuildRoadAction, BuildSettlementAction, EndTurnAction, StartGameAction, TradeAction
+from game import Game
+
+# the bots get their own random generator, so their choices do not change
+# the dice. it is seeded with the game seed xor this
+BOT_SEED_MASK = 0x5deece66d
+
+# the outcome of a simulated game: the winner (None if the game was cut
+# off after max_actions), the position of the winner in the turn order,
+# the number of rounds and actions played and the victory points of all
+# players, in turn order. this is all that is sent back from the workers
+GameResult = namedtuple('GameResult', 'index seed winner winner_seat rounds actions points')
+
+
+def derive_seeds(master_seed, num_games):
+	"""returns the seeds of num_games games, derived from master_seed. game i
+	gets the same seed no matter how the games are distributed"""
+	random = Random(master_seed)
+	return [random.getrandbits(64) for i in range(0, num_games)]
+
+
+class RandomBot(object):
+	"""picks a random legal action, preferring cities over settlements over
+	roads. if it cannot build, it trades towards a piece it has a place for,
+	and ends the turn if there is nothing else to do"""
+	preference = (BuildCityAction, BuildSettlementAction, BuildRoadAction)
+
+	def __init__(self, random):
+		self.random = random
+
+	def choose(self, game, actions):
+		for kind in self.preference:
+			candidates = [action for action in actions if isinstance(action, kind)]
+			if candidates: return self.random.choice(candidates)
+
+		trades = [action for action in actions if isinstance(action, TradeAction)]
+		if trades:
+			trade = self.choose_trade(game, trades)
+			if trade: return trade
+
+		return self.random.choice([action for action in actions if not isinstance(action, (TradeAction, EndTurnAction))] or [EndTurnAction(game.current_player)])
+
+	def choose_trade(self, game, trades):
+		player = game.current_player
+		resources = game.players[player].resources
+		board = game.board
+		for piece, spots in ('city', board.city_spots), ('settlement', board.settlement_spots), ('road', board.road_spots):
+			if game.pieces_left(player, piece) < 1 or not spots(player): continue
+
+			# get what is missing, for what is not needed
+			cost = game.costs[piece]
+			candidates = [trade for trade in trades if resources[trade.get] < cost.get(trade.get, 0)
+			              and resources[trade.give] - game.trade_ratio(player, trade.give) >= cost.get(trade.give, 0)]
+			if candidates: return self.random.choice(candidates)
+		return None
+
+
+def play_game(seed, index = 0, num_players = 3, max_actions = 10000, bot = RandomBot, compact_board = True):
+	"""plays a game between bots, returns its GameResult. as the bots are
+	seeded from the game seed too, play_game with the same seed plays the
+	same game again"""
+	game = Game(seed, compact_board = compact_board)
+	for color in Game.player_colors[:num_players]:
+		game.create_player(color, color)
+	StartGameAction(sorted(game.players)[0]).apply(game)
+
+	player = bot(Random(seed ^ BOT_SEED_MASK))
+	actions = 0
+	while 'finished' != game.phase and actions < max_actions:
+		player.choose(game, game.legal_actions()).apply_unchecked(game)
+		actions += 1
+
+	points = tuple(game.victory_points(color) for color in game.turn_order)
+	seat = game.turn_order.index(game.winner) if game.winner else None
+	return GameResult(index, seed, game.winner, seat, game.round, actions, points)
+
+
+def _play(job):
+	index, seed, kwargs = job
+	return play_game(seed, index, **kwargs)
+
+
+def simulate(num_games, master_seed, processes = None, chunksize = 8, **kwargs):
+	"""plays num_games games in a pool of processes (one per core by
+	default), yielding their GameResults as they come in, in no particular
+	order. other keyword arguments are passed on to play_game"""
+	jobs = ((i, seed, kwargs) for i, seed in enumerate(derive_seeds(master_seed, num_games)))
+
+	if 1 == processes:
+		for job in jobs:
+			yield _play(job)
+		return
+
+	pool = Pool(processes)
+	try:
+		for result in pool.imap_unordered(_play, jobs, chunksize):
+			yield result
+		pool.close()
+	except:
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
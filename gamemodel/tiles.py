@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # coding=utf8
 
+RESOURCES = ('Brick', 'Grain', 'Lumber', 'Ore', 'Wool')
+
 class Tile(object):
 	resource = None
 	number = None
@@ -52,14 +54,30 @@ STANDARD_BOARD_TILES = {
 
 STANDARD_BOARD_CHIPS = [5, 2, 6, 3, 8, 10, 9, 12, 11, 4, 8, 10, 9, 4, 5, 6, 3, 11]
 
+def board_setup(radius):
+	"""returns (setup, chips) for a board of the given radius, with tiles
+	and chips in about the same proportions as the standard board"""
+	num_tiles = 1 + 3*radius*(radius+1)
+	deserts = max(1, int(round(num_tiles / 19.)))
+
+	# hand out the other tiles in the order of their standard counts
+	kinds = sorted((tile for tile in STANDARD_BOARD_TILES if tile.resource), key = lambda tile: (-STANDARD_BOARD_TILES[tile], tile.__name__))
+	setup = {DesertTile: deserts}
+	for i in range(0, num_tiles-deserts):
+		setup[kinds[i%len(kinds)]] = setup.get(kinds[i%len(kinds)], 0) + 1
+
+	chips = [STANDARD_BOARD_CHIPS[i%len(STANDARD_BOARD_CHIPS)] for i in range(0, num_tiles-deserts)]
+	return setup, chips
+
 # this order is the same as when using frames
 # to get the variable tile based order, simply shuffle
-STANDARD_HARBORS = ['3to1', 'Brick', 'Lumber', '3to1', 'Grain', 'Ore', '3to1', 'Sheep', '3to1']
+STANDARD_HARBORS = ['3to1', 'Brick', 'Lumber', '3to1', 'Grain', 'Ore', '3to1', 'Wool', '3to1']
 
 class TileStack(object):
 	def __init__(self, random, initial_tiles):
 		self.tiles = []
-		for tile, count in initial_tiles.iteritems():
+		# sort, so the order does not depend on the hashes of the classes
+		for tile, count in sorted(initial_tiles.iteritems(), key = lambda (tile, count): tile.__name__):
 			for i in range(0,count):
 				self.tiles.append(tile)
 		self.random = random
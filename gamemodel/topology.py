@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from hexgrid import HexPosition, is_counterclockwise
+
+def harbor_placement():
+	# 1, 1, 2, 1, 1, 2, ...
+	order = (True, True, False) * 2 + (True, True, False, False)
+
+	# start with 1
+	i = 3
+	while True:
+		yield order[i]
+		i = (i+1)%len(order)
+
+
+class BoardTopology(object):
+	"""The layout of a board of a given radius: tile positions, the
+	intersection graph on top of them, the coast and the harbor slots.
+
+	None of this depends on how a board is shuffled, so a topology is
+	computed once per radius (see for_radius) and shared by all boards.
+	Nodes and edges are referred to by their index into nodes and edges;
+	node ids are the sorted tuples of the three tile positions meeting at a
+	node, as used by Board.network. All attributes are read-only."""
+
+	_cache = {}
+
+	@classmethod
+	def for_radius(_class, radius):
+		try:
+			return _class._cache[radius]
+		except KeyError:
+			topology = _class._cache[radius] = _class(radius)
+			return topology
+
+	def __init__(self, radius):
+		self.radius = radius
+
+		# tiles, ordered from the center outwards
+		self.tiles = HexPosition.spiral(radius, HexPosition.directions[0])
+		self.tile_index = dict((pos, i) for i, pos in enumerate(self.tiles))
+
+		# nodes are the corners of the tiles. the corner between the
+		# neighbors in direction i and i+1 is corner i of a tile
+		nodes = []
+		node_index = {}
+		tile_nodes = []
+		for pos in self.tiles:
+			corners = []
+			neighbors = pos.neighbors()
+			for i in range(0, len(neighbors)):
+				node_id = tuple(sorted([neighbors[i], neighbors[(i+1)%len(neighbors)], pos]))
+				if node_id not in node_index:
+					node_index[node_id] = len(nodes)
+					nodes.append(node_id)
+				corners.append(node_index[node_id])
+			tile_nodes.append(tuple(corners))
+
+		self.nodes = tuple(nodes)
+		self.node_index = node_index
+		self.tile_nodes = tuple(tile_nodes)
+
+		# inverse incidence: the land tiles touching each node
+		node_tiles = [[] for n in self.nodes]
+		for t, corners in enumerate(self.tile_nodes):
+			for n in corners: node_tiles[n].append(t)
+		self.node_tiles = tuple(map(tuple, node_tiles))
+
+		# neighbouring tiles, for checking layouts
+		self.tile_neighbors = tuple(tuple(self.tile_index[p] for p in pos.neighbors() if p in self.tile_index) for pos in self.tiles)
+		self._spiral_orders = {}
+
+		# edges run between neighbouring corners of a tile
+		edges = []
+		edge_index = {}
+		neighbors = [[] for n in self.nodes]
+		for corners in self.tile_nodes:
+			for i in range(0, len(corners)):
+				u, v = corners[i], corners[(i+1)%len(corners)]
+				e = (min(u,v), max(u,v))
+				if e in edge_index: continue
+
+				edge_index[e] = len(edges)
+				edges.append(e)
+				neighbors[u].append(v)
+				neighbors[v].append(u)
+
+		self.edges = tuple(edges)
+		self.edge_index = edge_index
+		self.neighbors = tuple(map(tuple, neighbors))
+
+		# the edges leading to the neighbors of each node
+		self.node_edges = tuple(tuple(self.edge_between(u, v) for v in vs) for u, vs in enumerate(self.neighbors))
+
+		self.coast = self._walk_coast()
+
+		# harbors are placed on consecutive runs of coastal nodes
+		slots = []
+		prev = False
+		harbor_place = harbor_placement()
+		for n in self.coast:
+			if harbor_place.next():
+				if not prev: slots.append([])
+				slots[-1].append(n)
+				prev = True
+			else:
+				prev = False
+		self.harbor_slots = tuple(map(tuple, slots))
+
+	def edge_between(self, u, v):
+		"""returns the index of the edge between nodes u and v"""
+		return self.edge_index[(min(u,v), max(u,v))]
+
+	def spiral_order(self, direction):
+		"""returns the tile indices in the order of a spiral walk from the
+		center, starting in direction"""
+		try:
+			return self._spiral_orders[direction]
+		except KeyError:
+			order = self._spiral_orders[direction] = tuple(self.tile_index[pos] for pos in HexPosition.spiral(self.radius, direction))
+			return order
+
+	def edge_ids(self):
+		"""iterates over all edges as pairs of node ids"""
+		for u, v in self.edges:
+			yield (self.nodes[u], self.nodes[v])
+
+	def is_coastal(self, n):
+		"""a node is on the coast if it borders on at least one sea tile"""
+		return len(self.node_tiles[n]) < len(self.nodes[n])
+
+	def _walk_coast(self):
+		# starting top right tile, top node, walking clockwise
+		start_tile = HexPosition(self.radius+1, 0, -self.radius-1)
+		start = self.node_index[tuple(sorted((start_tile, start_tile+HexPosition.directions[-1], start_tile+HexPosition.directions[-2])))]
+
+		def center(n):
+			# projected center of a node, scaled by 3
+			ps = [pos.get_projected_coords() for pos in self.nodes[n]]
+			return (sum(p[0] for p in ps), sum(p[1] for p in ps))
+
+		coast = [start]
+		prev, cur = None, start
+		while True:
+			candidates = [n for n in self.neighbors[cur] if n != prev and self.is_coastal(n)]
+
+			if cur == start:
+				# leave the starting node clockwise
+				origin = HexPosition.origin.get_projected_coords()
+				candidates = [n for n in candidates if not is_counterclockwise([origin, center(start), center(n)])]
+
+			prev, cur = cur, candidates[0]
+			if cur == start: break
+			coast.append(cur)
+
+		return tuple(coast)
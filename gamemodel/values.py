@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# coding=utf8
+
+import numpy
+
+from layout import PIPS
+from production import RESOURCE_INDEX
+from tiles import RESOURCES
+
+class NodeValues(object):
+	"""Value tables for the intersections of a generated board, used to
+	rank places for settlements.
+
+	For all nodes at once, the tables hold the pips of the adjacent tiles
+	per resource (a nodes x resources array, see resource_pips; yields has
+	the expected number of resources per roll instead), the total pips, the
+	number of different resources (diversity) and whether the node is on a
+	harbor. They are computed as the product of the node-tile incidence
+	matrix and the pips of each tile.
+
+	The tile the robber is on produces nothing. When the robber moves, only
+	the rows of the nodes around the old and the new tile are updated. This
+	happens lazily, on the next access, so moving the robber stays cheap."""
+
+	def __init__(self, board):
+		self.board = board
+		topology = board.topology
+
+		# pips of each tile, in the column of its resource
+		self.tile_pips = numpy.zeros((len(topology.tiles), len(RESOURCES)), dtype = numpy.int32)
+		for t, pos in enumerate(topology.tiles):
+			tile = board.tiles[pos]
+			if tile.resource and tile.number: self.tile_pips[t, RESOURCE_INDEX[tile.resource]] = PIPS[tile.number]
+
+		incidence = numpy.zeros((len(topology.nodes), len(topology.tiles)), dtype = numpy.int32)
+		for t, corners in enumerate(topology.tile_nodes):
+			incidence[list(corners), t] = 1
+
+		self._resource_pips = incidence.dot(self.tile_pips)
+		self._pips = self._resource_pips.sum(axis = 1)
+		self._diversity = (self._resource_pips > 0).sum(axis = 1)
+		self.harbor_access = numpy.array([None != harbor for harbor in board.harbors], dtype = numpy.bool_)
+
+		self.robber_tile = None
+		self._sync()
+
+	def copy_for(self, board):
+		"""returns the tables for a copy of the board"""
+		values = NodeValues.__new__(NodeValues)
+		values.__dict__.update(self.__dict__)
+		values.board = board
+		values._resource_pips = self._resource_pips.copy()
+		values._pips = self._pips.copy()
+		values._diversity = self._diversity.copy()
+		return values
+
+	def _sync(self):
+		# follow the robber, by taking the production of the tile it is on
+		# away and giving it back to the tile it left
+		t = self.board.topology.tile_index.get(self.board.robber)
+		if t == self.robber_tile: return
+
+		if None != self.robber_tile: self._update_tile(self.robber_tile, 1)
+		if None != t: self._update_tile(t, -1)
+		self.robber_tile = t
+
+	def _update_tile(self, t, sign):
+		corners = list(self.board.topology.tile_nodes[t])
+		self._resource_pips[corners] += sign * self.tile_pips[t]
+		self._pips[corners] = self._resource_pips[corners].sum(axis = 1)
+		self._diversity[corners] = (self._resource_pips[corners] > 0).sum(axis = 1)
+
+	@property
+	def resource_pips(self):
+		self._sync()
+		return self._resource_pips
+
+	@property
+	def yields(self):
+		"""expected resources per roll, nodes x resources"""
+		self._sync()
+		return self._resource_pips / 36.
+
+	@property
+	def pips(self):
+		self._sync()
+		return self._pips
+
+	@property
+	def diversity(self):
+		self._sync()
+		return self._diversity
+
+	def scores(self, diversity_weight = 1., harbor_weight = 1.):
+		"""returns the value of each node, in pips. every resource beyond the
+		first and a harbor add the given weights"""
+		self._sync()
+		return self._pips + diversity_weight * numpy.maximum(self._diversity-1, 0) + harbor_weight * self.harbor_access
+
+	def top(self, k, available = True, **weights):
+		"""returns the k nodes with the highest scores as (node_id, score),
+		best first. only nodes a settlement may be placed on are considered,
+		unless available is False. weights are passed on to scores"""
+		scores = self.scores(**weights)
+		if available: candidates = numpy.array(self.board.available_indices(), dtype = numpy.int32)
+		else: candidates = numpy.arange(0, len(scores))
+		if not len(candidates): return []
+
+		# best first, ties by node index
+		candidates = candidates[numpy.lexsort((candidates, -scores[candidates]))[:k]]
+
+		nodes = self.board.topology.nodes
+		return [(nodes[n], float(scores[n])) for n in candidates]
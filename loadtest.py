@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# loads a game server with bots playing as fast as they can, with more and
+# more tables at once, e.g.
+#
+#   $ python loadtest.py -g 1 10 100 500
+#   $ python loadtest.py -g 100 --tcp
+#
+# for each number of tables, prints the actions applied per second and the
+# latency of the bots' actions, from sending to getting the entry back.
+# bots and server share the process, in-process clients skip the sockets
+
+import argparse
+from random import Random
+import time
+
+from gamemodel.server import GameServer, LocalNetwork, BotClient
+from gamemodel.simulation import derive_seeds
+from profiling import percentile
+
+def run_local(server, clients, until):
+	network = LocalNetwork(server)
+	for client in clients:
+		client.start(network.connect(client.receive))
+
+	while not until():
+		server.poll()
+		if not network.pump(1000): time.sleep(0.001)
+
+
+def run_tcp(server, clients, until):
+	from serve import Listener, connect, run
+
+	map = {}
+	listener = Listener(server, '127.0.0.1', 0, map)
+	for client in clients:
+		client.start(connect('127.0.0.1', listener.address[1], client.receive, map).send_message)
+
+	try:
+		run(server, map, until, 0.01)
+	finally:
+		for channel in map.values():
+			channel.close()
+
+
+def load(num_games, seed, players = 3, duration = 10., tcp = False, turn_timeout = 60.):
+	"""plays num_games tables at once for duration seconds, or until all
+	are finished. returns (actions, seconds, finished, latencies sorted)"""
+	server = GameServer(players, turn_timeout, seed)
+	clients = [BotClient('bot%d' % i, Random(s)) for i, s in enumerate(derive_seeds(seed, num_games * players))]
+
+	start = time.time()
+	until = lambda: time.time() - start > duration or all(client.finished for client in clients)
+	(run_tcp if tcp else run_local)(server, clients, until)
+	elapsed = time.time() - start
+
+	finished = len(set(client.game.initial_seed for client in clients if client.finished))
+	latencies = sorted(latency for client in clients for latency in client.latencies)
+	return server.actions, elapsed, finished, latencies
+
+
+def main():
+	parser = argparse.ArgumentParser(description = 'Measures the throughput and latency of the game server.')
+	parser.add_argument('-g', '--games', type = int, nargs = '+', default = [1, 10, 100], help = 'numbers of tables played at once')
+	parser.add_argument('-s', '--seed', type = int, default = 0, help = 'master seed of the tables and bots')
+	parser.add_argument('-d', '--duration', type = float, default = 10., help = 'seconds per number of tables, at most')
+	parser.add_argument('--players', type = int, default = 3, choices = (3, 4), help = 'players per table')
+	parser.add_argument('--tcp', action = 'store_true', help = 'connect the bots over TCP on localhost')
+	args = parser.parse_args()
+
+	print '%6s %9s %10s %9s %9s %9s %9s' % ('games', 'actions', 'actions/s', 'p50 ms', 'p99 ms', 'max ms', 'finished')
+	for num_games in args.games:
+		actions, elapsed, finished, latencies = load(num_games, args.seed, args.players, args.duration, args.tcp)
+		print '%6d %9d %10.0f %9.2f %9.2f %9.2f %9d' % (num_games, actions, actions / elapsed, 1000 * (percentile(latencies, 50) or 0), 1000 * (percentile(latencies, 99) or 0), 1000 * (latencies[-1] if latencies else 0), finished)
+
+if __name__ == '__main__':
+	main()
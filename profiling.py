@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# timings of tasks and other code run per frame, kept in process so frame
+# spikes can be found without a PStats server. with Panda3D, every timer
+# is also a PStats collector of the same name, so the same code shows up
+# in pstats when one is attached.
+
+from collections import deque
+import csv
+from math import ceil
+import time
+
+try:
+	from panda3d.core import PStatCollector
+except ImportError:
+	PStatCollector = None
+
+PERCENTILES = (50, 95, 99)
+
+def percentile(values, p):
+	"""returns the p-th percentile of sorted values, by nearest rank"""
+	if not values: return None
+	rank = int(ceil(p / 100. * len(values))) - 1
+	return values[min(max(rank, 0), len(values)-1)]
+
+
+class FrameTimings(object):
+	"""Keeps the last window durations of each timer, by name. Names are
+	PStats collector names, with colons separating levels, e.g.
+	'App:Tasks:mouseTarget'."""
+	def __init__(self, window = 1000):
+		self.window = window
+		self.samples = {}
+		self.collectors = {}
+
+	def add(self, name, seconds):
+		try:
+			self.samples[name].append(seconds)
+		except KeyError:
+			self.samples[name] = deque([seconds], self.window)
+
+	def start(self, name):
+		"""starts the timer name, returns the token to pass to stop"""
+		if PStatCollector:
+			try:
+				collector = self.collectors[name]
+			except KeyError:
+				collector = self.collectors[name] = PStatCollector(name)
+			collector.start()
+		return time.time()
+
+	def stop(self, name, token):
+		self.add(name, time.time() - token)
+		if PStatCollector: self.collectors[name].stop()
+
+	def timer(self, name):
+		"""returns a context manager timing its block as name"""
+		return _Timer(self, name)
+
+	def wrap_task(self, name, task_function):
+		"""returns task_function, timed as name"""
+		def timed_task(task):
+			token = self.start(name)
+			try:
+				return task_function(task)
+			finally:
+				self.stop(name, token)
+		return timed_task
+
+	def summary(self, name):
+		"""returns (count, mean, p50, p95, p99, max) of the durations of
+		name in the window, in seconds"""
+		values = sorted(self.samples.get(name, ()))
+		if not values: return (0, None) + (None,) * len(PERCENTILES) + (None,)
+		return (len(values), sum(values) / len(values)) + tuple(percentile(values, p) for p in PERCENTILES) + (values[-1],)
+
+	def write_csv(self, path):
+		"""writes the summary of all timers to path, in milliseconds"""
+		with open(path, 'wb') as f:
+			writer = csv.writer(f)
+			writer.writerow(['name', 'count', 'mean_ms'] + ['p%d_ms' % p for p in PERCENTILES] + ['max_ms'])
+			for name in sorted(self.samples):
+				summary = self.summary(name)
+				writer.writerow([name, summary[0]] + ['%.3f' % (1000 * t) for t in summary[1:]])
+
+	def __str__(self):
+		lines = []
+		for name in sorted(self.samples):
+			summary = self.summary(name)
+			lines.append('%-32s %6d  mean %7.2f ms  ' % ((name,) + summary[:1] + (1000 * summary[1],)) + '  '.join('p%d %7.2f ms' % (p, 1000 * t) for p, t in zip(PERCENTILES, summary[2:-1])) + '  max %7.2f ms' % (1000 * summary[-1]))
+		return '\n'.join(lines)
+
+
+class _Timer(object):
+	def __init__(self, timings, name):
+		self.timings = timings
+		self.name = name
+
+	def __enter__(self):
+		self.token = self.timings.start(self.name)
+
+	def __exit__(self, *exc_info):
+		self.timings.stop(self.name, self.token)
+		return False
+
+
+# the timings of the application, used by timed
+timings = FrameTimings()
+
+def timed(name):
+	"""decorates a function to be timed as name"""
+	def decorate(f):
+		def timed_function(*args, **kwargs):
+			with timings.timer(name):
+				return f(*args, **kwargs)
+		timed_function.__name__ = f.__name__
+		timed_function.__doc__ = f.__doc__
+		return timed_function
+	return decorate
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# hosts games for clients over TCP, e.g.
+#
+#   $ python serve.py -p 8765
+#
+# messages are lines of JSON, both ways; see GameServer for what they
+# contain. one process and one thread serve all tables, timed out turns are
+# finished between reads
+
+import argparse
+import asynchat
+import asyncore
+import json
+import socket
+import sys
+
+from gamemodel.server import GameServer
+
+class JsonLineChannel(asynchat.async_chat):
+	"""A connection exchanging messages as lines of JSON. Messages received
+	are passed to receive, on_close is called once the connection closed."""
+	def __init__(self, sock = None, map = None, receive = None, on_close = None):
+		asynchat.async_chat.__init__(self, sock, map)
+		self.set_terminator('\n')
+		self.buffer = []
+		self.receive = receive
+		self.on_close = on_close
+		if sock: self.set_nodelay()
+
+	def set_nodelay(self):
+		# messages are small and answered by more messages, do not wait
+		# for the acknowledgement of the last one before sending
+		self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+	def collect_incoming_data(self, data):
+		self.buffer.append(data)
+
+	def found_terminator(self):
+		line = ''.join(self.buffer)
+		self.buffer = []
+		try:
+			message = json.loads(line)
+		except ValueError:
+			self.send_message({'type': 'error', 'id': None, 'message': 'Malformed JSON.'})
+			return
+		self.receive(message)
+
+	def send_message(self, message):
+		self.push(json.dumps(message, separators = (',', ':')) + '\n')
+
+	def handle_close(self):
+		self.close()
+		if self.on_close:
+			self.on_close()
+			self.on_close = None
+
+
+class Listener(asyncore.dispatcher):
+	"""Accepts clients of game_server. port 0 picks a free port, see
+	address"""
+	def __init__(self, game_server, host = '', port = 0, map = None, backlog = 128):
+		asyncore.dispatcher.__init__(self, map = map)
+		self.game_server = game_server
+		self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.set_reuse_addr()
+		self.bind((host, port))
+		self.listen(backlog)
+		self.address = self.socket.getsockname()
+
+	def handle_accept(self):
+		pair = self.accept()
+		if not pair: return
+
+		server = self.game_server
+		channel = JsonLineChannel(pair[0], self._map)
+		session = server.connect(channel.send_message)
+		channel.receive = lambda message: server.handle(session, message)
+		channel.on_close = lambda: server.disconnect(session)
+
+
+def connect(host, port, receive, map = None):
+	"""returns a channel to a server at host:port, passing its messages to
+	receive"""
+	channel = JsonLineChannel(map = map, receive = receive)
+	channel.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+	channel.set_nodelay()
+	channel.connect((host, port))
+	return channel
+
+
+def run(game_server, map = None, until = None, max_wait = 1.):
+	"""serves the channels in map and finishes timed out turns, until until
+	returns true"""
+	while not (until and until()):
+		wait = game_server.poll()
+		asyncore.loop(timeout = max_wait if None == wait else min(wait, max_wait), count = 1, map = map)
+
+
+def main():
+	parser = argparse.ArgumentParser(description = 'Hosts games for clients over TCP.')
+	parser.add_argument('--host', default = '', help = 'address to listen on, all by default')
+	parser.add_argument('-p', '--port', type = int, default = 8765, help = 'port to listen on')
+	parser.add_argument('--players', type = int, default = 3, choices = (3, 4), help = 'players per table, tables start once full')
+	parser.add_argument('-t', '--turn-timeout', type = float, default = 60., help = 'seconds until a turn is finished for the player')
+	parser.add_argument('-s', '--seed', type = int, default = None, help = 'seed the seeds of all tables are drawn from')
+	args = parser.parse_args()
+
+	game_server = GameServer(args.players, args.turn_timeout, args.seed)
+	listener = Listener(game_server, args.host, args.port)
+	sys.stderr.write('serving on %s:%d\n' % listener.address)
+	try:
+		run(game_server)
+	except KeyboardInterrupt:
+		pass
+	print '%d tables, %d actions, %d turns timed out' % (game_server.next_table_id - 1, game_server.actions, game_server.timeouts)
+
+if __name__ == '__main__':
+	main()
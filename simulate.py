@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# plays games between bots, headless, to evaluate rules and boards. e.g.
+#
+#   $ python simulate.py -n 10000 -s 42 -o results.jsonl
+#
+# results with the same master seed are the same, no matter how many
+# processes are used
+
+import argparse
+import json
+import sys
+import time
+
+from gamemodel.simulation import simulate
+
+def main():
+	parser = argparse.ArgumentParser(description = 'Plays games between bots.')
+	parser.add_argument('-n', '--games', type = int, default = 1000, help = 'number of games to play')
+	parser.add_argument('-s', '--seed', type = int, default = 0, help = 'master seed, the seeds of all games are derived from it')
+	parser.add_argument('-p', '--processes', type = int, default = None, help = 'number of worker processes, one per core by default')
+	parser.add_argument('--players', type = int, default = 3, help = 'number of players per game')
+	parser.add_argument('--max-actions', type = int, default = 10000, help = 'games are cut off after this many actions')
+	parser.add_argument('-o', '--output', help = 'file to write the result of each game to, as a line of JSON')
+	args = parser.parse_args()
+
+	output = open(args.output, 'w') if args.output else None
+	finished = 0
+	seats = [0] * args.players
+
+	start = time.time()
+	for i, result in enumerate(simulate(args.games, args.seed, args.processes, num_players = args.players, max_actions = args.max_actions)):
+		if output: output.write(json.dumps(result._asdict()) + '\n')
+		if result.winner:
+			finished += 1
+			seats[result.winner_seat] += 1
+
+		if 0 == (i+1) % 100:
+			sys.stderr.write('%d games, %.1f games/s\r' % (i+1, (i+1) / (time.time() - start)))
+	elapsed = time.time() - start
+
+	if output: output.close()
+
+	print '%d games in %.1fs, %.1f games/s' % (args.games, elapsed, args.games / elapsed)
+	print '%d finished, wins by seat: %s' % (finished, ', '.join('%.1f%%' % (100.0 * wins / max(finished, 1)) for wins in seats))
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# coding=utf8
+
+# renders generated boards to images, without a window, e.g. to review the
+# board generator or to time frames on a machine without a GPU
+#
+#   $ python snapshot.py -n 1000 -s 42 -o snapshots/
+#
+# boards with the same master seed are the same every time. by default the
+# software rasterizer is used, pass --display pandagl for the GPU
+
+import argparse
+from math import radians, tan
+import os
+from random import Random
+import time
+
+from gamemodel.board import Board
+from gamemodel.layout import LayoutSampler
+from gamemodel.simulation import derive_seeds
+from gamemodel.tiles import board_setup
+
+_base = None
+
+def offscreen_base(size = (800, 600), display = None):
+	"""returns a ShowBase rendering into an offscreen buffer of size. there
+	can only be one per process, later calls return the first"""
+	global _base
+	if not _base:
+		from pandac.PandaModules import loadPrcFileData
+		loadPrcFileData('', 'window-type offscreen')
+		loadPrcFileData('', 'win-size %d %d' % size)
+		loadPrcFileData('', 'audio-library-name null')
+		if display: loadPrcFileData('', 'load-display %s' % display)
+
+		from direct.showbase.ShowBase import ShowBase
+		_base = ShowBase()
+	return _base
+
+
+def aim_camera(base, radius):
+	"""points the camera down on a board of radius, far enough away to see
+	all tiles, at a slant so the chips show"""
+	extent = 1.5 * radius + 1.5
+	distance = 1.1 * extent / tan(radians(min(base.camLens.getFov()) / 2))
+	base.camera.setPos(0, -0.4 * distance, distance)
+	base.camera.lookAt(0, 0, 0)
+
+
+class Snapshots(object):
+	"""Renders boards with a fixed camera looking down on them. The
+	graphics engine and the tileset, with all its cached assets, are shared
+	by all boards; each board only adds its own scene."""
+	def __init__(self, base, radius = 2):
+		from boardtest import SimpleTileset, setup_lights
+
+		self.base = base
+		self.radius = radius
+		self.tileset = SimpleTileset(base)
+		self.frame_times = []
+
+		base.disableMouse()
+		setup_lights(base.render)
+		aim_camera(base, radius)
+
+	def board(self, seed, sampler = None):
+		"""returns the board generated from seed"""
+		setup, chips = board_setup(self.radius)
+		board = Board(Random(seed))
+		board.generate_board(setup, chips, sampler = sampler)
+		return board
+
+	def render(self, board, path = None, frames = 1):
+		"""renders board, frames times, and saves the last frame to path"""
+		from boardtest import BoardRenderer
+		from panda3d.core import Filename
+
+		renderer = BoardRenderer(self.base, board, tileset = self.tileset)
+		try:
+			for i in range(0, frames):
+				start = time.time()
+				self.base.graphicsEngine.renderFrame()
+				self.frame_times.append(time.time() - start)
+
+			if path:
+				# the frame rendered last is in the back buffer until the
+				# next one
+				self.base.graphicsEngine.renderFrame()
+				if not self.base.win.saveScreenshot(Filename.fromOsSpecific(path)): raise IOError('Cannot write %s.' % path)
+		finally:
+			renderer.destroy()
+
+
+def main():
+	parser = argparse.ArgumentParser(description = 'Renders generated boards to images, without a window.')
+	parser.add_argument('-n', '--boards', type = int, default = 10, help = 'number of boards')
+	parser.add_argument('-s', '--seed', type = int, default = 0, help = 'master seed, the seeds of all boards are derived from it')
+	parser.add_argument('-o', '--output', default = 'snapshots', help = 'directory to write the images to, nothing is written if empty')
+	parser.add_argument('-r', '--radius', type = int, default = 2, help = 'board radius, 2 is the standard board')
+	parser.add_argument('--balanced', action = 'store_true', help = 'generate balanced boards')
+	parser.add_argument('--size', type = int, nargs = 2, default = (800, 600), metavar = ('WIDTH', 'HEIGHT'), help = 'image size')
+	parser.add_argument('--frames', type = int, default = 1, help = 'frames rendered per board, for timing')
+	parser.add_argument('--display', default = 'p3tinydisplay', help = 'display module, the software rasterizer by default')
+	args = parser.parse_args()
+
+	if args.output and not os.path.isdir(args.output): os.makedirs(args.output)
+
+	snapshots = Snapshots(offscreen_base(tuple(args.size), args.display), args.radius)
+	sampler = LayoutSampler.balanced() if args.balanced else None
+
+	start = time.time()
+	for i, seed in enumerate(derive_seeds(args.seed, args.boards)):
+		path = os.path.join(args.output, 'board-%05d-%d.png' % (i, seed)) if args.output else None
+		snapshots.render(snapshots.board(seed, sampler), path, args.frames)
+	elapsed = time.time() - start
+
+	frame_times = sorted(snapshots.frame_times)
+	print '%d boards in %.1fs, %.1f boards/s' % (args.boards, elapsed, args.boards / elapsed)
+	if frame_times: print 'frame times: %.2f ms mean, %.2f ms median, %.2f ms max' % (1000 * sum(frame_times) / len(frame_times), 1000 * frame_times[len(frame_times)/2], 1000 * frame_times[-1])
+	print snapshots.tileset.assets
+
+if __name__ == '__main__':
+	main()
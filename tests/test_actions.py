@@ -6,6 +6,7 @@ try: import unittest2 as unittest
 except ImportError: import unittest
 from mock import Mock
 import mock
+from random import Random
 
 from gamemodel.game import Game
 from gamemodel.actions import *
@@ -95,3 +96,301 @@ class TestStartGameAction(unittest.TestCase, TestPlayerActionMixin):
 				game.create_player('Player %d' % n)
 			with self.assertRaises(IllegalActionException):
 				self.action.assert_legal(game)
+
+
+def game_state(game):
+	# everything that changes during play, for comparisons
+	state = [game.phase, game.turn, game.round, game.turn_order, game.winner, game.dice_roll,
+	         game.robber_pending, game.setup_settlement, game.setup_road, game.random.getstate(),
+	         dict((color, dict(player.resources)) for color, player in game.players.iteritems())]
+	if game.board:
+		board = game.board
+		state += [board.robber, sorted(board.available_nodes()), board.count_buildings(), board.count_roads(),
+		          [board.building_owner(n) for n in board.topology.nodes],
+		          [board.road_owner(u, v) for u, v in board.topology.edge_ids()]]
+	return state
+
+
+def candidate_actions(game):
+	# every action that could possibly be legal
+	board = game.board
+	for color in game.players:
+		yield RollDiceAction(color)
+		yield EndTurnAction(color)
+		for node_id in board.topology.nodes:
+			yield BuildSettlementAction(color, node_id)
+			yield BuildCityAction(color, node_id)
+		for edge in board.topology.edge_ids():
+			yield BuildRoadAction(color, edge)
+		for pos in board.tiles:
+			yield MoveRobberAction(color, pos)
+		for give in RESOURCES:
+			for get in RESOURCES:
+				yield TradeAction(color, give, get)
+
+
+def legal_candidates(game):
+	actions = []
+	for action in candidate_actions(game):
+		try:
+			action.assert_legal(game)
+			actions.append(action)
+		except IllegalActionException:
+			pass
+	return actions
+
+
+class GameActionTestCase(unittest.TestCase):
+	compact = False
+
+	def setUp(self):
+		self.game = Game(5, compact_board = self.compact)
+		for color in 'red', 'blue', 'green':
+			self.game.create_player(color, color)
+		StartGameAction('red').apply(self.game)
+
+	def play_setup(self):
+		# place settlements and roads on the first legal spots
+		while 'setup' == self.game.phase:
+			player = self.game.current_player
+			node_id = sorted(self.game.board.available_nodes())[0]
+			BuildSettlementAction(player, node_id).apply(self.game)
+			BuildRoadAction(player, (node_id, self.game.board.network.neighbors(node_id)[0])).apply(self.game)
+			EndTurnAction(player).apply(self.game)
+
+	def give_resources(self, color, amount = 10):
+		for resource in self.game.players[color].resources:
+			self.game.players[color].resources[resource] = amount
+
+	def roll(self, number):
+		# roll until number comes up, then keep the roll
+		while True:
+			token = RollDiceAction(self.game.current_player).apply(self.game)
+			if number == self.game.dice_roll: return token
+			self.game.undo(token)
+			self.game.random.random()
+
+
+class TestSetupPhaseActions(GameActionTestCase):
+	def test_setup_turn_requires_settlement_then_road(self):
+		player = self.game.current_player
+		node_id = sorted(self.game.board.available_nodes())[0]
+		edge = (node_id, self.game.board.network.neighbors(node_id)[0])
+
+		with self.assertRaises(IllegalActionException):
+			EndTurnAction(player).apply(self.game)
+		with self.assertRaises(IllegalActionException):
+			BuildRoadAction(player, edge).apply(self.game)
+
+		BuildSettlementAction(player, node_id).apply(self.game)
+		with self.assertRaises(IllegalActionException):
+			BuildSettlementAction(player, sorted(self.game.board.available_nodes())[0]).apply(self.game)
+
+		BuildRoadAction(player, edge).apply(self.game)
+		EndTurnAction(player).apply(self.game)
+		self.assertNotEqual(player, self.game.current_player)
+
+	def test_only_current_player_can_act(self):
+		other = [color for color in self.game.players if color != self.game.current_player][0]
+		with self.assertRaises(IllegalActionException):
+			BuildSettlementAction(other, sorted(self.game.board.available_nodes())[0]).apply(self.game)
+
+	def test_setup_road_must_touch_new_settlement(self):
+		player = self.game.current_player
+		node_id = sorted(self.game.board.available_nodes())[0]
+		BuildSettlementAction(player, node_id).apply(self.game)
+
+		far = [e for e in self.game.board.topology.edge_ids() if not node_id in e][0]
+		with self.assertRaises(IllegalActionException):
+			BuildRoadAction(player, far).apply(self.game)
+
+	def test_setup_ends_after_two_rounds(self):
+		self.play_setup()
+		self.assertEqual('main', self.game.phase)
+		self.assertEqual(self.game.turn_order[0], self.game.current_player)
+		for color in self.game.players:
+			self.assertEqual(2, self.game.board.count_buildings()[0][color])
+			self.assertEqual(2, self.game.board.count_roads()[color])
+
+	def test_second_settlement_yields_resources(self):
+		self.play_setup()
+		for color, player in self.game.players.iteritems():
+			self.assertTrue(sum(player.resources.values()) > 0)
+
+
+class TestMainPhaseActions(GameActionTestCase):
+	def setUp(self):
+		super(TestMainPhaseActions, self).setUp()
+		self.play_setup()
+		self.player = self.game.current_player
+
+	def test_dice_have_to_be_rolled_first(self):
+		with self.assertRaises(IllegalActionException):
+			EndTurnAction(self.player).apply(self.game)
+
+		RollDiceAction(self.player).apply(self.game)
+		with self.assertRaises(IllegalActionException):
+			RollDiceAction(self.player).apply(self.game)
+
+	def test_seven_requires_robber_move(self):
+		self.roll(7)
+		with self.assertRaises(IllegalActionException):
+			EndTurnAction(self.player).apply(self.game)
+		with self.assertRaises(IllegalActionException):
+			MoveRobberAction(self.player, self.game.board.robber).apply(self.game)
+
+		pos = [pos for pos in self.game.board.tiles if pos != self.game.board.robber][0]
+		MoveRobberAction(self.player, pos).apply(self.game)
+		self.assertEqual(pos, self.game.board.robber)
+		EndTurnAction(self.player).apply(self.game)
+
+	def test_building_costs_resources(self):
+		self.roll(8)
+		for resource in self.game.players[self.player].resources:
+			self.game.players[self.player].resources[resource] = 0
+
+		node_id = [n for n in self.game.board.topology.nodes if (self.player, 'settlement') == self.game.board.building_owner(n)][0]
+		with self.assertRaises(IllegalActionException):
+			BuildCityAction(self.player, node_id).apply(self.game)
+
+		self.give_resources(self.player, 3)
+		BuildCityAction(self.player, node_id).apply(self.game)
+		self.assertEqual(0, self.game.players[self.player].resources['Ore'])
+		self.assertEqual(1, self.game.players[self.player].resources['Grain'])
+		self.assertEqual(3, self.game.victory_points(self.player))
+
+	def test_roads_have_to_be_connected(self):
+		self.roll(8)
+		self.give_resources(self.player)
+
+		for u, v in self.game.board.topology.edge_ids():
+			if self.game.board.road_owner(u, v): continue
+			action = BuildRoadAction(self.player, (u, v))
+			connected = self.game.board.player_roads_at(u, self.player) or self.game.board.player_roads_at(v, self.player)
+			if not connected:
+				with self.assertRaises(IllegalActionException):
+					action.apply(self.game)
+
+	def test_trading_with_the_bank(self):
+		self.roll(8)
+		for resource in self.game.players[self.player].resources:
+			self.game.players[self.player].resources[resource] = 3
+		with self.assertRaises(IllegalActionException):
+			TradeAction(self.player, 'Ore', 'Ore').apply(self.game)
+
+		give = [resource for resource in RESOURCES if 4 == self.game.trade_ratio(self.player, resource)][0]
+		with self.assertRaises(IllegalActionException):
+			TradeAction(self.player, give, 'Grain' if 'Ore' == give else 'Ore').apply(self.game)
+
+		self.game.players[self.player].resources[give] = 4
+		get = 'Grain' if 'Ore' == give else 'Ore'
+		TradeAction(self.player, give, get).apply(self.game)
+		self.assertEqual(0, self.game.players[self.player].resources[give])
+		self.assertEqual(4, self.game.players[self.player].resources[get])
+
+	def test_harbors_lower_trade_ratio(self):
+		board = self.game.board
+		harbors = dict((board.network.node[n]['harbor'], n) for n in board.topology.nodes if 'harbor' in board.network.node[n])
+		for n in list(board.player_nodes(self.player)):
+			board.update_building(board.topology.nodes[n], None, None)
+		self.assertEqual(4, self.game.trade_ratio(self.player, 'Ore'))
+
+		board.update_building(harbors['3to1'], self.player, 'settlement')
+		self.assertEqual(3, self.game.trade_ratio(self.player, 'Ore'))
+		board.update_building(harbors['Ore'], self.player, 'settlement')
+		self.assertEqual(2, self.game.trade_ratio(self.player, 'Ore'))
+		self.assertEqual(3, self.game.trade_ratio(self.player, 'Wool'))
+
+	def test_reaching_victory_points_ends_game(self):
+		self.roll(8)
+		self.give_resources(self.player, 20)
+		self.game.victory_points_to_win = 4
+
+		first, second = [n for n in self.game.board.topology.nodes if (self.player, 'settlement') == self.game.board.building_owner(n)]
+		BuildCityAction(self.player, first).apply(self.game)
+		self.assertEqual('main', self.game.phase)
+
+		token = BuildCityAction(self.player, second).apply(self.game)
+		self.assertEqual('finished', self.game.phase)
+		self.assertEqual(self.player, self.game.winner)
+		with self.assertRaises(IllegalActionException):
+			EndTurnAction(self.player).apply(self.game)
+
+		self.game.undo(token)
+		self.assertEqual('main', self.game.phase)
+		self.assertIsNone(self.game.winner)
+
+
+class TestUndo(GameActionTestCase):
+	def test_start_game_can_be_undone(self):
+		game = Game(3)
+		for color in 'red', 'blue', 'green':
+			game.create_player(color, color)
+		before = game_state(game)
+
+		token = StartGameAction('red').apply(game)
+		game.undo(token)
+		self.assertEqual(before, game_state(game))
+		self.assertIsNone(game.board)
+
+	def test_apply_then_undo_restores_state(self):
+		random = Random(1)
+		for step in range(0, 120):
+			if 'main' == self.game.phase:
+				self.give_resources(self.game.current_player, 5)
+
+			actions = legal_candidates(self.game)
+			if not actions: break
+
+			# every legal action must be undoable
+			before = game_state(self.game)
+			for action in actions:
+				self.game.undo(action.apply(self.game))
+				self.assertEqual(before, game_state(self.game))
+
+			random.choice(actions).apply(self.game)
+
+
+class TestUndoCompact(TestUndo):
+	compact = True
+
+
+class TestLegalActions(GameActionTestCase):
+	def serialized(self, actions):
+		return sorted(action.serialize(self.game) for action in actions)
+
+	def test_init_phase_allows_starting_with_enough_players(self):
+		game = Game(3)
+		game.create_player('red', 'red')
+		game.create_player('blue', 'blue')
+		self.assertEqual([], game.legal_actions())
+
+		game.create_player('green', 'green')
+		self.assertEqual(['blue', 'green', 'red'], [action.player for action in game.legal_actions()])
+		for action in game.legal_actions():
+			action.assert_legal(game)
+
+	def test_matches_legal_candidates(self):
+		random = Random(4)
+		for step in range(0, 300):
+			if 'main' == self.game.phase and random.random() < 0.5:
+				self.give_resources(self.game.current_player, random.randint(0, 4))
+
+			actions = self.game.legal_actions()
+			self.assertEqual(self.serialized(legal_candidates(self.game)), self.serialized(actions))
+			if not actions: break
+
+			random.choice(actions).apply(self.game)
+
+	def test_no_actions_when_finished(self):
+		self.play_setup()
+		self.game.phase = 'finished'
+		self.assertEqual([], self.game.legal_actions())
+
+	def test_main_phase_starts_with_rolling(self):
+		self.play_setup()
+		self.assertEqual([('D', self.game.current_player)], self.serialized(self.game.legal_actions()))
+
+
+class TestLegalActionsCompact(TestLegalActions):
+	compact = True
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+import os
+import shutil
+import tempfile
+
+from assetcompiler import *
+
+class TestCompiledAssets(unittest.TestCase):
+	def setUp(self):
+		self.root = tempfile.mkdtemp() + os.sep
+		os.makedirs(os.path.join(self.root, 'models'))
+		self.write('models/chip.egg', '<CoordinateSystem> { Z-Up }')
+
+	def tearDown(self):
+		shutil.rmtree(self.root)
+
+	def write(self, path, content):
+		with open(os.path.join(self.root, path), 'w') as f:
+			f.write(content)
+
+	def compile(self, compiled, path):
+		# stands in for writing a model or texture
+		with open(compiled.prepare(path), 'w') as f:
+			f.write('compiled')
+		compiled.record(path)
+
+	def test_output_paths(self):
+		compiled = CompiledAssets(self.root)
+		self.assertEqual(os.path.join('compiled', 'models', 'chip.bam'), compiled.output_path('models/chip.egg'))
+		self.assertEqual(os.path.join('compiled', 'textures', 'chip2.txo'), compiled.output_path('textures/chip2.png'))
+
+	def test_nothing_compiled(self):
+		self.assertIsNone(CompiledAssets(self.root).lookup('models/chip.egg'))
+
+	def test_fresh_asset_survives_reload(self):
+		self.compile(CompiledAssets(self.root), 'models/chip.egg')
+		self.assertTrue(os.path.exists(os.path.join(self.root, MANIFEST)))
+		self.assertEqual(os.path.join('compiled', 'models', 'chip.bam'), CompiledAssets(self.root).lookup('models/chip.egg'))
+
+	def test_changed_source_is_stale(self):
+		compiled = CompiledAssets(self.root)
+		self.compile(compiled, 'models/chip.egg')
+		self.write('models/chip.egg', '<CoordinateSystem> { Y-Up }')
+		self.assertIsNone(CompiledAssets(self.root).lookup('models/chip.egg'))
+
+	def test_touched_source_stays_fresh(self):
+		compiled = CompiledAssets(self.root)
+		self.compile(compiled, 'models/chip.egg')
+		source = os.path.join(self.root, 'models/chip.egg')
+		stat = os.stat(source)
+		os.utime(source, (stat.st_atime, stat.st_mtime + 10))
+
+		self.assertTrue(CompiledAssets(self.root).lookup('models/chip.egg'))
+		self.assertEqual(os.stat(source).st_mtime, CompiledAssets(self.root).entries['models/chip.egg']['mtime'])
+
+	def test_missing_output_is_stale(self):
+		compiled = CompiledAssets(self.root)
+		self.compile(compiled, 'models/chip.egg')
+		os.remove(os.path.join(self.root, compiled.output_path('models/chip.egg')))
+		self.assertIsNone(compiled.lookup('models/chip.egg'))
+
+	def test_is_model(self):
+		self.assertTrue(is_model('models/chip.egg'))
+		self.assertFalse(is_model('textures/chip2.png'))
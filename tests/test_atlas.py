@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from glob import glob
+import os
+import shutil
+import tempfile
+
+from atlas import *
+
+def overlaps(a, b):
+	ax, ay, aw, ah = a
+	bx, by, bw, bh = b
+	return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+class TestPack(unittest.TestCase):
+	def check_packing(self, sizes, placements, atlases, padding):
+		for i, ((w, h), (a, x, y)) in enumerate(zip(sizes, placements)):
+			aw, ah = atlases[a]
+			self.assertTrue(padding <= x and x + w + padding <= aw)
+			self.assertTrue(padding <= y and y + h + padding <= ah)
+
+			for j in range(0, i):
+				b, bx, by = placements[j]
+				bw, bh = sizes[j]
+				if a == b: self.assertFalse(overlaps((x-padding, y-padding, w+2*padding, h+2*padding), (bx, by, bw, bh)))
+
+	def test_pack_single_atlas(self):
+		sizes = [(512, 512)] * 10 + [(256, 300), (100, 40), (662, 1024)]
+		placements, atlases = pack(sizes, max_size = 4096, padding = 2)
+		self.assertEqual(1, len(atlases))
+		self.check_packing(sizes, placements, atlases, 2)
+
+	def test_atlas_sizes_are_powers_of_two(self):
+		placements, atlases = pack([(100, 30), (20, 70)], padding = 1)
+		self.assertEqual([(128, 128)], atlases)
+
+	def test_pack_starts_new_atlases(self):
+		sizes = [(512, 512)] * 20
+		placements, atlases = pack(sizes, max_size = 1100, padding = 2)
+		self.assertEqual(5, len(atlases))
+		self.check_packing(sizes, placements, atlases, 2)
+		self.assertEqual(set(range(0, 5)), set(a for a, x, y in placements))
+
+	def test_too_large_image(self):
+		self.assertRaises(ValueError, pack, [(100, 100), (2000, 10)], max_size = 1024)
+
+	def test_pack_nothing(self):
+		self.assertEqual(([], []), pack([]))
+
+
+class TestAtlasManifest(unittest.TestCase):
+	def setUp(self):
+		self.paths = ['a.png', 'b.png', 'c.png']
+		self.manifest = AtlasManifest.for_sizes(self.paths, [(64, 64), (32, 16), (64, 32)], padding = 0)
+
+	def test_regions_map_unit_square_onto_rect(self):
+		w, h = self.manifest.sizes[0]
+		for path in self.paths:
+			region = self.manifest.regions[path]
+			x, y, rw, rh = region.rect
+
+			# (0, 0) is the bottom left corner of the rect, v runs upwards
+			self.assertAlmostEqual(x / float(w), region.offset[0])
+			self.assertAlmostEqual((h - y - rh) / float(h), region.offset[1])
+			self.assertAlmostEqual((x + rw) / float(w), region.offset[0] + region.scale[0])
+			self.assertAlmostEqual((h - y) / float(h), region.offset[1] + region.scale[1])
+
+	def test_contains(self):
+		self.assertTrue('a.png' in self.manifest)
+		self.assertFalse('d.png' in self.manifest)
+		self.assertEqual(['atlas0.png'], self.manifest.images)
+
+	def test_save_and_load(self):
+		directory = tempfile.mkdtemp()
+		try:
+			path = os.path.join(directory, MANIFEST)
+			self.manifest.save(path)
+			loaded = AtlasManifest.load(path)
+			self.assertEqual(self.manifest.images, loaded.images)
+			self.assertEqual(self.manifest.sizes, loaded.sizes)
+			self.assertEqual(self.manifest.regions, loaded.regions)
+			self.assertEqual(self.manifest.padding, loaded.padding)
+		finally:
+			shutil.rmtree(directory)
+
+	def test_load_without_manifest(self):
+		self.assertIsNone(AtlasManifest.load('no/such/atlas.json'))
+
+	def test_default_atlases_match_textures(self):
+		for root_path, patterns in DEFAULT_ATLASES:
+			for pattern in patterns:
+				self.assertTrue(glob(os.path.join(root_path, pattern)), pattern)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# coding=utf8
+
+try: import unittest2 as unittest
+except ImportError: import unittest
+import os
+import shutil
+import tempfile
+
+import benchmarks
+from benchmarks import *
+
+class TestBenchmarks(unittest.TestCase):
+	def setUp(self):
+		self.registered = benchmarks.BENCHMARKS[:]
+
+	def tearDown(self):
+		benchmarks.BENCHMARKS[:] = self.registered
+
+	def test_benchmarks_are_registered_per_radius(self):
+		calls = []
+		@benchmark('test.radius', (2, 3))
+		def f(radius):
+			calls.append(radius)
+			return lambda: None
+
+		names = [name for name, setup in benchmarks.BENCHMARKS if name.startswith('test.radius')]
+		self.assertEqual(['test.radius[r=2]', 'test.radius[r=3]'], names)
+
+		results = run('test.radius', min_time = 0.001, repeat = 1)
+		self.assertEqual(sorted(names), sorted(results))
+		self.assertEqual([2, 3], calls)
+
+	def test_teardown_is_called_after_timing(self):
+		calls = []
+		@benchmark('test.teardown')
+		def f():
+			def g():
+				calls.append('call')
+			g.teardown = lambda: calls.append('teardown')
+			return g
+
+		run('test.teardown', min_time = 0.001, repeat = 1)
+		self.assertEqual('teardown', calls[-1])
+		self.assertEqual(1, calls.count('teardown'))
+
+	def test_measure_returns_time_per_call(self):
+		t = measure(lambda: None, min_time = 0.001, repeat = 2)
+		self.assertTrue(0 < t < 0.001)
+
+	def test_compare_reports_regressions_above_threshold(self):
+		baseline = {'a': 1.0, 'b': 1.0, 'c': 1.0}
+		results = {'a': 1.1, 'b': 1.5, 'c': 0.5, 'd': 9.0}
+		self.assertEqual([('b', 1.0, 1.5, 1.5)], compare(results, baseline, 0.2))
+		self.assertEqual(['a', 'b'], [r[0] for r in compare(results, baseline, 0.05)])
+
+	def test_baseline_round_trip(self):
+		directory = tempfile.mkdtemp()
+		try:
+			path = os.path.join(directory, 'baseline.json')
+			save_baseline(path, {'a': 0.25})
+			self.assertEqual({'a': 0.25}, load_baseline(path))
+		finally:
+			shutil.rmtree(directory)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.board import *
+
+class BoardTestMixin(object):
+	compact = False
+
+	def setUp(self):
+		self.board = Board(Random(7), compact = self.compact)
+		self.board.generate_board()
+		self.nodes = self.board.topology.nodes
+
+	def scan_available(self):
+		# the distance rule, checked on the network
+		available = []
+		for n in self.board.network.nodes_iter():
+			if 'building' in self.board.network.node[n]: continue
+			if any('building' in self.board.network.node[m] for m in self.board.network.neighbors(n)): continue
+			available.append(n)
+		return available
+
+
+class TestNodeAvailability(BoardTestMixin):
+	def test_all_nodes_available_on_empty_board(self):
+		self.assertItemsEqual(self.nodes, self.board.available_nodes())
+		for n in self.nodes:
+			self.assertTrue(self.board.node_available(n))
+
+	def test_building_blocks_node_and_neighbours(self):
+		n = self.nodes[10]
+		self.board.update_building(n, 'red', 'settlement')
+
+		self.assertFalse(self.board.node_available(n))
+		for m in self.board.network.neighbors(n):
+			self.assertFalse(self.board.node_available(m))
+		self.assertEqual(len(self.nodes)-1-len(self.board.network.neighbors(n)), len(list(self.board.available_nodes())))
+
+	def test_upgrade_keeps_node_blocked(self):
+		n = self.nodes[10]
+		self.board.update_building(n, 'red', 'settlement')
+		self.board.update_building(n, 'red', 'city')
+		self.assertItemsEqual(self.scan_available(), self.board.available_nodes())
+
+	def test_removal_frees_nodes(self):
+		self.board.update_building(self.nodes[10], 'red', 'settlement')
+		self.board.update_building(self.nodes[10], None, None)
+
+		self.assertNotIn('building', self.board.network.node[self.nodes[10]])
+		self.assertItemsEqual(self.nodes, self.board.available_nodes())
+
+	def test_available_nodes_match_scan(self):
+		random = Random(3)
+		placed = []
+		for i in range(0, 40):
+			if placed and random.random() < 0.3:
+				n = placed.pop(random.randint(0, len(placed)-1))
+				self.board.update_building(n, None, None)
+			else:
+				available = list(self.board.available_nodes())
+				if not available: break
+				n = random.choice(available)
+				self.board.update_building(n, random.choice(['red', 'blue']), random.choice(['settlement', 'city']))
+				placed.append(n)
+
+			available = self.scan_available()
+			self.assertItemsEqual(available, self.board.available_nodes())
+			for n in self.nodes:
+				self.assertEqual(n in available, self.board.node_available(n))
+
+
+class TestNodeAvailabilityNetworkx(TestNodeAvailability, unittest.TestCase):
+	pass
+
+
+class TestNodeAvailabilityCompact(TestNodeAvailability, unittest.TestCase):
+	compact = True
+
+
+class TestBuildingCounters(BoardTestMixin):
+	def test_empty_board_has_no_buildings(self):
+		self.assertEqual(({}, {}), self.board.count_buildings())
+		self.assertTrue(self.board.building_counts_consistent())
+
+	def test_counts_are_kept_up_to_date(self):
+		self.board.update_building(self.nodes[0], 'red', 'settlement')
+		self.board.update_building(self.nodes[20], 'red', 'settlement')
+		self.board.update_building(self.nodes[40], 'blue', 'settlement')
+		self.assertEqual(({'red': 2, 'blue': 1}, {}), self.board.count_buildings())
+
+		self.board.update_building(self.nodes[20], 'red', 'city')
+		self.assertEqual(({'red': 1, 'blue': 1}, {'red': 1}), self.board.count_buildings())
+
+		self.board.update_building(self.nodes[40], None, None)
+		self.assertEqual(({'red': 1}, {'red': 1}), self.board.count_buildings())
+		self.assertTrue(self.board.building_counts_consistent())
+
+	def test_counts_are_defaultdicts(self):
+		settlements, cities = self.board.count_buildings()
+		self.assertEqual(0, settlements['red'])
+		self.assertEqual(0, cities['red'])
+
+	def test_returned_counts_are_copies(self):
+		self.board.update_building(self.nodes[0], 'red', 'settlement')
+		settlements, cities = self.board.count_buildings()
+		settlements['red'] = 10
+		self.assertEqual(1, self.board.count_buildings()[0]['red'])
+
+	def test_counts_match_scan(self):
+		random = Random(5)
+		for i in range(0, 60):
+			n = random.choice(self.nodes)
+			building = random.choice([None, 'settlement', 'city'])
+			self.board.update_building(n, random.choice(['red', 'blue', 'green']) if building else None, building)
+			self.assertTrue(self.board.building_counts_consistent())
+
+	def test_inconsistency_is_detected(self):
+		self.board.update_building(self.nodes[0], 'red', 'settlement')
+		self.board.network.node[self.nodes[0]]['building'] = 'city'
+		self.assertFalse(self.board.building_counts_consistent())
+
+
+class TestBuildingCountersNetworkx(TestBuildingCounters, unittest.TestCase):
+	pass
+
+
+class TestBuildingCountersCompact(TestBuildingCounters, unittest.TestCase):
+	compact = True
+
+
+class TestBoardSetup(unittest.TestCase):
+	def test_radius_two_is_the_standard_board(self):
+		setup, chips = board_setup(2)
+		self.assertEqual(STANDARD_BOARD_TILES, setup)
+		self.assertEqual(sorted(STANDARD_BOARD_CHIPS), sorted(chips))
+
+	def test_setups_fill_boards_of_any_radius(self):
+		for radius in range(0, 7):
+			setup, chips = board_setup(radius)
+			board = Board(Random(1))
+			board.generate_board(setup, chips)
+			self.assertEqual(radius, board.radius)
+			self.assertEqual(len(board.topology.tiles), len(board.tiles))
+			self.assertEqual(sum(1 for tile in board.tiles.itervalues() if tile.resource), len(chips))
+
+
+class TestBoardObservers(BoardTestMixin, unittest.TestCase):
+	def setUp(self):
+		super(TestBoardObservers, self).setUp()
+		self.changes = []
+		self.board.add_observer(lambda *change: self.changes.append(change))
+
+	def test_changes_are_reported(self):
+		u, v = self.board.topology.edge_ids().next()
+		self.board.update_building(u, 'red', 'settlement')
+		self.board.update_road(u, v, 'red')
+		old = self.board.robber
+		self.board.move_robber(self.board.topology.tiles[0])
+		self.board.update_building(u, None, None)
+
+		self.assertEqual([('building', u), ('road', u, v), ('robber', old), ('building', u)], self.changes)
+
+	def test_removed_observers_are_not_called(self):
+		observer = self.board.observers[0]
+		self.board.remove_observer(observer)
+		self.board.update_building(self.nodes[0], 'red', 'city')
+		self.assertEqual([], self.changes)
+
+	def test_clones_have_no_observers(self):
+		clone = self.board.clone(Random(1))
+		clone.update_building(self.nodes[0], 'red', 'city')
+		self.assertEqual([], self.changes)
+		self.assertEqual([], clone.observers)
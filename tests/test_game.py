@@ -206,3 +206,73 @@ class TestPlayer(unittest.TestCase):
 		for res in ['Ore', 'Lumber', 'Wool', 'Brick', 'Grain']:
 			self.assertIn(res, self.player.resources)
 			self.assertEqual(0, self.player.resources[res])
+
+
+class TestGameClone(unittest.TestCase):
+	compact = False
+
+	def setUp(self):
+		self.game = Game(4, compact_board = self.compact)
+		self.game.create_player('playerOne', 'red')
+		self.game.create_player('playerTwo', 'blue')
+		self.game.create_player('playerThree', 'green')
+		StartGameAction('red').apply(self.game)
+
+		self.player = self.game.current_player
+		self.node_id = sorted(self.game.board.available_nodes())[0]
+
+	def test_clone_shares_topology(self):
+		clone = self.game.clone()
+		self.assertIs(self.game.board.topology, clone.board.topology)
+		self.assertIs(self.game.board.tiles, clone.board.tiles)
+		self.assertIsNot(self.game.board, clone.board)
+		self.assertIs(clone.random, clone.board.random)
+
+	def test_clone_is_independent(self):
+		clone = self.game.clone()
+		BuildSettlementAction(self.player, self.node_id).apply(clone)
+		clone.players[self.player].resources['Ore'] = 5
+
+		self.assertTrue(self.game.board.node_available(self.node_id))
+		self.assertFalse(clone.board.node_available(self.node_id))
+		self.assertEqual({}, self.game.board.count_buildings()[0])
+		self.assertNotIn('building', self.game.board.network.node[self.node_id])
+		self.assertEqual(0, self.game.players[self.player].resources['Ore'])
+
+	def test_clone_copies_only_attribute_dicts(self):
+		network = self.game.board.network
+		network.node[self.node_id]['test'] = ['shared']
+		clone = self.game.clone()
+		attributes = clone.board.network.node[self.node_id]
+		self.assertIsNot(network.node[self.node_id], attributes)
+		self.assertIs(network.node[self.node_id]['test'], attributes['test'])
+		del network.node[self.node_id]['test']
+
+	def test_cloned_roads_are_independent(self):
+		u, v = self.node_id, self.game.board.network.neighbors(self.node_id)[0]
+		clone = self.game.clone()
+		clone.board.update_road(u, v, self.player)
+		self.assertEqual(self.player, clone.board.road_owner(v, u))
+		self.assertEqual(self.player, clone.board.network.edge[v][u]['player'])
+		self.assertIsNone(self.game.board.road_owner(u, v))
+		self.assertNotIn('player', self.game.board.network.edge[u][v])
+
+	def test_clone_continues_identically(self):
+		clone = self.game.clone()
+		for game in self.game, clone:
+			BuildSettlementAction(self.player, self.node_id).apply(game)
+			game.random.random()
+		self.assertEqual(self.game.random.getstate(), clone.random.getstate())
+		self.assertEqual(self.game.board.count_buildings(), clone.board.count_buildings())
+
+	def test_clone_before_start(self):
+		game = Game(1)
+		game.create_player('playerOne', 'red')
+		clone = game.clone()
+		clone.create_player('playerTwo', 'blue')
+		self.assertEqual(1, len(game.players))
+		self.assertIsNone(clone.board)
+
+
+class TestGameCloneCompact(TestGameClone):
+	compact = True
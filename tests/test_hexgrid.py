@@ -5,8 +5,48 @@ from __future__ import with_statement
 try: import unittest2 as unittest
 except ImportError: import unittest
 
+from math import cos, pi, sin, sqrt
+
 from gamemodel.hexgrid import *
 
+def reference_walk_circle(start, m):
+	# the original, search based implementation of walk_circle, used to
+	# check the closed form against
+	yield start
+	if start == m: return
+
+	r = start.distance_to(m)
+	cur = None
+
+	for d in HexPosition.directions:
+		cand = start+d
+		if cand.distance_to(m) == r:
+			if not is_counterclockwise([m.get_projected_coords(), start.get_projected_coords(), cand.get_projected_coords()]):
+				cur = cand
+				break
+
+	cdir_i = HexPosition.directions.index(cur-start)
+
+	while cur != start:
+		while True:
+			cand = cur+HexPosition.directions[cdir_i]
+			if cand.distance_to(m) != r:
+				cdir_i = (cdir_i + 1) % len(HexPosition.directions)
+			else:
+				break
+
+		yield cur
+		cur = cand
+
+
+def reference_walk_spiral(r, direction, m):
+	start = m
+
+	while start.distance_to(m) <= r:
+		for p in reference_walk_circle(start, m): yield p
+		start = p+direction
+
+
 class TestGeometryFunctions(unittest.TestCase):
 	def test_signed_area(self):
 		triangle = [(0,0), (1,0), (0,1)]
@@ -93,6 +133,47 @@ class TestHexPosition(unittest.TestCase):
 		for t in ts:
 			self.assertEqual(hash(t),hash(HexPosition(*t)))
 
+	def test_hex_positions_are_interned(self):
+		self.assertIs(HexPosition(1,-3,2), HexPosition(1,-3,2))
+		self.assertIs(HexPosition(), HexPosition.origin)
+		self.assertIs(HexPosition(2,-1,-1)+HexPosition(-1,1,0), HexPosition(1,0,-1))
+
+	def test_hex_position_is_immutable(self):
+		h = HexPosition(1,-1,0)
+		with self.assertRaises(AttributeError):
+			h.r = 5
+		self.assertEqual(1, h.r)
+
+	def test_hex_position_key_roundtrip(self):
+		ts = [(1,2,-3), (0,1,-1), (0,0,0), (-3,6,-3), (-1000,1,999)]
+		keys = set()
+
+		for t in ts:
+			h = HexPosition(*t)
+			# far positions are equal, but not interned
+			self.assertEqual(h._t, HexPosition.from_key(h.key)._t)
+			keys.add(h.key)
+
+		self.assertEqual(len(ts), len(keys))
+
+	def test_hex_position_out_of_range(self):
+		with self.assertRaises(HexPosition.IllegalPositionException):
+			HexPosition(HexPosition.KEY_OFFSET, -HexPosition.KEY_OFFSET, 0)
+
+	def test_hex_position_neighbors(self):
+		h = HexPosition(2,-1,-1)
+		self.assertEqual([h+d for d in HexPosition.directions], list(h.neighbors()))
+		self.assertIs(h.neighbors(), h.neighbors())
+		self.assertIs(h+HexPosition.directions[4], h.neighbor(4))
+
+	def test_hex_position_copy_and_pickle_keep_identity(self):
+		import copy, pickle
+		h = HexPosition(-2,3,-1)
+		self.assertIs(h, copy.copy(h))
+		self.assertIs(h, copy.deepcopy(h))
+		for protocol in range(0, pickle.HIGHEST_PROTOCOL+1):
+			self.assertIs(h, pickle.loads(pickle.dumps(h, protocol)))
+
 	def test_hex_position_sorting(self):
 		unsor = [HexPosition(-1,3,-2), HexPosition(2,-1,-1), HexPosition(-1,2,-1)]
 		sor = [HexPosition(-1,2,-1), HexPosition(-1,3,-2), HexPosition(2,-1,-1)]
@@ -112,6 +193,24 @@ class TestHexPosition(unittest.TestCase):
 		self.assertEqual((2,0), i.get_projected_coords())
 		self.assertEqual((0,2), j.get_projected_coords())
 
+	def test_hex_position_from_cartesian(self):
+		xs, ys = 3/2., sqrt(3)/2.
+		for pos in HexPosition.spiral(4, HexPosition.directions[0]):
+			x, y = pos.get_projected_coords()
+			x, y = x*xs, y*ys
+			self.assertEqual(pos, HexPosition.from_cartesian(x, y))
+
+			# anywhere inside the hexagon, which has a circumradius of 1
+			for i in range(0, 12):
+				a = i * pi / 6 + 0.1
+				for d in (0.3, 0.6, 0.84):
+					self.assertEqual(pos, HexPosition.from_cartesian(x + d*cos(a), y + d*sin(a)))
+
+	def test_hex_position_from_cartesian_with_stretch(self):
+		pos = HexPosition(2,-3,1)
+		x, y = pos.get_projected_coords()
+		self.assertEqual(pos, HexPosition.from_cartesian(x*3, y*2, 3, 2))
+
 	def test_circle_walk(self):
 		circle0 = map(lambda t: HexPosition(*t), [(0,0,0)])
 		circle1 = map(lambda t: HexPosition(*t), [(0,1,-1), (1,0,-1), (1,-1,0), (0,-1,1), (-1,0,1), (-1,1,0)])
@@ -145,3 +244,60 @@ class TestHexPosition(unittest.TestCase):
 
 		self.assertEqual(list(HexPosition.walk_spiral(1, HexPosition(0,1,-1))), spiral1)
 		self.assertEqual(list(HexPosition.walk_spiral(2, HexPosition(0,1,-1))), spiral2)
+
+	def test_ring(self):
+		self.assertEqual((HexPosition.origin,), HexPosition.ring(0))
+		for radius in range(1,6):
+			ring = HexPosition.ring(radius)
+			self.assertEqual(6*radius, len(ring))
+			self.assertEqual(6*radius, len(set(ring)))
+			self.assertEqual(HexPosition.directions[0].r*radius, ring[0].r)
+			for p in ring:
+				self.assertEqual(radius, p.norm())
+
+	def test_circle_walk_matches_search_walk(self):
+		for m in [HexPosition(), HexPosition(2,-2,0), HexPosition(-3,1,2)]:
+			for radius in range(0,5):
+				for start in reference_walk_spiral(radius, HexPosition.directions[0], m):
+					if start.distance_to(m) != radius: continue
+					self.assertEqual(list(reference_walk_circle(start, m)), list(HexPosition.walk_circle(start, m)))
+
+	def test_spiral_walk_matches_search_walk(self):
+		for m in [HexPosition(), HexPosition(2,-2,0), HexPosition(-3,1,2)]:
+			for direction in HexPosition.directions:
+				for radius in range(0,6):
+					self.assertEqual(list(reference_walk_spiral(radius, direction, m)), list(HexPosition.walk_spiral(radius, direction, m)))
+
+	def test_far_positions_are_not_interned(self):
+		far = HexPosition.INTERN_RADIUS + 1
+		size = len(HexPosition._cache)
+		h = HexPosition(far, -far, 0)
+		self.assertEqual(size, len(HexPosition._cache))
+		self.assertIsNot(h, HexPosition(far, -far, 0))
+		self.assertEqual(h, HexPosition(far, -far, 0))
+		self.assertEqual(hash(h), hash(HexPosition.from_key(h.key)))
+		self.assertEqual(h, HexPosition(far-1, -far+1, 0) + HexPosition.directions[2])
+
+	def test_far_rings_are_not_cached(self):
+		far = HexPosition.INTERN_RADIUS + 1
+		self.assertEqual(6*far, len(HexPosition.ring(far)))
+		self.assertNotIn(far, HexPosition._rings)
+
+	def test_spiral_cache_is_bounded(self):
+		d = HexPosition.directions[0]
+		for r in range(0, HexPosition.SPIRAL_CACHE_SIZE + 10):
+			HexPosition.spiral(0, d, HexPosition(r, -r, 0))
+		self.assertEqual(HexPosition.SPIRAL_CACHE_SIZE, len(HexPosition._spirals))
+
+		# the newest tables are kept
+		m = HexPosition(3, -2, -1)
+		self.assertIs(HexPosition.spiral(1, d, m), HexPosition.spiral(1, d, m))
+
+	def test_spiral_tables_are_cached(self):
+		d = HexPosition.directions[2]
+		m = HexPosition(1,-1,0)
+		table = HexPosition.spiral(3, d, m)
+
+		self.assertIsInstance(table, tuple)
+		self.assertIs(table, HexPosition.spiral(3, d, m))
+		self.assertIs(HexPosition.spiral(2, d), HexPosition.spiral(2, d, HexPosition.origin))
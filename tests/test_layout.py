@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.board import Board
+from gamemodel.layout import *
+from gamemodel.tiles import *
+from gamemodel.topology import BoardTopology
+
+def adjacent_tiles(board):
+	for pos, tile in board.tiles.iteritems():
+		for neighbor in pos.neighbors():
+			if neighbor in board.tiles: yield tile, board.tiles[neighbor]
+
+
+class TestConstraints(unittest.TestCase):
+	def setUp(self):
+		self.topology = BoardTopology.for_radius(2)
+		self.layout = Layout(self.topology, STANDARD_BOARD_TILES, STANDARD_BOARD_CHIPS)
+		self.layout.tiles = [HillsTile] * len(self.topology.tiles)
+		self.a, self.b = 0, self.topology.tile_neighbors[0][0]
+		self.c = [t for t in range(1, len(self.topology.tiles)) if not t in self.topology.tile_neighbors[self.a] + self.topology.tile_neighbors[self.b]][0]
+
+	def place(self, constraint, *numbers):
+		# places numbers on tiles a, b and c
+		self.layout.numbers = [None] * len(self.topology.tiles)
+		constraint.start(self.layout)
+		for t, number in zip((self.a, self.b, self.c), numbers):
+			self.layout.numbers[t] = number
+			if not constraint.place(self.layout, t): return False
+		return constraint.finish(self.layout)
+
+	def test_no_adjacent_numbers(self):
+		self.assertFalse(self.place(NoAdjacentNumbers(), 6, 8))
+		self.assertTrue(self.place(NoAdjacentNumbers(), 6, 5, 8))
+		self.assertFalse(self.place(NoAdjacentNumbers((2, 12)), 12, 12))
+
+	def test_no_adjacent_equal_numbers(self):
+		self.assertFalse(self.place(NoAdjacentEqualNumbers(), 5, 5))
+		self.assertTrue(self.place(NoAdjacentEqualNumbers(), 5, 4, 5))
+
+	def test_balanced_resource_pips_rejects_too_many_pips_early(self):
+		constraint = BalancedResourcePips(0.1)
+		constraint.start(self.layout)
+		limit = constraint.maximum['Brick']
+		self.assertTrue(0 < constraint.minimum['Brick'] < limit)
+
+		placed = 0
+		for t in range(0, len(self.topology.tiles)):
+			self.layout.numbers[t] = 6
+			placed += PIPS[6]
+			self.assertEqual(placed <= limit, constraint.place(self.layout, t))
+			if placed > limit: break
+
+
+class TestLayoutSampler(unittest.TestCase):
+	def test_default_sampler_places_every_tile_and_chip(self):
+		layout = LayoutSampler().sample(Random(1), BoardTopology.for_radius(2), STANDARD_BOARD_TILES, STANDARD_BOARD_CHIPS)
+		self.assertEqual(sorted(range(0, 19)), sorted(layout.order))
+		self.assertEqual(sorted(STANDARD_BOARD_CHIPS), sorted(n for n in layout.numbers if n))
+
+	def test_balanced_boards_satisfy_constraints(self):
+		sampler = LayoutSampler.balanced()
+		for seed in range(0, 5):
+			board = Board(Random(seed))
+			board.generate_board(sampler = sampler)
+
+			for a, b in adjacent_tiles(board):
+				self.assertFalse(a.number in (6, 8) and b.number in (6, 8))
+				if a.number: self.assertNotEqual(a.number, b.number)
+
+		self.assertEqual(5, sampler.accepted)
+		self.assertTrue(sampler.attempts >= sampler.accepted)
+		self.assertTrue(0 < sampler.acceptance_rate <= 1)
+		self.assertTrue(sampler.time_per_board > 0)
+
+	def test_balanced_boards_are_reproducible(self):
+		boards = []
+		for i in range(0, 2):
+			board = Board(Random(3))
+			board.generate_board(sampler = LayoutSampler.balanced())
+			boards.append(sorted((pos, tile.__class__, tile.number) for pos, tile in board.tiles.iteritems()))
+		self.assertEqual(boards[0], boards[1])
+
+	def test_impossible_constraints_give_up(self):
+		sampler = LayoutSampler([NoAdjacentNumbers(range(2, 13))], shuffle_chips = True, max_attempts = 20)
+		with self.assertRaises(NoLayoutFoundException):
+			Board(Random(1)).generate_board(sampler = sampler)
+		self.assertEqual(20, sampler.attempts)
+		self.assertEqual(0, sampler.accepted)
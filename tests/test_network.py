@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.board import Board
+from gamemodel.network import *
+from gamemodel.topology import BoardTopology
+
+class TestCompactNetwork(unittest.TestCase):
+	def setUp(self):
+		self.topology = BoardTopology.for_radius(2)
+		self.network = CompactNetwork(self.topology)
+		self.n = self.topology.nodes[7]
+		self.m = self.network.neighbors(self.n)[0]
+
+	def test_nodes_start_without_attributes(self):
+		self.assertEqual({}, dict(self.network.node[self.n]))
+		self.assertNotIn('building', self.network.node[self.n])
+		self.assertIsNone(self.network.node[self.n].get('building', None))
+		with self.assertRaises(KeyError):
+			self.network.node[self.n]['player']
+
+	def test_node_attributes_are_stored_in_columns(self):
+		self.network.node[self.n]['building'] = 'city'
+		self.network.node[self.n]['player'] = 'red'
+		self.network.node[self.n]['harbor'] = 'Ore'
+
+		n = self.topology.node_index[self.n]
+		self.assertEqual(BUILDING_CODES['city'], self.network.building[n])
+		self.assertEqual('red', self.network.owners.values[self.network.player[n]])
+		self.assertEqual({'building': 'city', 'player': 'red', 'harbor': 'Ore'}, dict(self.network.node[self.n]))
+
+	def test_other_node_attributes_are_kept(self):
+		self.network.node[self.n]['foo'] = 'bar'
+		self.assertEqual('bar', self.network.node[self.n]['foo'])
+		del self.network.node[self.n]['foo']
+		self.assertNotIn('foo', self.network.node[self.n])
+
+	def test_deleting_column_attribute(self):
+		self.network.node[self.n]['building'] = 'settlement'
+		del self.network.node[self.n]['building']
+		self.assertNotIn('building', self.network.node[self.n])
+		with self.assertRaises(KeyError):
+			del self.network.node[self.n]['building']
+
+	def test_edge_attributes(self):
+		self.assertIn(self.m, self.network.edge[self.n])
+		self.assertNotIn(self.n, self.network.edge[self.n])
+
+		self.network.edge[self.n][self.m]['road'] = True
+		self.network.edge[self.n][self.m]['player'] = 'blue'
+		self.assertEqual({'road': True, 'player': 'blue'}, dict(self.network.edge[self.m][self.n]))
+
+	def test_graph_interface(self):
+		self.assertEqual(54, self.network.number_of_nodes())
+		self.assertEqual(72, self.network.number_of_edges())
+		self.assertItemsEqual(self.topology.nodes, self.network.nodes())
+		self.assertEqual(72, len(self.network.edges()))
+		self.assertIn(self.n, self.network)
+		self.assertItemsEqual(self.network.neighbors(self.n), list(self.network[self.n]))
+
+	def test_export_networkx(self):
+		self.network.node[self.n]['building'] = 'settlement'
+		self.network.edge[self.n][self.m]['road'] = True
+
+		g = self.network.export_networkx()
+		self.assertEqual(54, g.number_of_nodes())
+		self.assertEqual(72, g.number_of_edges())
+		self.assertEqual('settlement', g.node[self.n]['building'])
+		self.assertTrue(g.edge[self.n][self.m]['road'])
+		self.assertItemsEqual(self.network.neighbors(self.n), g.neighbors(self.n))
+
+
+class TestCompactBoard(unittest.TestCase):
+	def setUp(self):
+		self.boards = []
+		for compact in False, True:
+			board = Board(Random(4), compact = compact)
+			board.generate_board()
+			self.boards.append(board)
+
+	def test_compact_board_uses_compact_network(self):
+		self.assertIsInstance(self.boards[1].network, CompactNetwork)
+
+	def test_harbors_match(self):
+		for node_id in self.boards[0].network.nodes_iter():
+			self.assertEqual(self.boards[0].network.node[node_id].get('harbor'), self.boards[1].network.node[node_id].get('harbor'))
+
+	def test_buildings_match(self):
+		nodes = self.boards[0].topology.nodes
+		for i, n in enumerate([3, 20, 41, 50]):
+			for board in self.boards:
+				board.update_building(nodes[n], 'red' if i%2 else 'blue', 'city' if i == 3 else 'settlement')
+
+		for node_id in nodes:
+			self.assertEqual(self.boards[0].node_available(node_id), self.boards[1].node_available(node_id))
+		self.assertEqual(self.boards[0].count_buildings(), self.boards[1].count_buildings())
+		self.assertEqual(({'red': 1, 'blue': 2}, {'red': 1}), self.boards[1].count_buildings())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from math import cos, pi, sin
+
+from gamemodel.hexgrid import HexPosition
+from gamemodel.picking import BoardPicker
+from gamemodel.topology import BoardTopology
+
+class TestBoardPicker(unittest.TestCase):
+	def setUp(self):
+		self.topology = BoardTopology.for_radius(2)
+		self.picker = BoardPicker(self.topology)
+
+	def test_tile_at_centers(self):
+		for pos in self.topology.tiles:
+			self.assertEqual(pos, self.picker.tile_at(*self.picker.coordinates(pos)))
+
+	def test_tile_off_the_board(self):
+		sea = HexPosition(3,-3,0)
+		self.assertIsNone(self.picker.tile_at(*self.picker.coordinates(sea)))
+		self.assertIsNone(self.picker.tile_at(100, -40))
+
+	def test_node_at_nodes(self):
+		for n, node_id in enumerate(self.topology.nodes):
+			x, y = self.picker.node_coordinates[n]
+			self.assertEqual(node_id, self.picker.node_at(x, y))
+
+			# close to the node, from any direction, also from the sea
+			for i in range(0, 6):
+				a = i * pi / 3 + 0.3
+				self.assertEqual(node_id, self.picker.node_at(x + 0.2*cos(a), y + 0.2*sin(a)))
+
+	def test_node_matches_brute_force(self):
+		coordinates = self.picker.node_coordinates
+		for x in range(-40, 41, 3):
+			for y in range(-40, 41, 3):
+				x_, y_ = x / 10., y / 10.
+				if not self.picker.tile_at(x_, y_): continue
+
+				distances = [(cx-x_)**2 + (cy-y_)**2 for cx, cy in coordinates]
+				self.assertEqual(self.topology.nodes[distances.index(min(distances))], self.picker.node_at(x_, y_))
+
+	def test_edge_at_edges(self):
+		coordinates = self.picker.node_coordinates
+		for u, v in self.topology.edges:
+			x = (coordinates[u][0] + coordinates[v][0]) / 2.
+			y = (coordinates[u][1] + coordinates[v][1]) / 2.
+			edge = self.picker.edge_at(x, y)
+			self.assertEqual(set([self.topology.nodes[u], self.topology.nodes[v]]), set(edge))
+
+	def test_nothing_far_off_the_board(self):
+		self.assertIsNone(self.picker.node_at(100, 100))
+		self.assertIsNone(self.picker.edge_at(100, 100))
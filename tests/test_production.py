@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.board import Board
+from gamemodel.game import Game, Player
+from gamemodel.production import *
+
+class ProductionTestMixin(object):
+	compact = False
+
+	def setUp(self):
+		self.board = Board(Random(11), compact = self.compact)
+		self.board.generate_board()
+		self.players = dict((color, Player(color, color)) for color in ['red', 'blue', 'green'])
+
+		random = Random(2)
+		for color in sorted(self.players):
+			for building in 'settlement', 'city', 'settlement':
+				self.board.update_building(random.choice(list(self.board.available_nodes())), color, building)
+
+	def naive_gains(self, number):
+		# walk the corners of every tile with the number
+		gains = {}
+		for pos, tile in self.board.tiles.iteritems():
+			if tile.number != number or pos == self.board.robber: continue
+			for n in self.board.topology.tile_nodes[self.board.topology.tile_index[pos]]:
+				attributes = self.board.network.node[self.board.topology.nodes[n]]
+				if not 'building' in attributes: continue
+				resources = gains.setdefault(attributes['player'], {})
+				resources[tile.resource] = resources.get(tile.resource, 0) + (2 if 'city' == attributes['building'] else 1)
+		return gains
+
+	def test_gains_match_naive_computation(self):
+		for number in range(2, 13):
+			self.assertEqual(self.naive_gains(number), self.board.production.gains(number))
+
+	def test_robber_blocks_tile(self):
+		for pos, tile in self.board.tiles.iteritems():
+			if not tile.number: continue
+			self.board.robber = pos
+			self.assertEqual(self.naive_gains(tile.number), self.board.production.gains(tile.number))
+
+	def test_seven_and_invalid_rolls_produce_nothing(self):
+		for number in 0, 1, 7, 13:
+			self.assertEqual({}, self.board.production.gains(number))
+
+	def test_distribute_updates_player_resources(self):
+		expected = dict((color, dict(player.resources)) for color, player in self.players.iteritems())
+		for number in range(2, 13):
+			for color, resources in self.naive_gains(number).iteritems():
+				for resource, amount in resources.iteritems():
+					expected[color][resource] += amount
+			self.board.production.distribute(number, self.players)
+
+		for color, player in self.players.iteritems():
+			self.assertEqual(expected[color], player.resources)
+
+	def test_bulk_matches_single_rolls(self):
+		random = Random(9)
+		rolls = [random.randint(1,6)+random.randint(1,6) for i in range(0, 500)]
+
+		single = dict((color, Player(color, color)) for color in self.players)
+		for number in rolls:
+			self.board.production.distribute(number, single)
+
+		self.board.production.distribute_bulk(rolls, self.players)
+		for color in self.players:
+			self.assertEqual(single[color].resources, self.players[color].resources)
+
+
+class TestProductionNetworkx(ProductionTestMixin, unittest.TestCase):
+	pass
+
+
+class TestProductionCompact(ProductionTestMixin, unittest.TestCase):
+	compact = True
+
+
+class TestGameProduction(unittest.TestCase):
+	def test_game_distributes_resources(self):
+		game = Game(1)
+		for color in 'red', 'blue', 'green':
+			game.create_player(color, color)
+		game.initialize_board()
+
+		pos, tile = [(pos, tile) for pos, tile in game.board.tiles.iteritems() if tile.number][0]
+		node_id = game.board.topology.nodes[game.board.topology.tile_nodes[game.board.topology.tile_index[pos]][0]]
+		game.board.update_building(node_id, 'blue', 'city')
+		game.board.robber = None
+
+		game.distribute_resources(tile.number)
+		self.assertTrue(game.players['blue'].resources[tile.resource] >= 2)
+		self.assertEqual(0, sum(game.players['red'].resources.values()))
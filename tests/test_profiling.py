@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+import csv
+import os
+import shutil
+import tempfile
+
+import profiling
+from profiling import *
+
+class TestPercentile(unittest.TestCase):
+	def test_nearest_rank(self):
+		values = range(1, 101)
+		self.assertEqual(50, percentile(values, 50))
+		self.assertEqual(95, percentile(values, 95))
+		self.assertEqual(99, percentile(values, 99))
+		self.assertEqual(100, percentile(values, 100))
+		self.assertEqual(1, percentile(values, 0))
+
+	def test_few_values(self):
+		self.assertEqual(3, percentile([3], 99))
+		self.assertEqual(1, percentile([1, 2], 50))
+		self.assertIsNone(percentile([], 50))
+
+
+class TestFrameTimings(unittest.TestCase):
+	def setUp(self):
+		self.timings = FrameTimings(window = 100)
+
+	def test_summary(self):
+		for i in range(1, 101):
+			self.timings.add('a', i / 1000.)
+		count, mean, p50, p95, p99, maximum = self.timings.summary('a')
+		self.assertEqual(100, count)
+		self.assertAlmostEqual(0.0505, mean)
+		self.assertAlmostEqual(0.050, p50)
+		self.assertAlmostEqual(0.095, p95)
+		self.assertAlmostEqual(0.099, p99)
+		self.assertAlmostEqual(0.1, maximum)
+
+	def test_window_keeps_last_samples(self):
+		for i in range(0, 150):
+			self.timings.add('a', i)
+		self.assertEqual(100, self.timings.summary('a')[0])
+		self.assertEqual(50, min(self.timings.samples['a']))
+
+	def test_unknown_timer(self):
+		self.assertEqual(0, self.timings.summary('b')[0])
+
+	def test_timer_and_wrapped_task(self):
+		with self.timings.timer('block'):
+			pass
+		task = self.timings.wrap_task('task', lambda task: task + 1)
+		self.assertEqual(2, task(1))
+		self.assertEqual(1, self.timings.summary('block')[0])
+		self.assertEqual(1, self.timings.summary('task')[0])
+
+	def test_failing_task_is_timed(self):
+		def fail(task): raise ValueError()
+		self.assertRaises(ValueError, self.timings.wrap_task('task', fail), None)
+		self.assertEqual(1, self.timings.summary('task')[0])
+
+	def test_timed_uses_application_timings(self):
+		@timed('test:timed')
+		def f(x):
+			"""doubles"""
+			return 2*x
+		before = profiling.timings.summary('test:timed')[0]
+		self.assertEqual(4, f(2))
+		self.assertEqual(before + 1, profiling.timings.summary('test:timed')[0])
+		self.assertEqual('f', f.__name__)
+
+	def test_write_csv(self):
+		self.timings.add('App:Frame', 0.016)
+		self.timings.add('App:Tasks:mouseTarget', 0.001)
+		directory = tempfile.mkdtemp()
+		try:
+			path = os.path.join(directory, 'timings.csv')
+			self.timings.write_csv(path)
+			with open(path, 'rb') as f:
+				rows = list(csv.reader(f))
+		finally:
+			shutil.rmtree(directory)
+
+		self.assertEqual(['name', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'], rows[0])
+		self.assertEqual(['App:Frame', '1', '16.000', '16.000', '16.000', '16.000', '16.000'], rows[1])
+		self.assertEqual('App:Tasks:mouseTarget', rows[2][0])
+
+	def test_str(self):
+		self.timings.add('a', 0.002)
+		self.assertTrue(str(self.timings).startswith('a '))
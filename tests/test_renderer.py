@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+
+from gamemodel.actions import BuildSettlementAction, BuildRoadAction
+
+from tests.test_actions import GameActionTestCase
+
+try:
+	import panda3d
+	available = True
+except ImportError:
+	available = False
+
+class TestBoardChangesFromActions(GameActionTestCase):
+	def build(self):
+		# a settlement and a road of the current player, as in the setup
+		player = self.game.current_player
+		node_id = sorted(self.game.board.available_nodes())[0]
+		edge = (node_id, self.game.board.network.neighbors(node_id)[0])
+		BuildSettlementAction(player, node_id).apply(self.game)
+		BuildRoadAction(player, edge).apply(self.game)
+		return player, node_id, edge
+
+	def test_owners_are_colors(self):
+		# the renderer looks up textures by the owners it is told about
+		changes = []
+		self.game.board.add_observer(lambda *change: changes.append(change))
+		player, node_id, (u, v) = self.build()
+
+		self.assertEqual([('building', node_id), ('road', u, v)], changes)
+		self.assertEqual((player, 'settlement'), self.game.board.building_owner(node_id))
+		self.assertEqual(player, self.game.board.road_owner(u, v))
+		self.assertTrue(player in self.game.player_colors)
+
+	@unittest.skipUnless(available, 'Panda3D is not installed')
+	def test_renderer_follows_actions(self):
+		from boardtest import BoardRenderer
+		from snapshot import offscreen_base
+
+		renderer = BoardRenderer(offscreen_base(), self.game.board)
+		try:
+			player, node_id, (u, v) = self.build()
+			self.assertTrue(node_id in renderer.building_models)
+			self.assertTrue((min(u, v), max(u, v)) in renderer.road_models)
+		finally:
+			renderer.destroy()
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.actions import *
+from gamemodel.game import Game
+from gamemodel.replay import *
+from gamemodel.tiles import TileStack, STANDARD_BOARD_TILES
+
+from tests.test_actions import game_state, legal_candidates
+
+class TestJournal(unittest.TestCase):
+	def setUp(self):
+		self.game = Game(12)
+		self.game.create_player('playerOne', 'red')
+		self.game.create_player('playerTwo')
+		self.game.create_player('playerThree')
+
+	def test_game_without_seed_chooses_one(self):
+		self.assertIsNotNone(Game().initial_seed)
+
+	def test_joining_is_journaled(self):
+		self.assertEqual([('J', 'playerOne', 'red'), ('J', 'playerTwo', None), ('J', 'playerThree', None)], self.game.journal)
+
+	def test_actions_are_journaled(self):
+		StartGameAction('red').apply(self.game)
+		player = self.game.current_player
+		node_id = sorted(self.game.board.available_nodes())[0]
+		BuildSettlementAction(player, node_id).apply(self.game)
+
+		self.assertEqual(('G', 'red'), self.game.journal[3])
+		self.assertEqual(('S', player, self.game.board.topology.node_index[node_id]), self.game.journal[4])
+
+	def test_undo_removes_journal_entry(self):
+		StartGameAction('red').apply(self.game)
+		token = BuildSettlementAction(self.game.current_player, sorted(self.game.board.available_nodes())[0]).apply(self.game)
+		self.game.undo(token)
+		self.assertEqual(4, len(self.game.journal))
+
+	def test_actions_roundtrip(self):
+		StartGameAction('red').apply(self.game)
+		board = self.game.board
+		node_id = board.topology.nodes[17]
+		edge = tuple(board.topology.edge_ids())[30]
+		pos = board.topology.tiles[5]
+
+		for action in [BuildSettlementAction('red', node_id), BuildCityAction('blue', node_id), BuildRoadAction('green', edge), RollDiceAction('red'), MoveRobberAction('blue', pos), EndTurnAction('green'), StartGameAction('red')]:
+			entry = action.serialize(self.game)
+			copy = deserialize_action(self.game, entry)
+			self.assertIs(action.__class__, copy.__class__)
+			self.assertEqual(action.__dict__, copy.__dict__)
+
+	def test_tile_stack_is_deterministic(self):
+		# the order of the setup dictionary must not matter
+		reordered = dict(reversed(STANDARD_BOARD_TILES.items()))
+		self.assertEqual(TileStack(Random(1), STANDARD_BOARD_TILES).tiles, TileStack(Random(1), reordered).tiles)
+
+
+class TestReplay(unittest.TestCase):
+	def setUp(self):
+		self.game = Game(21, compact_board = True)
+		self.game.create_player('playerOne', 'red')
+		self.game.create_player('playerTwo')
+		self.game.create_player('playerThree')
+		StartGameAction('red').apply(self.game)
+
+		# play randomly, remembering the state after every entry
+		self.states = {len(self.game.journal): game_state(self.game)}
+		random = Random(3)
+		for step in range(0, 150):
+			if 'main' == self.game.phase:
+				for resource in self.game.players[self.game.current_player].resources:
+					self.game.players[self.game.current_player].resources[resource] += 1
+			actions = legal_candidates(self.game)
+			if not actions: break
+			random.choice(actions).apply(self.game)
+			self.states[len(self.game.journal)] = game_state(self.game)
+
+	def test_replay_reaches_same_state(self):
+		# resources were handed out by hand, so only compare the board
+		replayed = Replay.of(self.game).replay()
+		self.assertEqual(self.game.journal, replayed.journal)
+		self.assertEqual(game_state(self.game)[-6:], game_state(replayed)[-6:])
+		self.assertEqual(self.game.phase, replayed.phase)
+		self.assertEqual(self.game.random.getstate(), replayed.random.getstate())
+
+	def test_seek_reaches_recorded_states(self):
+		replay = Replay.of(self.game, snapshot_interval = 10)
+		for n in sorted(self.states, reverse = True)[::7] + [0, len(replay), 4]:
+			game = replay.seek(n)
+			self.assertEqual(n, len(game.journal))
+			if n in self.states:
+				self.assertEqual(self.states[n][-6:], game_state(game)[-6:])
+
+	def test_seek_creates_snapshots(self):
+		replay = Replay.of(self.game, snapshot_interval = 10)
+		replay.seek(len(replay))
+		self.assertEqual(range(0, len(replay)+1, 10), replay.positions)
+
+		# seeking does not modify snapshots
+		before = game_state(replay.snapshots[2])
+		replay.seek(25)
+		self.assertEqual(before, game_state(replay.snapshots[2]))
+
+	def test_seek_out_of_range(self):
+		with self.assertRaises(IndexError):
+			Replay.of(self.game).seek(len(self.game.journal)+1)
+
+	def test_dumps_and_loads(self):
+		seed, journal = loads(dumps(self.game))
+		self.assertEqual(self.game.initial_seed, seed)
+		self.assertEqual(self.game.journal, journal)
+		self.assertEqual(game_state(self.game)[-6:], game_state(Replay(seed, journal).replay())[-6:])
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+import time
+
+from gamemodel.actions import BuildSettlementAction, EndTurnAction
+from gamemodel.server import *
+
+class Clock(object):
+	def __init__(self):
+		self.now = 0.
+	def __call__(self):
+		return self.now
+
+
+class Inbox(list):
+	"""a client keeping what it is sent"""
+	def of_type(self, kind):
+		return [message for message in self if kind == message['type']]
+
+
+class TestGameServer(unittest.TestCase):
+	def setUp(self):
+		self.clock = Clock()
+		self.server = GameServer(turn_timeout = 30., seed = 5, clock = self.clock)
+		self.network = LocalNetwork(self.server)
+
+	def join(self, name, table = None):
+		inbox = Inbox()
+		send = self.network.connect(inbox.append)
+		send({'type': 'join', 'name': name, 'table': table})
+		self.network.pump()
+		return inbox, send
+
+	def start_table(self):
+		clients = [self.join(name) for name in ('one', 'two', 'three')]
+		table = self.server.tables[1]
+		seats = dict((inbox.of_type('joined')[0]['color'], (inbox, send)) for inbox, send in clients)
+		return table, seats
+
+	def test_tables_fill_up_and_start(self):
+		table, seats = self.start_table()
+		self.assertEqual('setup', table.game.phase)
+		self.assertEqual(set(seats), set(table.game.players))
+
+		inbox, send = self.join('four')
+		self.assertEqual(2, inbox.of_type('joined')[0]['table'])
+		self.assertEqual('init', self.server.tables[2].game.phase)
+
+	def test_entries_are_broadcast(self):
+		table, seats = self.start_table()
+		for inbox, send in seats.values():
+			self.assertEqual(['G'], [message['entry'][0] for message in inbox.of_type('entry')][-1:])
+
+	def test_actions_are_applied_and_broadcast(self):
+		table, seats = self.start_table()
+		game = table.game
+		color = game.current_player
+		action = game.legal_actions()[0]
+		inbox, send = seats[color]
+		send({'type': 'action', 'id': 7, 'action': action.serialize(game)})
+		self.network.pump()
+
+		self.assertEqual(list(action.serialize(game)), list(game.journal[-1]))
+		for other, _ in seats.values():
+			last = other.of_type('entry')[-1]
+			self.assertEqual((color, 7), (last['by'], last['id']))
+		# the start of the game is an action as well
+		self.assertEqual(2, self.server.actions)
+
+	def test_illegal_actions_are_answered_to_sender_only(self):
+		table, seats = self.start_table()
+		game = table.game
+		journal = list(game.journal)
+		inbox, send = seats[game.current_player]
+		send({'type': 'action', 'id': 3, 'action': EndTurnAction(game.current_player).serialize(game)})
+		self.network.pump()
+
+		self.assertEqual(journal, game.journal)
+		self.assertEqual([3], [message['id'] for message in inbox.of_type('error')])
+		for other, _ in seats.values():
+			if other is not inbox: self.assertEqual([], other.of_type('error'))
+
+	def test_players_cannot_act_for_others(self):
+		table, seats = self.start_table()
+		game = table.game
+		action = game.legal_actions()[0]
+		other = [color for color in seats if color != game.current_player][0]
+		inbox, send = seats[other]
+		send({'type': 'action', 'id': 1, 'action': action.serialize(game)})
+		self.network.pump()
+
+		self.assertEqual(1, len(inbox.of_type('error')))
+		self.assertEqual('G', game.journal[-1][0])
+
+	def test_malformed_messages(self):
+		table, seats = self.start_table()
+		inbox, send = seats[table.game.current_player]
+		for message in [[1, 2], {'type': 'dance'}, {'type': 'action', 'action': ['X', 'red']}, {'type': 'action', 'action': ['S']}, {'type': 'action'}, {'type': 'join', 'name': 'again'}]:
+			send(message)
+		self.network.pump()
+		self.assertEqual(6, len(inbox.of_type('error')))
+
+	def test_negative_indices_are_malformed(self):
+		table, seats = self.start_table()
+		game = table.game
+		inbox, send = seats[game.current_player]
+		for action in [['S', game.current_player, -1], ['R', game.current_player, -1], ['B', game.current_player, -1]]:
+			send({'type': 'action', 'action': action})
+		self.network.pump()
+		self.assertEqual(3, len(inbox.of_type('error')))
+		self.assertEqual('G', game.journal[-1][0])
+
+	def test_actions_before_the_start_are_refused(self):
+		inbox, send = self.join('early')
+		color = inbox.of_type('joined')[0]['color']
+		for code in 'S', 'B', 'R':
+			send({'type': 'action', 'id': code, 'action': [code, color, 0]})
+		self.network.pump()
+		self.assertEqual(['S', 'B', 'R'], [message['id'] for message in inbox.of_type('error')])
+
+		# still seated, the table starts once full
+		self.join('two')
+		self.join('three')
+		self.assertEqual('setup', self.server.tables[1].game.phase)
+		self.assertEqual(['G'], [message['entry'][0] for message in inbox.of_type('entry')][-1:])
+
+	def test_players_leaving_before_the_start_give_up_their_seat(self):
+		clients = [BotClient('bot%d' % i, Random(i)) for i in range(0, 3)]
+		clients[0].start(self.network.connect(clients[0].receive))
+		self.network.pump()
+
+		session = self.server.connect(lambda message: None)
+		self.server.handle(session, {'type': 'join', 'name': 'ghost'})
+		self.server.disconnect(session)
+		self.network.pump()
+		table = self.server.tables[1]
+		self.assertEqual([clients[0].color], table.game.players.keys())
+		self.assertEqual(table.game.journal, clients[0].game.journal)
+
+		for client in clients[1:]:
+			client.start(self.network.connect(client.receive))
+		self.network.pump()
+
+		self.assertEqual(sorted(client.color for client in clients), sorted(table.game.players))
+		for client in clients:
+			self.assertTrue(client.finished)
+			self.assertEqual([], client.errors)
+			self.assertEqual([list(entry) for entry in table.game.journal], [list(entry) for entry in client.game.journal])
+
+	def test_tables_seat_3_or_4_players(self):
+		GameServer(4)
+		for players in (0, 2, 5):
+			with self.assertRaises(ValueError):
+				GameServer(players)
+
+	def test_joining_missing_or_full_tables(self):
+		table, seats = self.start_table()
+		inbox, send = self.join('late', 1)
+		self.assertEqual(1, len(inbox.of_type('error')))
+		inbox, send = self.join('lost', 42)
+		self.assertEqual(1, len(inbox.of_type('error')))
+
+	def test_joining_with_malformed_arguments(self):
+		for message in [{'table': [1]}, {'table': {}}, {'table': '1'}, {'table': True}, {'color': ['x']}, {'color': 'purple'}, {'name': ['x']}]:
+			message['type'] = 'join'
+			inbox = Inbox()
+			send = self.network.connect(inbox.append)
+			send(message)
+			self.network.pump()
+			self.assertEqual(['error'], [m['type'] for m in inbox])
+		self.assertEqual({}, self.server.tables)
+
+	def test_joining_with_a_color(self):
+		inbox, send = self.join('one')
+		send = self.network.connect(inbox.append)
+		send({'type': 'join', 'name': 'two', 'table': 1, 'color': 'white'})
+		self.network.pump()
+		self.assertEqual('white', inbox.of_type('joined')[-1]['color'])
+
+	def test_start_with_fewer_players(self):
+		self.server.players_per_table = 4
+		clients = [self.join(name) for name in ('one', 'two', 'three')]
+		inbox, send = clients[0]
+		send({'type': 'start', 'id': 1})
+		self.network.pump()
+		self.assertEqual('setup', self.server.tables[1].game.phase)
+
+	def test_timed_out_turns_are_finished(self):
+		table, seats = self.start_table()
+		game = table.game
+		first = game.current_player
+		self.assertEqual(30., self.server.poll())
+
+		self.clock.now = 29.
+		self.assertEqual(1., self.server.poll())
+		self.assertEqual(first, game.current_player)
+
+		self.clock.now = 30.
+		self.server.poll()
+		self.network.pump()
+		self.assertNotEqual(first, game.current_player)
+		self.assertEqual(['S', 'R', 'E'], [entry[0] for entry in game.journal[-3:]])
+		self.assertEqual(1, self.server.timeouts)
+		self.assertEqual(30., self.server.poll())
+
+	def test_acting_in_time_resets_the_deadline(self):
+		table, seats = self.start_table()
+		game = table.game
+		self.clock.now = 20.
+		for i in range(0, 3):
+			action = [a for a in game.legal_actions() if not isinstance(a, BuildSettlementAction) or i == 0][0]
+			seats[game.current_player][1]({'type': 'action', 'action': action.serialize(game)})
+			self.network.pump()
+
+		self.clock.now = 40.
+		self.server.poll()
+		self.assertEqual(0, self.server.timeouts)
+		self.assertEqual(10., self.server.poll())
+
+	def test_left_tables_are_dropped(self):
+		session = self.server.connect(lambda message: None)
+		self.server.join(session, 'alone')
+		self.server.disconnect(session)
+		self.assertEqual({}, self.server.tables)
+
+	def test_bots_play_games_to_the_end(self):
+		clients = [BotClient('bot%d' % i, Random(i)) for i in range(0, 6)]
+		for client in clients:
+			client.start(self.network.connect(client.receive))
+		self.network.pump()
+
+		tables = dict((table.game.initial_seed, table) for table in self.server.tables.values())
+		self.assertEqual(2, len(tables))
+		for client in clients:
+			self.assertTrue(client.finished)
+			self.assertEqual([], client.errors)
+			journal = tables[client.game.initial_seed].game.journal
+			self.assertEqual([list(entry) for entry in journal], [list(entry) for entry in client.game.journal])
+
+		# every action but the starts came from a bot, and was answered
+		self.assertEqual(self.server.actions - 2, sum(len(client.latencies) for client in clients))
+
+class TestTcp(unittest.TestCase):
+	def test_bots_play_over_tcp(self):
+		from serve import Listener, connect, run
+
+		server = GameServer(seed = 3)
+		map = {}
+		listener = Listener(server, '127.0.0.1', 0, map)
+		clients = [BotClient('bot%d' % i, Random(i)) for i in range(0, 3)]
+		channels = [connect('127.0.0.1', listener.address[1], client.receive, map) for client in clients]
+		for client, channel in zip(clients, channels):
+			client.start(channel.send_message)
+
+		start = time.time()
+		try:
+			run(server, map, lambda: time.time() - start > 30 or all(client.finished for client in clients), 0.01)
+		finally:
+			for channel in map.values():
+				channel.close()
+
+		journal = server.tables[1].game.journal
+		for client in clients:
+			self.assertEqual([list(entry) for entry in journal], [list(entry) for entry in client.game.journal])
+
+if __name__ == '__main__':
+	unittest.main()
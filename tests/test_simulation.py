@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# coding=utf8
+
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.game import Game
+from gamemodel.actions import StartGameAction
+from gamemodel.simulation import *
+
+class TestSimulation(unittest.TestCase):
+	def test_seeds_only_depend_on_master_seed(self):
+		self.assertEqual(derive_seeds(1, 10), derive_seeds(1, 20)[:10])
+		self.assertNotEqual(derive_seeds(1, 10), derive_seeds(2, 10))
+		self.assertEqual(10, len(set(derive_seeds(1, 10))))
+
+	def test_play_game_is_reproducible(self):
+		result = play_game(123)
+		self.assertEqual(result, play_game(123))
+		self.assertIsNotNone(result.winner)
+		self.assertTrue(result.points[result.winner_seat] >= Game.victory_points_to_win)
+
+	def test_bot_only_picks_legal_actions(self):
+		game = Game(4)
+		for color in 'red', 'blue', 'green':
+			game.create_player(color, color)
+		StartGameAction('red').apply(game)
+
+		bot = RandomBot(Random(4))
+		for i in range(0, 300):
+			if 'finished' == game.phase: break
+			bot.choose(game, game.legal_actions()).apply(game)
+
+	def test_results_do_not_depend_on_processes(self):
+		single = sorted(simulate(4, 7, processes = 1, max_actions = 200))
+		self.assertEqual([0, 1, 2, 3], [result.index for result in single])
+		self.assertEqual(single, sorted(simulate(4, 7, processes = 2, max_actions = 200)))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# coding=utf8
+
+from __future__ import with_statement
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.board import Board
+from gamemodel.hexgrid import HexPosition
+from gamemodel.topology import *
+
+class TestBoardTopology(unittest.TestCase):
+	def setUp(self):
+		self.topology = BoardTopology.for_radius(2)
+
+	def test_topology_is_shared_per_radius(self):
+		self.assertIs(self.topology, BoardTopology.for_radius(2))
+		self.assertIsNot(self.topology, BoardTopology.for_radius(3))
+
+	def test_standard_board_sizes(self):
+		self.assertEqual(19, len(self.topology.tiles))
+		self.assertEqual(54, len(self.topology.nodes))
+		self.assertEqual(72, len(self.topology.edges))
+		self.assertEqual(30, len(self.topology.coast))
+		self.assertEqual(9, len(self.topology.harbor_slots))
+
+	def test_node_ids_are_sorted_tile_triples(self):
+		for n, node_id in enumerate(self.topology.nodes):
+			self.assertEqual(tuple(sorted(node_id)), node_id)
+			self.assertEqual(n, self.topology.node_index[node_id])
+			for t in self.topology.node_tiles[n]:
+				self.assertIn(self.topology.tiles[t], node_id)
+
+	def test_tile_incidence(self):
+		for t, pos in enumerate(self.topology.tiles):
+			corners = self.topology.tile_nodes[t]
+			self.assertEqual(6, len(set(corners)))
+			for i in range(0, len(corners)):
+				self.assertIn(pos, self.topology.nodes[corners[i]])
+				self.assertIn(corners[(i+1)%len(corners)], self.topology.neighbors[corners[i]])
+
+	def test_tile_neighbors(self):
+		self.assertEqual(6, len(self.topology.tile_neighbors[0]))
+		for t, pos in enumerate(self.topology.tiles):
+			expected = [p for p in pos.neighbors() if p in self.topology.tile_index]
+			self.assertEqual(expected, [self.topology.tiles[u] for u in self.topology.tile_neighbors[t]])
+
+	def test_spiral_order(self):
+		for direction in HexPosition.directions:
+			order = self.topology.spiral_order(direction)
+			self.assertEqual(list(HexPosition.walk_spiral(2, direction)), [self.topology.tiles[t] for t in order])
+
+	def test_edges_match_neighbors(self):
+		for e, (u, v) in enumerate(self.topology.edges):
+			self.assertEqual(e, self.topology.edge_between(v, u))
+			self.assertIn(v, self.topology.neighbors[u])
+			self.assertIn(u, self.topology.neighbors[v])
+		self.assertEqual(2*len(self.topology.edges), sum(map(len, self.topology.neighbors)))
+
+	def test_coast_is_a_closed_walk_over_all_coastal_nodes(self):
+		for radius in range(0, 5):
+			topology = BoardTopology.for_radius(radius)
+			coast = topology.coast
+			self.assertEqual(6*(2*radius+1), len(coast))
+			self.assertItemsEqual([n for n in range(0, len(topology.nodes)) if topology.is_coastal(n)], coast)
+			for i in range(0, len(coast)):
+				self.assertIn(coast[(i+1)%len(coast)], topology.neighbors[coast[i]])
+
+	def test_coast_starts_top_right_clockwise(self):
+		start, second = [self.topology.nodes[n] for n in self.topology.coast[:2]]
+		self.assertEqual((HexPosition(2,0,-2), HexPosition(2,1,-3), HexPosition(3,0,-3)), start)
+		self.assertEqual((HexPosition(2,0,-2), HexPosition(3,-1,-2), HexPosition(3,0,-3)), second)
+
+	def test_harbor_slots_follow_placement_pattern(self):
+		self.assertEqual([2]*9, map(len, self.topology.harbor_slots))
+		self.assertEqual(list(self.topology.coast[:2]), list(self.topology.harbor_slots[0]))
+		self.assertEqual(list(self.topology.coast[3:5]), list(self.topology.harbor_slots[1]))
+
+
+class TestBoardUsesTopology(unittest.TestCase):
+	def setUp(self):
+		self.board = Board(Random(1))
+		self.board.generate_board()
+
+	def test_boards_share_topology(self):
+		other = Board(Random(2))
+		other.generate_board()
+		self.assertIs(self.board.topology, other.topology)
+
+	def test_network_matches_topology(self):
+		self.assertItemsEqual(self.board.topology.nodes, self.board.network.nodes())
+		self.assertEqual(len(self.board.topology.edges), self.board.network.number_of_edges())
+
+	def test_tiles_match_topology(self):
+		self.assertItemsEqual(self.board.topology.tiles, self.board.tiles.keys())
+
+	def test_walk_coast_uses_topology(self):
+		self.assertEqual([self.board.topology.nodes[n] for n in self.board.topology.coast], list(self.board.walk_coast()))
+
+	def test_harbors_are_placed_in_pairs(self):
+		harbors = {}
+		for node_id in self.board.walk_coast():
+			if 'harbor' in self.board.network.node[node_id]:
+				harbors.setdefault(self.board.network.node[node_id]['harbor'], []).append(node_id)
+		self.assertEqual(18, sum(map(len, harbors.values())))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# coding=utf8
+
+try: import unittest2 as unittest
+except ImportError: import unittest
+from random import Random
+
+from gamemodel.board import Board
+from gamemodel.layout import PIPS
+from gamemodel.tiles import RESOURCES
+from gamemodel.values import *
+
+class ValuesTestMixin(object):
+	compact = False
+
+	def setUp(self):
+		self.board = Board(Random(5), compact = self.compact)
+		self.board.generate_board()
+		self.values = self.board.values
+
+	def naive_pips(self, node_id):
+		# pips per resource, from the tiles around the node
+		pips = dict.fromkeys(RESOURCES, 0)
+		for pos in node_id:
+			tile = self.board.tiles.get(pos)
+			if not tile or not tile.resource or pos == self.board.robber: continue
+			pips[tile.resource] += PIPS[tile.number]
+		return [pips[resource] for resource in RESOURCES]
+
+	def assert_tables_match(self):
+		for n, node_id in enumerate(self.board.topology.nodes):
+			pips = self.naive_pips(node_id)
+			self.assertEqual(pips, list(self.values.resource_pips[n]))
+			self.assertEqual(sum(pips), self.values.pips[n])
+			self.assertEqual(sum(1 for p in pips if p), self.values.diversity[n])
+			self.assertEqual('harbor' in self.board.network.node[node_id], self.values.harbor_access[n])
+
+	def test_tables_match_naive_computation(self):
+		self.assert_tables_match()
+		self.assertAlmostEqual(self.values.pips.sum() / 36., self.values.yields.sum())
+
+	def test_robber_moves_are_followed(self):
+		for pos in self.board.topology.tiles[:10]:
+			self.board.move_robber(pos)
+			self.assert_tables_match()
+		self.board.robber = None
+		self.assert_tables_match()
+
+	def test_top_nodes_are_best_available(self):
+		scores = self.values.scores()
+		top = self.values.top(5)
+		self.assertEqual(5, len(top))
+		self.assertEqual(sorted([score for node_id, score in top], reverse = True), [score for node_id, score in top])
+
+		worst = top[-1][1]
+		for n in self.board.available_indices():
+			if not self.board.topology.nodes[n] in dict(top): self.assertTrue(scores[n] <= worst)
+
+		# placing a settlement takes the node and its neighbours out
+		best = top[0][0]
+		self.board.update_building(best, 'red', 'settlement')
+		remaining = dict(self.values.top(len(self.board.topology.nodes)))
+		self.assertFalse(best in remaining)
+		for neighbor in self.board.network.neighbors(best):
+			self.assertFalse(neighbor in remaining)
+		self.assertTrue(best in dict(self.values.top(1000, available = False)))
+
+	def test_weights_change_scores(self):
+		plain = self.values.scores(diversity_weight = 0, harbor_weight = 0)
+		self.assertEqual(list(self.values.pips), list(plain))
+		harbors = self.values.scores(diversity_weight = 0, harbor_weight = 10)
+		self.assertEqual(list(plain + 10*self.values.harbor_access), list(harbors))
+
+	def test_clone_has_own_tables(self):
+		clone = self.board.clone(Random(1))
+		pos = [pos for pos in self.board.topology.tiles if pos != self.board.robber][0]
+		clone.move_robber(pos)
+		self.assertNotEqual(list(clone.values.pips), list(self.values.pips))
+		self.assert_tables_match()
+
+
+class TestValuesNetworkx(ValuesTestMixin, unittest.TestCase):
+	pass
+
+
+class TestValuesCompact(ValuesTestMixin, unittest.TestCase):
+	compact = True